@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import DailyDepartmentFact
+
+@admin.register(DailyDepartmentFact)
+class DailyDepartmentFactAdmin(admin.ModelAdmin):
+    list_display = ('date', 'dept', 'revenue_collected', 'billed_amount', 'unpaid_balance', 'lab_charges', 'admissions', 'discharges')
+    list_select_related = ('dept',)
+    list_filter = ('dept',)
+    date_hierarchy = 'date'
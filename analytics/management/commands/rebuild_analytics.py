@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.rollups import SOURCES, rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily department rollups from bills, payments, lab reports and admissions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day to rebuild (YYYY-MM-DD). Defaults to the beginning.")
+        parser.add_argument('--end', help="Last day to rebuild (YYYY-MM-DD). Defaults to the end.")
+        parser.add_argument('--source', action='append', choices=sorted(SOURCES), help="Only rebuild these sources.")
+
+    def handle(self, *args, **options):
+        days = {}
+        for name in ('start', 'end'):
+            if options[name]:
+                try:
+                    days[name] = datetime.strptime(options[name], '%Y-%m-%d').date()
+                except ValueError:
+                    raise CommandError(f"--{name} must be YYYY-MM-DD")
+
+        rows = rebuild(days.get('start'), days.get('end'), sources=options['source'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} daily fact row(s)."))
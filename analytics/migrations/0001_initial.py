@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('clinical', '0010_appointment_doctor_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyDepartmentFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('revenue_collected', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('billed_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unpaid_balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('lab_charges', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('admissions', models.IntegerField(default=0)),
+                ('discharges', models.IntegerField(default=0)),
+                ('stay_days', models.IntegerField(default=0)),
+                ('census_change', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('dept', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_facts', to='clinical.department')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dept', 'date'], name='fact_dept_date_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('dept__isnull', False)), fields=('date', 'dept'), name='fact_date_dept_uniq'), models.UniqueConstraint(condition=models.Q(('dept__isnull', True)), fields=('date',), name='fact_date_nodept_uniq')],
+            },
+        ),
+    ]
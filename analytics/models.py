@@ -0,0 +1,36 @@
+from django.db import models
+
+# DailyDepartmentFact model
+class DailyDepartmentFact(models.Model):
+    """
+    Revenue and utilization totals for one department on one day, maintained
+    incrementally by analytics.rollups. dept is null for activity that cannot
+    be tied to a department (e.g. a bill with no admission or appointment).
+    """
+    date = models.DateField()
+    dept = models.ForeignKey('clinical.Department', on_delete=models.CASCADE, null=True, blank=True, related_name='daily_facts')
+    # SUCCESS payments received that day
+    revenue_collected = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Bills issued that day, and how much of them is still UNPAID
+    billed_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    unpaid_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lab_charges = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    admissions = models.IntegerField(default=0)
+    discharges = models.IntegerField(default=0)
+    # Sum of length_of_stay over the day's discharges
+    stay_days = models.IntegerField(default=0)
+    # In-house patients change: +1 on admit day, -1 the day after discharge
+    census_change = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'dept'], condition=models.Q(dept__isnull=False), name='fact_date_dept_uniq'),
+            models.UniqueConstraint(fields=['date'], condition=models.Q(dept__isnull=True), name='fact_date_nodept_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['dept', 'date'], name='fact_dept_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dept or 'Unassigned'} on {self.date}"
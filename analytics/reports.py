@@ -0,0 +1,141 @@
+"""
+Range reports answered from DailyDepartmentFact only.
+
+Sums come straight from the fact rows. Bed-days are the daily in-house
+census summed over the range, where the census on a day is the running
+total of census_change up to it: one aggregate for everything before the
+range plus a walk over the range's own rows.
+"""
+import calendar
+from datetime import datetime, timedelta
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from clinical.models import Department
+from .models import DailyDepartmentFact
+
+GROUPS = ('department', 'month', 'day')
+REVENUE_FIELDS = ('revenue_collected', 'billed_amount', 'unpaid_balance', 'lab_charges')
+UTILIZATION_FIELDS = ('admissions', 'discharges', 'stay_days')
+
+
+def _date(value, fmt, name, label):
+    try:
+        return datetime.strptime(value, fmt).date()
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be in {label} format")
+
+
+def parse_period(params):
+    """(first_day, last_day) from ?month=YYYY-MM, ?year=YYYY or ?start=&end=YYYY-MM-DD."""
+    if params.get('month'):
+        first = _date(params['month'], '%Y-%m', 'month', 'YYYY-MM')
+        return first, first.replace(day=calendar.monthrange(first.year, first.month)[1])
+    if params.get('year'):
+        first = _date(params['year'], '%Y', 'year', 'YYYY')
+        return first, first.replace(month=12, day=31)
+    if params.get('start') and params.get('end'):
+        start = _date(params['start'], '%Y-%m-%d', 'start', 'YYYY-MM-DD')
+        end = _date(params['end'], '%Y-%m-%d', 'end', 'YYYY-MM-DD')
+        if end < start:
+            raise ValueError("end must not be before start")
+        return start, end
+    raise ValueError("Pass month=YYYY-MM, year=YYYY or start and end dates")
+
+
+def _facts(start, end, dept=None):
+    facts = DailyDepartmentFact.objects.filter(date__gte=start, date__lte=end)
+    if dept is not None:
+        facts = facts.filter(dept_id=dept)
+    return facts
+
+
+def _group_key(group, dept_id, day):
+    if group == 'department':
+        return dept_id
+    if group == 'month':
+        return day.replace(day=1)
+    if group == 'day':
+        return day
+    return None
+
+
+def _sums(start, end, fields, group=None, dept=None):
+    """{group key: {field: total}} aggregated in the database."""
+    facts = _facts(start, end, dept)
+    if group == 'department':
+        facts = facts.values(key=F('dept'))
+    elif group == 'month':
+        facts = facts.annotate(key=TruncMonth('date')).values('key')
+    elif group == 'day':
+        facts = facts.values(key=F('date'))
+    else:
+        return {None: facts.aggregate(**{field: Sum(field) for field in fields})}
+
+    rows = facts.annotate(**{field: Sum(field) for field in fields}).order_by()
+    return {row.pop('key'): row for row in rows}
+
+
+def _rows(group, sums):
+    """Result rows in group order, with department names filled in."""
+    if group == 'department':
+        names = dict(Department.objects.filter(pk__in=[key for key in sums if key]).values_list('pk', 'name'))
+        ordered = sorted(sums, key=lambda key: (key is None, names.get(key, '')))
+        return [{'dept': key, 'dept_name': names.get(key), **sums[key]} for key in ordered]
+    return [{'period': key, **sums[key]} for key in sorted(sums)]
+
+
+def census(start, end, dept=None):
+    """Yields (dept_id, day, in-house patients) for every day in [start, end] up to today."""
+    last = min(end, timezone.localdate())
+    before = DailyDepartmentFact.objects.filter(date__lt=start)
+    if dept is not None:
+        before = before.filter(dept_id=dept)
+    levels = dict(before.values('dept').annotate(total=Sum('census_change')).values_list('dept', 'total'))
+
+    changes = {}
+    rows = _facts(start, last, dept).exclude(census_change=0).values_list('dept', 'date', 'census_change')
+    for dept_id, day, change in rows:
+        changes.setdefault(dept_id, {})[day] = change
+
+    for dept_id in set(levels) | set(changes):
+        level = levels.get(dept_id) or 0
+        day_changes = changes.get(dept_id, {})
+        day = start
+        while day <= last:
+            level += day_changes.get(day, 0)
+            yield dept_id, day, level
+            day += timedelta(days=1)
+
+
+def revenue_report(start, end, group=None, dept=None):
+    sums = _sums(start, end, REVENUE_FIELDS, group, dept)
+    rows = []
+    for row in _rows(group, sums):
+        for field in REVENUE_FIELDS:
+            row[field] = row[field] or 0
+        rows.append(row)
+    return rows
+
+
+def utilization_report(start, end, group=None, dept=None):
+    sums = _sums(start, end, UTILIZATION_FIELDS, group, dept)
+    bed_days, days = {}, {}
+    for dept_id, day, level in census(start, end, dept):
+        key = _group_key(group, dept_id, day)
+        bed_days[key] = bed_days.get(key, 0) + level
+        days.setdefault(key, set()).add(day)
+        sums.setdefault(key, dict.fromkeys(UTILIZATION_FIELDS, 0))
+
+    rows = []
+    for row in _rows(group, sums):
+        key = row.get('dept') if group == 'department' else row.get('period')
+        for field in UTILIZATION_FIELDS:
+            row[field] = row[field] or 0
+        row['average_length_of_stay'] = row['stay_days'] / row['discharges'] if row['discharges'] else None
+        row['bed_days'] = bed_days.get(key, 0)
+        row['average_daily_census'] = row['bed_days'] / len(days[key]) if days.get(key) else None
+        rows.append(row)
+    return rows
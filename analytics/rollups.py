@@ -0,0 +1,257 @@
+"""
+Incremental maintenance of DailyDepartmentFact.
+
+Each transactional model that feeds the rollups is described by a Source:
+which columns its facts depend on, how to find the department, and which
+(day, {fact: amount}) contributions one row makes. A save is recorded by
+subtracting the old row's contributions and adding the new one's, so
+edits, status changes and deletes all keep the totals exact. rebuild()
+runs the same contributions over the tables to recompute a day range.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from clinical.models import Appointment, LabReport
+from facility.models import Admission, Bed, Bill, Payment, Room
+from users.models import Doctor
+from .models import DailyDepartmentFact
+
+ADMISSION_DEPT = ('room__dept_id', 'bed__room__dept_id')
+APPOINTMENT_DEPT = ('doctor__dept_id',)
+BILL_DEPT = (
+    tuple(f'admission__{path}' for path in ADMISSION_DEPT)
+    + tuple(f'appointment__{path}' for path in APPOINTMENT_DEPT)
+)
+
+
+def local_day(value):
+    return timezone.localdate(value) if value else None
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _dept_expression(paths):
+    return Coalesce(*paths) if len(paths) > 1 else F(paths[0])
+
+
+class Source:
+    model = None
+    # Columns the contributions are computed from
+    fields = ()
+    # Fact columns this source owns
+    fact_fields = ()
+    # Datetime columns that place contributions on days
+    date_fields = ()
+    # ORM paths from the model to its department, first non-null wins
+    dept_paths = ()
+    # (state field, related model, paths from it to the department) for single rows
+    dept_lookups = ()
+
+    def facts(self, state):
+        """(day, {fact field: amount}) pairs contributed by one row."""
+        raise NotImplementedError
+
+    def state(self, instance):
+        """The tracked columns of an instance, or None if any are deferred."""
+        values = instance.__dict__
+        if any(field not in values for field in self.fields):
+            return None
+        return {field: values[field] for field in self.fields}
+
+    def load_state(self, pk):
+        return self.model.objects.filter(pk=pk).values(*self.fields).first()
+
+    def department(self, state):
+        for field, model, paths in self.dept_lookups:
+            if state.get(field) is None:
+                continue
+            dept = model.objects.filter(pk=state[field]).values_list(_dept_expression(paths), flat=True).first()
+            if dept is not None:
+                return dept
+        return None
+
+    def rows(self, start=None, end=None):
+        """States of the rows that can contribute to [start, end], each with its 'dept'."""
+        rows = self.model.objects.all()
+        if start or end:
+            touches = Q()
+            for field in self.date_fields:
+                bounds = {}
+                if start:
+                    # A day early: discharges count on the following day too
+                    bounds[f'{field}__gte'] = day_start(start - timedelta(days=1))
+                if end:
+                    bounds[f'{field}__lt'] = day_start(end + timedelta(days=1))
+                touches |= Q(**bounds)
+            rows = rows.filter(touches)
+        return rows.values(*self.fields, dept=_dept_expression(self.dept_paths)).iterator(chunk_size=2000)
+
+
+class PaymentSource(Source):
+    model = Payment
+    fields = ('bill_id', 'total_amount', 'payment_status', 'payment_date')
+    fact_fields = ('revenue_collected',)
+    date_fields = ('payment_date',)
+    dept_paths = tuple(f'bill__{path}' for path in BILL_DEPT)
+    dept_lookups = (('bill_id', Bill, BILL_DEPT),)
+
+    def facts(self, state):
+        if state['payment_status'] != 'SUCCESS':
+            return []
+        return [(local_day(state['payment_date']), {'revenue_collected': state['total_amount']})]
+
+
+class BillSource(Source):
+    model = Bill
+    fields = ('admission_id', 'appointment_id', 'total_amount', 'status', 'created_at')
+    fact_fields = ('billed_amount', 'unpaid_balance')
+    date_fields = ('created_at',)
+    dept_paths = BILL_DEPT
+    dept_lookups = (
+        ('admission_id', Admission, ADMISSION_DEPT),
+        ('appointment_id', Appointment, APPOINTMENT_DEPT),
+    )
+
+    def facts(self, state):
+        total = state['total_amount']
+        return [(local_day(state['created_at']), {
+            'billed_amount': total,
+            'unpaid_balance': total if state['status'] == 'UNPAID' else 0,
+        })]
+
+
+class LabReportSource(Source):
+    model = LabReport
+    fields = ('doctor_id', 'lab_charge', 'report_date')
+    fact_fields = ('lab_charges',)
+    date_fields = ('report_date',)
+    dept_paths = ('doctor__dept_id',)
+    dept_lookups = (('doctor_id', Doctor, ('dept_id',)),)
+
+    def facts(self, state):
+        return [(local_day(state['report_date']), {'lab_charges': state['lab_charge']})]
+
+
+class AdmissionSource(Source):
+    model = Admission
+    fields = ('room_id', 'bed_id', 'admit_date', 'discharge_date')
+    fact_fields = ('admissions', 'discharges', 'stay_days', 'census_change')
+    date_fields = ('admit_date', 'discharge_date')
+    dept_paths = ADMISSION_DEPT
+    dept_lookups = (
+        ('room_id', Room, ('dept_id',)),
+        ('bed_id', Bed, ('room__dept_id',)),
+    )
+
+    def facts(self, state):
+        admitted = local_day(state['admit_date'])
+        facts = [(admitted, {'admissions': 1, 'census_change': 1})]
+        if state['discharge_date']:
+            # Same day counting as Admission.length_of_stay
+            discharged = local_day(state['discharge_date'])
+            facts.append((discharged, {'discharges': 1, 'stay_days': (discharged - admitted).days + 1}))
+            facts.append((discharged + timedelta(days=1), {'census_change': -1}))
+        return facts
+
+
+SOURCES = {
+    'payments': PaymentSource(),
+    'bills': BillSource(),
+    'lab_reports': LabReportSource(),
+    'admissions': AdmissionSource(),
+}
+SOURCE_BY_MODEL = {source.model: source for source in SOURCES.values()}
+
+
+def bump(day, dept_id, deltas):
+    """Adds ``deltas`` to the (day, dept) fact row, creating it if needed."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    facts = DailyDepartmentFact.objects.filter(date=day, dept_id=dept_id)
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if facts.update(updated_at=timezone.now(), **changes):
+        return
+    try:
+        with transaction.atomic():
+            DailyDepartmentFact.objects.create(date=day, dept_id=dept_id, **deltas)
+    except IntegrityError:
+        # Another writer created the row first
+        facts.update(updated_at=timezone.now(), **changes)
+
+
+def record_change(source, old, new):
+    """Moves the rollups from a row's ``old`` state to its ``new`` one (None = absent)."""
+    if old == new:
+        return
+    totals = {}
+    departments = {}
+    for state, sign in ((old, -1), (new, 1)):
+        if state is None:
+            continue
+        lookup = tuple(state.get(field) for field, _, _ in source.dept_lookups)
+        if lookup not in departments:
+            departments[lookup] = source.department(state)
+        for day, values in source.facts(state):
+            row = totals.setdefault((day, departments[lookup]), {})
+            for field, value in values.items():
+                row[field] = row.get(field, 0) + sign * value
+
+    for (day, dept_id), deltas in totals.items():
+        bump(day, dept_id, deltas)
+
+
+def rebuild(start=None, end=None, sources=None):
+    """
+    Recomputes the fact columns of ``sources`` (names from SOURCES, all by
+    default) for the days in [start, end]; the whole history when no range
+    is given. Returns the number of fact rows written.
+    """
+    sources = [SOURCES[name] for name in sources] if sources else list(SOURCES.values())
+    totals = {}
+    for source in sources:
+        for state in source.rows(start, end):
+            dept_id = state.pop('dept')
+            for day, values in source.facts(state):
+                if (start and day < start) or (end and day > end):
+                    continue
+                row = totals.setdefault((day, dept_id), {})
+                for field, value in values.items():
+                    row[field] = row.get(field, 0) + value
+
+    fields = [field for source in sources for field in source.fact_fields]
+    existing = DailyDepartmentFact.objects.all()
+    if start:
+        existing = existing.filter(date__gte=start)
+    if end:
+        existing = existing.filter(date__lte=end)
+
+    now = timezone.now()
+    with transaction.atomic():
+        changed = []
+        for fact in existing.select_for_update():
+            values = totals.pop((fact.date, fact.dept_id), {})
+            for field in fields:
+                setattr(fact, field, values.get(field, 0))
+            fact.updated_at = now
+            changed.append(fact)
+        DailyDepartmentFact.objects.bulk_update(changed, fields + ['updated_at'], batch_size=500)
+        DailyDepartmentFact.objects.bulk_create(
+            [DailyDepartmentFact(date=day, dept_id=dept_id, **values) for (day, dept_id), values in totals.items()],
+            batch_size=500,
+        )
+    return len(changed) + len(totals)
+
+
+def rebuild_bills(bill_ids):
+    """Re-derives bill facts after bulk writes that skipped the signals."""
+    created = Bill.objects.filter(pk__in=bill_ids).values_list('created_at', flat=True)
+    days = {local_day(value) for value in created}
+    if days:
+        rebuild(min(days), max(days), sources=['bills'])
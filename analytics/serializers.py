@@ -0,0 +1,26 @@
+from rest_framework import serializers
+
+
+class ReportRowSerializer(serializers.Serializer):
+    dept = serializers.IntegerField(allow_null=True, required=False)
+    dept_name = serializers.CharField(allow_null=True, required=False)
+    period = serializers.DateField(allow_null=True, required=False)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Only the key of the requested grouping is meaningful
+        return {field: value for field, value in data.items() if field in instance}
+
+class RevenueRowSerializer(ReportRowSerializer):
+    revenue_collected = serializers.DecimalField(max_digits=14, decimal_places=2)
+    billed_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    unpaid_balance = serializers.DecimalField(max_digits=14, decimal_places=2)
+    lab_charges = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+class UtilizationRowSerializer(ReportRowSerializer):
+    admissions = serializers.IntegerField()
+    discharges = serializers.IntegerField()
+    stay_days = serializers.IntegerField()
+    average_length_of_stay = serializers.FloatField(allow_null=True)
+    bed_days = serializers.IntegerField()
+    average_daily_census = serializers.FloatField(allow_null=True)
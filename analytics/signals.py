@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+
+from facility.billing import bills_written
+from .rollups import SOURCE_BY_MODEL, rebuild_bills, record_change
+
+
+def track_state(sender, instance, **kwargs):
+    instance._rollup_state = SOURCE_BY_MODEL[sender].state(instance) if instance.pk else None
+
+
+def load_missing_state(sender, instance, **kwargs):
+    # Instances loaded with deferred fields: read the old row before it changes
+    if instance.pk and not instance._state.adding and instance._rollup_state is None:
+        instance._rollup_state = SOURCE_BY_MODEL[sender].load_state(instance.pk)
+
+
+def rollup_on_save(sender, instance, created, **kwargs):
+    source = SOURCE_BY_MODEL[sender]
+    new = source.state(instance) or source.load_state(instance.pk)
+    record_change(source, None if created else instance._rollup_state, new)
+    instance._rollup_state = new
+
+
+def rollup_on_delete(sender, instance, **kwargs):
+    record_change(SOURCE_BY_MODEL[sender], instance._rollup_state, None)
+
+
+def rollup_billing_run(sender, bill_ids, **kwargs):
+    rebuild_bills(bill_ids)
+
+
+def connect():
+    for model in SOURCE_BY_MODEL:
+        label = model._meta.label
+        post_init.connect(track_state, sender=model, dispatch_uid=f'rollup_{label}_init')
+        pre_save.connect(load_missing_state, sender=model, dispatch_uid=f'rollup_{label}_pre_save')
+        post_save.connect(rollup_on_save, sender=model, dispatch_uid=f'rollup_{label}_save')
+        pre_delete.connect(load_missing_state, sender=model, dispatch_uid=f'rollup_{label}_pre_delete')
+        post_delete.connect(rollup_on_delete, sender=model, dispatch_uid=f'rollup_{label}_delete')
+    bills_written.connect(rollup_billing_run, dispatch_uid='rollup_billing_run')
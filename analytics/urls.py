@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import RevenueReportView, UtilizationReportView
+
+urlpatterns = [
+    path('revenue/', RevenueReportView.as_view()),
+    path('utilization/', UtilizationReportView.as_view()),
+]
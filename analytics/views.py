@@ -0,0 +1,51 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from permissions import IsAdmin
+from .reports import GROUPS, parse_period, revenue_report, utilization_report
+from .serializers import RevenueRowSerializer, UtilizationRowSerializer
+
+
+class ReportView(APIView):
+    """
+    GET ?month=YYYY-MM | ?year=YYYY | ?start=YYYY-MM-DD&end=YYYY-MM-DD
+    [&group=department|month|day] [&dept=<id>]
+
+    Answered from the daily rollups, never the transactional tables.
+    """
+    permission_classes = [IsAdmin]
+    report = None
+    serializer_class = None
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            start, end = parse_period(params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        group = params.get('group', 'department')
+        if group not in GROUPS:
+            return Response({"error": f"group must be one of {', '.join(GROUPS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        dept = params.get('dept')
+        if dept is not None and not dept.isdigit():
+            return Response({"error": "dept must be a department id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = self.report(start, end, group, dept)
+        totals = self.report(start, end, None, dept)[0]
+        totals.pop('period', None)
+        return Response({
+            'start': start,
+            'end': end,
+            'group': group,
+            'results': self.serializer_class(rows, many=True).data,
+            'totals': self.serializer_class(totals).data,
+        })
+
+class RevenueReportView(ReportView):
+    report = staticmethod(revenue_report)
+    serializer_class = RevenueRowSerializer
+
+class UtilizationReportView(ReportView):
+    report = staticmethod(utilization_report)
+    serializer_class = UtilizationRowSerializer
@@ -0,0 +1,251 @@
+"""
+Drives the real URL routes with concurrent API clients and measures them.
+
+Every worker thread has its own APIClient authenticated with a real token
+and its own database connection. A scenario's requests are numbered from
+one shared counter, so pool based scenarios (discharging an admission)
+never hit the same row twice. Results are plain dicts so they can be
+written as JSON and compared between commits. A scenario whose every
+response was an error is marked ``failed``.
+"""
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from time import perf_counter
+
+import django
+from django.conf import settings
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+@contextmanager
+def throwaway_databases():
+    """Test databases for the run; the configured databases are never touched."""
+    with tempfile.TemporaryDirectory() as directory:
+        for alias in connections:
+            settings_dict = connections[alias].settings_dict
+            # In-memory SQLite cannot be shared by the client threads
+            if connections[alias].vendor == 'sqlite' and not settings_dict['TEST'].get('NAME'):
+                settings_dict['TEST']['NAME'] = os.path.join(directory, f'bench_{alias}.sqlite3')
+
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            # The clients send Host: testserver
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+
+class Scenario:
+    def __init__(self, method, path, role, data=None, pool=None, params=None):
+        self.method = method
+        # Callables taking the request number
+        self.path = path
+        self.data = data
+        self.role = role
+        self.params = params or {}
+        # Ids that are used up one per request, if any
+        self.pool = pool
+
+    def limit(self, requests):
+        return requests if self.pool is None else min(requests, len(self.pool))
+
+
+def build_scenarios(ids):
+    doctors = ids['doctors']
+    # Past the seeded appointments, so new bookings never overlap them
+    first_slot = (timezone.now() + timedelta(days=60)).replace(hour=0, minute=0, second=0, microsecond=0)
+    slot = timedelta(minutes=getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 30))
+    return {
+        'lab_reports_list': Scenario('GET', lambda i: '/api/clinical/lab-reports/', 'doctor'),
+        'admissions_list': Scenario('GET', lambda i: '/api/facility/admissions/', 'admin', params={'status': 'ADMITTED'}),
+        'appointment_slots': Scenario('GET', lambda i: '/api/clinical/appointments/slots/', 'patient', params={'count': 10}),
+        'appointments_create': Scenario(
+            'POST', lambda i: '/api/clinical/appointments/', 'patient',
+            data=lambda i: {
+                'patient': ids['patients'][0],
+                'doctor': doctors[i % len(doctors)],
+                'appointment_date': (first_slot + slot * (i // len(doctors))).isoformat(),
+                'status': 'PENDING',
+            },
+        ),
+        'admissions_discharge': Scenario(
+            'POST', lambda i: f"/api/facility/admissions/{ids['settled_admissions'][i]}/discharge/", 'admin',
+            pool=ids['settled_admissions'],
+        ),
+    }
+
+
+def tokens_for(ids, clients):
+    """Token keys per role, one user per client where the data allows it."""
+    users = {
+        'admin': ids['admins'],
+        'doctor': ids['doctor_users'][:clients],
+        'patient': ids['patient_users'][:clients],
+    }
+    return {
+        role: [Token.objects.get_or_create(user_id=user_id)[0].key for user_id in user_ids]
+        for role, user_ids in users.items()
+    }
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _send(client, scenario, number):
+    path = scenario.path(number)
+    if scenario.method == 'GET':
+        return client.get(path, scenario.params)
+    data = scenario.data(number) if scenario.data else {}
+    return client.generic(scenario.method, path, data=json.dumps(data), content_type='application/json')
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def summarize(samples, duration):
+    latencies = sorted(elapsed * 1000 for elapsed, _, _ in samples)
+    # None where the run could not count queries
+    queries = [count for _, count, _ in samples if count is not None]
+    statuses = {}
+    for _, _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(count for status, count in statuses.items() if not status.startswith('2'))
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        # Nothing was measured but error responses
+        'failed': bool(samples) and errors == len(samples),
+        'statuses': statuses,
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(samples) / duration, 2) if duration else None,
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies), 3) if latencies else None,
+            'p50': round(_percentile(latencies, 0.50), 3) if latencies else None,
+            'p95': round(_percentile(latencies, 0.95), 3) if latencies else None,
+            'p99': round(_percentile(latencies, 0.99), 3) if latencies else None,
+            'max': round(latencies[-1], 3) if latencies else None,
+        },
+        'queries_per_request': {
+            'mean': round(statistics.fmean(queries), 2) if queries else None,
+            'max': max(queries) if queries else None,
+        },
+    }
+
+
+def run_scenario(scenario, tokens, clients=4, requests=200, warmup=10):
+    """Runs ``warmup`` requests serially, then ``requests`` more over ``clients`` threads."""
+    total = scenario.limit(warmup + requests)
+    numbers = itertools.count()
+    lock = threading.Lock()
+
+    def client_for(worker):
+        # Server errors are counted as 500s rather than raised
+        client = APIClient(raise_request_exception=False)
+        keys = tokens[scenario.role]
+        client.credentials(HTTP_AUTHORIZATION=f'Token {keys[worker % len(keys)]}')
+        return client
+
+    def next_number():
+        with lock:
+            number = next(numbers)
+        return number if number < total else None
+
+    client = client_for(0)
+    for _ in range(min(warmup, total)):
+        _send(client, scenario, next_number())
+
+    def worker(index):
+        client = client_for(index)
+        counter = QueryCounter()
+        samples = []
+        try:
+            with connection.execute_wrapper(counter):
+                while (number := next_number()) is not None:
+                    counter.count = 0
+                    started = perf_counter()
+                    response = _send(client, scenario, number)
+                    samples.append((perf_counter() - started, counter.count, response.status_code))
+        finally:
+            # Each pool thread opened its own connection
+            connection.close()
+        return samples
+
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(worker, range(clients)))
+    duration = perf_counter() - started
+    return summarize([sample for samples in results for sample in samples], duration)
+
+
+def metadata(**extra):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        **extra,
+    }
+
+
+def compare(baseline, current, threshold=10.0):
+    """
+    One row per scenario in both runs with the throughput, p95 latency and
+    query changes; ``regressed`` when throughput dropped or p95 grew by more
+    than ``threshold`` percent, or requests issue half a query more on average.
+    """
+    def change(old, new):
+        if old in (None, 0) or new is None:
+            return None
+        return round((new - old) / old * 100, 1)
+
+    rows = []
+    for name, new in current['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if old is None:
+            continue
+        throughput = change(old['throughput_rps'], new['throughput_rps'])
+        p95 = change(old['latency_ms']['p95'], new['latency_ms']['p95'])
+        queries = (new['queries_per_request']['mean'] or 0) - (old['queries_per_request']['mean'] or 0)
+        rows.append({
+            'scenario': name,
+            'throughput_change_pct': throughput,
+            'p95_change_pct': p95,
+            'queries_change': round(queries, 2),
+            'regressed': (
+                (throughput is not None and throughput < -threshold)
+                or (p95 is not None and p95 > threshold)
+                or queries >= 0.5
+            ),
+        })
+    return rows
@@ -0,0 +1,94 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.harness import (
+    build_scenarios, compare, metadata, run_scenario, throwaway_databases, tokens_for,
+)
+from benchmarks.seed import SIZES, HospitalSeeder
+
+SCENARIOS = [
+    'lab_reports_list', 'admissions_list', 'appointment_slots',
+    'appointments_create', 'admissions_discharge',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database with a synthetic hospital and benchmark the API routes "
+        "with concurrent clients. Never touches the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(SIZES), default='small')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, help="Run only these scenarios.")
+        parser.add_argument('--clients', type=int, default=4, help="Concurrent clients per scenario.")
+        parser.add_argument('--requests', type=int, default=200, help="Measured requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+        parser.add_argument('--compare', help="Baseline results file to compare against.")
+        parser.add_argument('--threshold', type=float, default=10.0, help="Allowed regression in percent.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline: {e}")
+
+        with throwaway_databases():
+            results = self.run_benchmarks(options)
+
+        for name, result in results['scenarios'].items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f"{name:22} {result['throughput_rps']:>9} req/s  p50 {latency['p50']} ms  "
+                f"p95 {latency['p95']} ms  p99 {latency['p99']} ms  "
+                f"{result['queries_per_request']['mean']} queries/req  errors {result['errors']}"
+                + (f"  {self.style.ERROR('FAILED')}" if result['failed'] else '')
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            rows = compare(baseline, results, options['threshold'])
+            for row in rows:
+                flag = self.style.ERROR('REGRESSED') if row['regressed'] else self.style.SUCCESS('ok')
+                self.stdout.write(
+                    f"{row['scenario']:22} throughput {row['throughput_change_pct']}%  "
+                    f"p95 {row['p95_change_pct']}%  queries {row['queries_change']:+}  {flag}"
+                )
+            if any(row['regressed'] for row in rows):
+                raise CommandError(f"Benchmarks regressed against {options['compare']}")
+
+        failed = [name for name, result in results['scenarios'].items() if result['failed']]
+        if failed:
+            raise CommandError(f"Every request failed in: {', '.join(failed)}")
+
+    def run_benchmarks(self, options):
+        counts = SIZES[options['size']]
+        self.stdout.write(f"Seeding a {options['size']} hospital...")
+        ids = HospitalSeeder(counts, seed=options['seed']).run()
+        scenarios = build_scenarios(ids)
+        tokens = tokens_for(ids, options['clients'])
+
+        results = {
+            'meta': metadata(
+                size=options['size'], counts=counts, seed=options['seed'],
+                clients=options['clients'], requests=options['requests'], warmup=options['warmup'],
+            ),
+            'scenarios': {},
+        }
+        for name in options['scenario'] or SCENARIOS:
+            self.stdout.write(f"Running {name}...")
+            results['scenarios'][name] = run_scenario(
+                scenarios[name], tokens,
+                clients=options['clients'], requests=options['requests'], warmup=options['warmup'],
+            )
+        return results
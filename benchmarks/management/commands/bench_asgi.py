@@ -0,0 +1,100 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.harness import metadata, throwaway_databases, tokens_for
+from benchmarks.seed import SIZES, HospitalSeeder
+from benchmarks.slow_clients import run_asgi, run_wsgi
+
+SERVERS = ['wsgi', 'asgi']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the WSGI and the ASGI entry points under many concurrent slow clients "
+        "on a throwaway test database. Each server runs in its own process."
+    )
+    # The URLconf must not load before ASYNC_READ_VIEWS is settled
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', action='append', choices=SERVERS, help="Run only these servers.")
+        parser.add_argument('--size', choices=sorted(SIZES), default='small')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--path', default='/api/clinical/lab-reports/')
+        parser.add_argument('--role', choices=['admin', 'doctor', 'patient'], default='doctor')
+        parser.add_argument('--clients', type=int, default=100, help="Concurrent slow clients.")
+        parser.add_argument('--requests', type=int, default=5, help="Requests per client.")
+        parser.add_argument('--latency-ms', type=float, default=100.0,
+                            help="Network time to read each request and to send each response.")
+        parser.add_argument('--workers', type=int, default=8, help="Worker threads of the WSGI server.")
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        servers = options['server'] or SERVERS
+        if len(servers) == 1:
+            results = {'meta': None, 'servers': {servers[0]: self.run_server(servers[0], options)}}
+            results['meta'] = self.meta(options)
+        else:
+            results = self.run_each(servers, options)
+
+        for server, result in results['servers'].items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f"{server:5} {result['throughput_rps']:>9} req/s  p50 {latency['p50']} ms  "
+                f"p95 {latency['p95']} ms  p99 {latency['p99']} ms  errors {result['errors']}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run_each(self, servers, options):
+        # Whether the viewsets get async views is fixed when the URLconf is
+        # imported, so every server gets a fresh process.
+        results = {'meta': self.meta(options), 'servers': {}}
+        for server in servers:
+            self.stdout.write(f"Running {server}...")
+            with tempfile.NamedTemporaryFile(suffix='.json') as output:
+                command = [
+                    sys.executable, sys.argv[0], 'bench_asgi', '--server', server,
+                    '--size', options['size'], '--seed', str(options['seed']),
+                    '--path', options['path'], '--role', options['role'],
+                    '--clients', str(options['clients']), '--requests', str(options['requests']),
+                    '--latency-ms', str(options['latency_ms']), '--workers', str(options['workers']),
+                    '--output', output.name,
+                ]
+                env = {**os.environ, 'ASYNC_READ_VIEWS': '1' if server == 'asgi' else '0'}
+                if subprocess.run(command, env=env, stdout=subprocess.DEVNULL).returncode:
+                    raise CommandError(f"The {server} run failed")
+                results['servers'][server] = json.load(output)['servers'][server]
+        return results
+
+    def run_server(self, server, options):
+        if settings.ASYNC_READ_VIEWS != (server == 'asgi'):
+            self.stderr.write(f"ASYNC_READ_VIEWS is {'on' if settings.ASYNC_READ_VIEWS else 'off'} for the {server} run")
+
+        with throwaway_databases():
+            ids = HospitalSeeder(SIZES[options['size']], seed=options['seed']).run()
+            tokens = tokens_for(ids, options['clients'])[options['role']]
+            kwargs = {
+                'clients': options['clients'],
+                'requests': options['requests'],
+                'latency': options['latency_ms'] / 1000,
+            }
+            if server == 'wsgi':
+                return run_wsgi(options['path'], tokens, workers=options['workers'], **kwargs)
+            return run_asgi(options['path'], tokens, **kwargs)
+
+    def meta(self, options):
+        return metadata(
+            size=options['size'], seed=options['seed'], path=options['path'], role=options['role'],
+            clients=options['clients'], requests=options['requests'],
+            latency_ms=options['latency_ms'], wsgi_workers=options['workers'],
+        )
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from benchmarks.seed import PASSWORD, SIZES, HospitalSeeder
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Generate a large, consistent synthetic hospital dataset with bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(SIZES), default='small', help="Preset row counts.")
+        for key in SIZES['small']:
+            parser.add_argument(f"--{key.replace('_', '-')}", type=int, dest=key, help=f"Override the {key} count.")
+        parser.add_argument('--seed', type=int, default=0, help="Same seed, same data.")
+        parser.add_argument('--prefix', default='seed', help="Username/email prefix; must be new to the database.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=1, help="Processes for the bulk chunks.")
+
+    def handle(self, *args, **options):
+        counts = dict(SIZES[options['size']])
+        for key in counts:
+            if options[key] is not None:
+                counts[key] = options[key]
+
+        if User.objects.filter(username__startswith=f"{options['prefix']}_").exists():
+            raise CommandError(f"Users prefixed {options['prefix']!r} already exist; pass another --prefix.")
+        if options['workers'] > 1 and connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError("An in-memory SQLite database cannot be shared with worker processes.")
+
+        started = time.monotonic()
+        seeder = HospitalSeeder(
+            counts, seed=options['seed'], prefix=options['prefix'],
+            batch_size=options['batch_size'], workers=options['workers'], log=self.stdout.write,
+        )
+        ids = seeder.run()
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(ids['patients'])} patients, {len(ids['doctors'])} doctors and "
+            f"{len(ids['current_admissions'])} current admissions in {time.monotonic() - started:.1f}s. "
+            f"Users log in with password {PASSWORD!r}."
+        ))
+
@@ -0,0 +1,129 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+
+from benchmarks.harness import throwaway_databases
+from benchmarks.seed import SIZES, HospitalSeeder
+from facility.billing import stay_days
+from facility.models import Admission, Bed, Bill, Room
+from facility.services import AlreadyDischarged, BedUnavailable, admit_patient, discharge_admission
+from users.models import Patient
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer admissions and discharges on the same few beds from many threads on a "
+        "throwaway database, then check that beds, room counters and bills are consistent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=2, help="Rooms (and so beds) to fight over.")
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--operations', type=int, default=100, help="Operations per thread.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with throwaway_databases():
+            HospitalSeeder(SIZES['small'], seed=options['seed']).run()
+            rooms = list(Room.objects.order_by('pk').values_list('pk', flat=True)[:options['rooms']])
+            stats, discharges = self.hammer(rooms, options)
+            problems = self.consistency_problems(rooms, discharges)
+
+        self.stdout.write(", ".join(f"{name} {count}" for name, count in sorted(stats.items())))
+        if problems:
+            for problem in problems:
+                self.stderr.write(problem)
+            raise CommandError(f"{len(problems)} consistency problem(s)")
+        self.stdout.write(self.style.SUCCESS("Beds, room counters and bills are consistent"))
+
+    def hammer(self, rooms, options):
+        patients = list(Patient.objects.order_by('pk')[:50])
+        stats = Counter()
+        discharges = Counter()
+        lock = threading.Lock()
+
+        def admitted():
+            return list(
+                Admission.objects.filter(status='ADMITTED', bed__room__in=rooms).values_list('pk', flat=True)[:5]
+            )
+
+        def worker(number):
+            rng = random.Random(options['seed'] * 1000 + number)
+            outcomes = Counter()
+            try:
+                for _ in range(options['operations']):
+                    candidates = admitted()
+                    if not candidates or rng.random() < 0.5:
+                        try:
+                            admit_patient(rng.choice(patients), room=rng.choice(rooms))
+                            outcomes['admitted'] += 1
+                        except BedUnavailable:
+                            outcomes['no_bed'] += 1
+                        continue
+
+                    # The first few admissions are picked by every thread, so
+                    # discharges of the same admission collide on purpose
+                    admission = rng.choice(candidates)
+                    try:
+                        result = discharge_admission(admission)
+                        if not result.discharged:
+                            bill = Bill.objects.get(pk=result.bill.pk)
+                            bill.status = 'PAID'
+                            bill.save(update_fields=['status'])
+                            outcomes['paid'] += 1
+                            result = discharge_admission(admission)
+                        if result.discharged:
+                            outcomes['discharged'] += 1
+                            with lock:
+                                discharges[admission] += 1
+                    except AlreadyDischarged:
+                        outcomes['lost_race'] += 1
+                    except Exception as e:
+                        outcomes[f'error:{type(e).__name__}'] += 1
+            finally:
+                connection.close()
+            return outcomes
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            for outcomes in executor.map(worker, range(options['threads'])):
+                stats.update(outcomes)
+        self.stdout.write(f"{sum(stats.values())} operations in {time.monotonic() - started:.1f}s")
+        return stats, discharges
+
+    def consistency_problems(self, rooms, discharges):
+        problems = []
+        for pk, count in discharges.items():
+            if count > 1:
+                problems.append(f"Admission {pk} was discharged {count} times")
+
+        beds = Bed.objects.filter(room__in=rooms).annotate(
+            holders=Count('admission', filter=Q(admission__status='ADMITTED')),
+        )
+        for bed in beds:
+            if bed.holders > 1:
+                problems.append(f"Bed {bed.pk} is held by {bed.holders} admissions")
+            if (bed.status == 'OCCUPIED') != (bed.holders == 1):
+                problems.append(f"Bed {bed.pk} is {bed.status} with {bed.holders} admission(s)")
+
+        free = Room.objects.annotate(available=Count('beds', filter=Q(beds__status='AVAILABLE')))
+        for room in free.filter(pk__in=rooms):
+            if room.free_beds != room.available:
+                problems.append(f"Room {room.pk} counts {room.free_beds} free beds, has {room.available}")
+
+        discharged = Admission.objects.filter(pk__in=list(discharges), status='DISCHARGED')
+        for admission in discharged:
+            if admission.total_days != stay_days(admission.admit_date, admission.discharge_date):
+                problems.append(f"Admission {admission.pk} has {admission.total_days} total days")
+        unpaid = Bill.objects.filter(admission__in=discharged, status='UNPAID').values_list('admission_id', flat=True)
+        for pk in unpaid:
+            problems.append(f"Admission {pk} was discharged with an unpaid bill")
+        if len(discharges) != discharged.count():
+            problems.append("A discharge was reported but the admission is not DISCHARGED")
+        return problems
@@ -0,0 +1,454 @@
+"""
+Synthetic hospital data, written with bulk_create in chunks.
+
+Bulk inserts skip Model.save() and the signals, so the seeder applies
+those side effects itself: admission total_days and bill totals use the
+billing helpers, discharged stays have all their bills PAID with a
+matching SUCCESS payment, the beds held by current admissions are marked
+OCCUPIED, and the derived tables (Room.free_beds, ward occupancy,
+analytics rollups) are rebuilt at the end.
+
+Every chunk draws from its own random.Random seeded with (seed, kind,
+chunk number), so a seed always produces the same rows whether the
+chunks run in this process or spread over ``workers`` processes.
+"""
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from django.utils import timezone
+
+from caching import resource_versions
+from clinical.models import Appointment, Department, LabReport, MedicalRecord
+from facility.billing import room_charge_for, stay_days, total_for
+from facility.models import Admission, Bed, Bill, Payment, Room, Staff, StaffAssignment
+from users.models import Doctor, Patient, User
+
+SIZES = {
+    'small': {
+        'departments': 5, 'rooms_per_department': 4, 'beds_per_room': 4,
+        'doctors': 20, 'staff': 15, 'patients': 200, 'appointments': 1000,
+        'admissions': 150, 'lab_reports': 500, 'medical_records': 400, 'staff_assignments': 200,
+    },
+    'medium': {
+        'departments': 12, 'rooms_per_department': 10, 'beds_per_room': 6,
+        'doctors': 150, 'staff': 300, 'patients': 5000, 'appointments': 30000,
+        'admissions': 4000, 'lab_reports': 15000, 'medical_records': 12000, 'staff_assignments': 6000,
+    },
+    'large': {
+        'departments': 30, 'rooms_per_department': 40, 'beds_per_room': 6,
+        'doctors': 2000, 'staff': 5000, 'patients': 300000, 'appointments': 2000000,
+        'admissions': 250000, 'lab_reports': 800000, 'medical_records': 600000, 'staff_assignments': 300000,
+    },
+}
+SPECIALIZATIONS = ['Cardiology', 'Neurology', 'Orthopedics', 'Pediatrics', 'Oncology', 'General Medicine']
+# (type, share of rooms, charge per day)
+ROOM_TYPES = [('GENERAL', 60, 500), ('PRIVATE', 25, 1500), ('ICU', 15, 4000)]
+LAB_TESTS = {'CBC': 150, 'Lipid Panel': 400, 'Thyroid': 600, 'X-Ray': 900, 'CT Scan': 3500, 'MRI': 6000}
+DIAGNOSES = [
+    ('Viral fever', 'Rest and fluids'), ('Hypertension', 'Amlodipine 5mg'),
+    ('Type 2 diabetes', 'Metformin 500mg'), ('Fracture', 'Cast for six weeks'),
+    ('Migraine', 'Sumatriptan as needed'), ('Pneumonia', 'Antibiotics course'),
+]
+LAST_NAMES = ['Shah', 'Patel', 'Rao', 'Iyer', 'Das', 'Khan', 'Singh', 'Menon', 'Joshi', 'Gupta']
+CITIES = ['Pune', 'Mumbai', 'Surat', 'Delhi', 'Ahmedabad', 'Chennai']
+PASSWORD = 'bench-password'
+
+# Per-process state for the chunk functions; set by HospitalSeeder or the pool initializer
+_context = {}
+
+
+def _set_context(context):
+    _context.clear()
+    _context.update(context)
+
+
+def _rng(kind, number):
+    return random.Random(f"{_context['seed']}:{kind}:{number}")
+
+
+@contextmanager
+def explicit_dates(model, names):
+    """Makes bulk_create keep the given values of auto_now_add fields instead of now()."""
+    fields = [model._meta.get_field(name) for name in names]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _create(model, objects, dates=()):
+    with explicit_dates(model, dates):
+        return model.objects.bulk_create(objects, batch_size=_context['batch_size'])
+
+
+def length_of_stay(rng):
+    """Days in hospital: log-normal, median about three days, long tail capped at 90."""
+    return min(90, int(rng.lognormvariate(math.log(3), 0.8)))
+
+
+def _user_chunk(role, number, start, size):
+    rng = _rng(role, number)
+    prefix = _context['prefix']
+    name = role.lower()
+    return [
+        User(
+            username=f'{prefix}_{name}_{i}', email=f'{prefix}_{name}_{i}@example.com',
+            first_name=f'{role.title()}{i}', last_name=rng.choice(LAST_NAMES),
+            role=role, password=_context['password'], is_active=True,
+        )
+        for i in range(start, start + size)
+    ], rng
+
+
+def doctors_chunk(number, start, size):
+    users, rng = _user_chunk('DOCTOR', number, start, size)
+    users = _create(User, users)
+    doctors = _create(Doctor, [
+        Doctor(
+            user_id=user.pk, dept_id=rng.choice(_context['departments']),
+            specialization=rng.choice(SPECIALIZATIONS), experience=rng.randint(1, 35),
+            charges=rng.choice([300, 500, 800, 1200]), qualification=rng.choice(['MBBS', 'MD', 'MS', 'DNB']),
+            joining_date=(_context['now'] - timedelta(days=rng.randint(30, 6000))).date(),
+        )
+        for user in users
+    ])
+    return [(doctor.pk, doctor.user_id, doctor.dept_id) for doctor in doctors]
+
+
+def staff_chunk(number, start, size):
+    users, rng = _user_chunk('STAFF', number, start, size)
+    users = _create(User, users)
+    staff = _create(Staff, [
+        Staff(user_id=user.pk, dept_id=rng.choice(_context['departments']), salary=rng.randrange(20000, 90000, 500))
+        for user in users
+    ])
+    return [(member.pk, member.user_id, member.dept_id) for member in staff]
+
+
+def patients_chunk(number, start, size):
+    users, rng = _user_chunk('PATIENT', number, start, size)
+    users = _create(User, users)
+    today = _context['now'].date()
+    patients = []
+    for i, user in enumerate(users, start=start):
+        age = min(99, int(rng.triangular(0, 99, 38)))
+        patients.append(Patient(
+            user_id=user.pk, gender=rng.choices(['MALE', 'FEMALE', 'OTHER'], weights=[49, 49, 2])[0],
+            age=age, birth_date=today - timedelta(days=age * 365 + rng.randint(0, 364)),
+            blood_group=rng.choices(['O+', 'B+', 'A+', 'AB+', 'O-', 'B-', 'A-', 'AB-'], weights=[37, 32, 22, 7, 1, 1, 0.5, 0.5])[0],
+            address=f'{rng.randint(1, 999)} Main Road', city=rng.choice(CITIES), phone=f'9{i:09d}',
+        ))
+    patients = _create(Patient, patients)
+    return [(patient.pk, patient.user_id) for patient in patients]
+
+
+def appointments_chunk(number, start, size):
+    rng = _rng('appointments', number)
+    now = _context['now']
+    appointments = []
+    for _ in range(size):
+        # A year back, a month ahead, on half hour slots in working hours
+        day = now.date() + timedelta(days=rng.randint(-365, 30))
+        if day.weekday() == 6 and rng.random() < 0.8:
+            day -= timedelta(days=1)
+        when = timezone.make_aware(datetime(day.year, day.month, day.day, rng.randint(9, 16), rng.choice([0, 30])))
+        if when < now:
+            status = rng.choices(['COMPLETED', 'EXPIRED', 'CANCELLED'], weights=[82, 8, 10])[0]
+        else:
+            status = rng.choices(['PENDING', 'APPROVED', 'CANCELLED'], weights=[45, 50, 5])[0]
+        appointments.append(Appointment(
+            patient_id=rng.choice(_context['patients']), doctor_id=rng.choice(_context['doctors']),
+            appointment_date=when, status=status,
+        ))
+    _create(Appointment, appointments)
+    return size
+
+
+def _bills_and_payments(rng, admissions, paid):
+    """One bill per admission; ``paid(admission)`` decides its status. PAID bills get their payments."""
+    charges = _context['room_charges']
+    now = _context['now']
+    bills = []
+    for admission in admissions:
+        room_charge = room_charge_for(admission.total_days, charges[admission.room_id])
+        staff_charge = Decimal(rng.choice([0, 200, 500, 1000, 2500]))
+        tax = ((room_charge + staff_charge) * Decimal('0.05')).quantize(Decimal('0.01'))
+        bills.append(Bill(
+            patient_id=admission.patient_id, admission_id=admission.pk,
+            room_charge=room_charge, staff_charge=staff_charge, tax=tax,
+            total_amount=total_for(room_charge, staff_charge, tax),
+            days=max(admission.total_days, 1),
+            status='PAID' if paid(admission) else 'UNPAID',
+            created_at=admission.discharge_date or now,
+        ))
+    bills = _create(Bill, bills, dates=['created_at'])
+
+    payments = []
+    for bill in bills:
+        if bill.status != 'PAID':
+            continue
+        method = rng.choices(['CARD', 'UPI', 'CASH', 'INSURANCE'], weights=[35, 35, 15, 15])[0]
+        paid_at = min(bill.created_at + timedelta(hours=rng.randint(0, 48)), now)
+        if rng.random() < 0.08:
+            payments.append(Payment(
+                bill_id=bill.pk, total_amount=bill.total_amount, payment_method=method,
+                payment_status='FAILED', payment_date=paid_at - timedelta(minutes=rng.randint(1, 30)),
+            ))
+        payments.append(Payment(
+            bill_id=bill.pk, total_amount=bill.total_amount, payment_method=method,
+            payment_status='SUCCESS', payment_date=paid_at,
+        ))
+    _create(Payment, payments, dates=['payment_date'])
+    return bills
+
+
+def _admission(rng, bed, admit_date, discharge_date):
+    bed_id, room_id = bed
+    return Admission(
+        patient_id=rng.choice(_context['patients']), doctor_id=rng.choice(_context['doctors']),
+        room_id=room_id, bed_id=bed_id if discharge_date is None else None,
+        admit_date=admit_date, discharge_date=discharge_date,
+        status='ADMITTED' if discharge_date is None else 'DISCHARGED',
+        total_days=stay_days(admit_date, discharge_date or _context['now']),
+    )
+
+
+def discharged_admissions_chunk(number, start, size):
+    rng = _rng('admissions', number)
+    now = _context['now']
+    admissions = []
+    for _ in range(size):
+        days = length_of_stay(rng)
+        discharge_date = now - timedelta(days=rng.randint(1, 365), hours=rng.randint(0, 23))
+        admit_date = discharge_date - timedelta(days=days, hours=rng.randint(1, 12))
+        admissions.append(_admission(rng, rng.choice(_context['beds']), admit_date, discharge_date))
+    admissions = _create(Admission, admissions, dates=['admit_date'])
+    # Admission.clean() does not allow a discharge with unpaid bills
+    _bills_and_payments(rng, admissions, paid=lambda admission: True)
+    return size
+
+
+def lab_reports_chunk(number, start, size):
+    rng = _rng('lab_reports', number)
+    tests = list(LAB_TESTS)
+    reports = []
+    for _ in range(size):
+        test = rng.choices(tests, weights=[30, 20, 15, 20, 10, 5])[0]
+        reports.append(LabReport(
+            patient_id=rng.choice(_context['patients']), doctor_id=rng.choice(_context['doctors']),
+            report_type=test, lab_charge=LAB_TESTS[test],
+            result=rng.choices(['Normal', 'Borderline', 'Abnormal, follow up advised'], weights=[70, 20, 10])[0],
+            report_date=_context['now'] - timedelta(days=rng.randint(0, 365), hours=rng.randint(0, 23)),
+        ))
+    _create(LabReport, reports, dates=['report_date'])
+    return size
+
+
+def medical_records_chunk(number, start, size):
+    rng = _rng('medical_records', number)
+    records = []
+    for _ in range(size):
+        diagnosis, treatment = rng.choice(DIAGNOSES)
+        records.append(MedicalRecord(
+            patient_id=rng.choice(_context['patients']), doctor_id=rng.choice(_context['doctors']),
+            diagnosis=diagnosis, treatment=treatment,
+            record_date=_context['now'] - timedelta(days=rng.randint(0, 365), hours=rng.randint(0, 23)),
+        ))
+    _create(MedicalRecord, records, dates=['record_date'])
+    return size
+
+
+def staff_assignments_chunk(number, start, size):
+    rng = _rng('staff_assignments', number)
+    if not _context['staff']:
+        return 0
+    procedures = [choice for choice, _ in StaffAssignment.ProcedureType.choices]
+    outcomes = [choice for choice, _ in StaffAssignment.OutcomeStatus.choices]
+    _create(StaffAssignment, [
+        StaffAssignment(
+            staff_id=rng.choice(_context['staff']), patient_id=rng.choice(_context['patients']),
+            procedure_type=rng.choices(procedures, weights=[55, 10, 15, 20])[0],
+            outcome_status=rng.choices(outcomes, weights=[45, 35, 5, 15])[0],
+            assigned_date=_context['now'] - timedelta(days=rng.randint(0, 365), hours=rng.randint(0, 23)),
+        )
+        for _ in range(size)
+    ], dates=['assigned_date'])
+    return size
+
+
+def _run_chunk(task):
+    function, number, start, size = task
+    with transaction.atomic():
+        return function(number, start, size)
+
+
+def _init_worker(context):
+    import django
+    django.setup()
+    _set_context(context)
+
+
+class HospitalSeeder:
+    """
+    Builds a consistent hospital from ``counts`` (see SIZES). ``prefix``
+    keeps usernames and emails unique across runs into one database, and
+    ``workers`` > 1 spreads the bulk chunks over that many processes.
+    """
+    def __init__(self, counts, seed=0, prefix='bench', batch_size=2000, workers=1, log=None):
+        self.counts = counts
+        self.seed = seed
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.workers = workers
+        self.log = log or (lambda message: None)
+        self.random = random.Random(seed)
+        self.context = {
+            'seed': seed, 'prefix': prefix, 'batch_size': batch_size,
+            'now': timezone.now(), 'password': make_password(PASSWORD),
+        }
+        # Ids handed back to callers, e.g. to pick benchmark targets
+        self.ids = {}
+
+    def run(self):
+        self.seed_departments()
+        self.seed_users()
+        self.seed_rooms()
+        self.seed_current_admissions()
+        self.run_chunks([
+            (discharged_admissions_chunk, self.counts['admissions'] - len(self.ids['current_admissions'])),
+            (appointments_chunk, self.counts['appointments']),
+            (lab_reports_chunk, self.counts['lab_reports']),
+            (medical_records_chunk, self.counts['medical_records']),
+            (staff_assignments_chunk, self.counts['staff_assignments']),
+        ])
+        self.rebuild_derived()
+        return self.ids
+
+    def run_chunks(self, jobs):
+        """Runs (chunk function, rows) jobs in batch_size chunks; returns each job's results in order."""
+        tasks, owners = [], []
+        for job, (function, total) in enumerate(jobs):
+            for number, start in enumerate(range(0, max(total, 0), self.batch_size)):
+                tasks.append((function, number, start, min(self.batch_size, total - start)))
+                owners.append(job)
+        for function, total in jobs:
+            self.log(f"{function.__name__.replace('_chunk', '')}: {max(total, 0)} row(s)")
+
+        _set_context(self.context)
+        if self.workers > 1 and len(tasks) > 1:
+            # Children must open their own connections
+            connections.close_all()
+            with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.context,)) as executor:
+                outputs = list(executor.map(_run_chunk, tasks))
+        else:
+            outputs = [_run_chunk(task) for task in tasks]
+
+        results = [[] for _ in jobs]
+        for job, output in zip(owners, outputs):
+            results[job].append(output)
+        return results
+
+    def seed_departments(self):
+        names = len(SPECIALIZATIONS)
+        departments = Department.objects.bulk_create([
+            Department(name=SPECIALIZATIONS[i % names] + (f' {i // names + 1}' if i >= names else ''), floor=i % 8)
+            for i in range(self.counts['departments'])
+        ])
+        self.ids['departments'] = self.context['departments'] = [department.pk for department in departments]
+
+    def seed_users(self):
+        admins = User.objects.bulk_create([User(
+            username=f'{self.prefix}_admin_0', email=f'{self.prefix}_admin_0@example.com',
+            first_name='Admin', last_name='User', role='ADMIN', password=self.context['password'],
+        )])
+        self.ids['admins'] = [user.pk for user in admins]
+
+        doctors, staff, patients = self.run_chunks([
+            (doctors_chunk, self.counts['doctors']),
+            (staff_chunk, self.counts['staff']),
+            (patients_chunk, self.counts['patients']),
+        ])
+        doctors = [row for chunk in doctors for row in chunk]
+        staff = [row for chunk in staff for row in chunk]
+        patients = [row for chunk in patients for row in chunk]
+        self.ids['doctors'] = self.context['doctors'] = [pk for pk, _, _ in doctors]
+        self.ids['doctor_users'] = [user_id for _, user_id, _ in doctors]
+        self.ids['staff'] = self.context['staff'] = [pk for pk, _, _ in staff]
+        self.ids['patients'] = self.context['patients'] = [pk for pk, _ in patients]
+        self.ids['patient_users'] = [user_id for _, user_id in patients]
+
+        # Each department is headed by its first doctor
+        heads = {}
+        for pk, _, dept_id in doctors:
+            heads.setdefault(dept_id, pk)
+        Department.objects.bulk_update(
+            [Department(pk=dept_id, hod_id=doctor_id) for dept_id, doctor_id in heads.items() if dept_id],
+            ['hod'], batch_size=self.batch_size,
+        )
+
+    def seed_rooms(self):
+        room_types = [room_type for room_type, _, _ in ROOM_TYPES]
+        weights = [share for _, share, _ in ROOM_TYPES]
+        charges = {room_type: charge for room_type, _, charge in ROOM_TYPES}
+        rooms = []
+        for dept_id in self.ids['departments']:
+            for number in range(self.counts['rooms_per_department']):
+                room_type = self.random.choices(room_types, weights=weights)[0]
+                rooms.append(Room(dept_id=dept_id, room_number=f'{dept_id}-{number}', type=room_type, room_charge=charges[room_type]))
+        rooms = Room.objects.bulk_create(rooms, batch_size=self.batch_size)
+        self.context['room_charges'] = {room.pk: room.room_charge for room in rooms}
+
+        beds = Bed.objects.bulk_create([
+            Bed(room_id=room.pk, bed_number=str(number))
+            for room in rooms for number in range(self.counts['beds_per_room'])
+        ], batch_size=self.batch_size)
+        self.context['beds'] = [(bed.pk, bed.room_id) for bed in beds]
+
+    def seed_current_admissions(self):
+        """Patients in hospital now: about 75% bed occupancy, one bed each."""
+        _set_context(self.context)
+        beds = list(self.context['beds'])
+        self.random.shuffle(beds)
+        count = min(int(len(beds) * 0.75), self.counts['admissions'])
+        rng = _rng('current_admissions', 0)
+        now = self.context['now']
+
+        admissions = []
+        for bed in beds[:count]:
+            # Everyone admitted in the last weeks who has not left yet
+            admit_date = now - timedelta(days=min(length_of_stay(rng), 30), hours=rng.randint(0, 23))
+            admissions.append(_admission(rng, bed, admit_date, None))
+
+        with transaction.atomic():
+            admissions = _create(Admission, admissions, dates=['admit_date'])
+            Bed.objects.filter(pk__in=[admission.bed_id for admission in admissions]).update(status='OCCUPIED')
+            # Half have settled their interim bill and could be discharged now
+            bills = _bills_and_payments(rng, admissions, paid=lambda admission: rng.random() < 0.5)
+
+        self.ids['current_admissions'] = [admission.pk for admission in admissions]
+        self.ids['settled_admissions'] = [bill.admission_id for bill in bills if bill.status == 'PAID']
+
+    def rebuild_derived(self):
+        from analytics import rollups
+        from clinical import search
+        from facility import occupancy
+        from facility.services import recount_free_beds
+        from users import lookup
+
+        self.log("Rebuilding free beds, ward occupancy, analytics rollups and the search indexes")
+        recount_free_beds()
+        occupancy.rebuild()
+        rollups.rebuild()
+        search.rebuild_index()
+        lookup.rebuild_index()
+        # The reference data was bulk created, which bumps no versions
+        resource_versions.bump(Department, Doctor, User, Room, Bed)
@@ -0,0 +1,123 @@
+"""
+Many slow clients against the WSGI and the ASGI entry points.
+
+A server spends most of a slow client's request waiting on the network:
+reading the request in and trickling the response out. Both runs simulate
+that wait with ``latency`` seconds before the request reaches Django and
+``latency`` more after the response leaves it.
+
+Under WSGI the waits happen inside a fixed pool of worker threads, as in a
+threaded WSGI server, so clients queue for a free worker. Under ASGI they
+are awaited in the receive and send callables and the event loop serves
+other clients meanwhile. Every client sends its requests one after another.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory
+
+from benchmarks.harness import summarize
+
+
+def run_wsgi(path, tokens, clients=100, requests=5, latency=0.1, workers=8):
+    handler = WSGIHandler()
+    factory = RequestFactory()
+    lock = threading.Lock()
+    samples = []
+
+    def serve(token):
+        environ = factory.get(path, HTTP_AUTHORIZATION=f'Token {token}').environ
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split()[0]))
+
+        time.sleep(latency)
+        response = handler(environ, start_response)
+        try:
+            for _ in response:
+                pass
+            time.sleep(latency)
+        finally:
+            # Sends request_finished, which releases the database connection
+            response.close()
+        return statuses[0]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def client(index):
+            token = tokens[index % len(tokens)]
+            for _ in range(requests):
+                started = perf_counter()
+                status = pool.submit(serve, token).result()
+                with lock:
+                    samples.append((perf_counter() - started, None, status))
+
+        started = perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as client_threads:
+            list(client_threads.map(client, range(clients)))
+        duration = perf_counter() - started
+    return summarize(samples, duration)
+
+
+def run_asgi(path, tokens, clients=100, requests=5, latency=0.1):
+    application = ASGIHandler()
+    path, _, query = path.partition('?')
+    samples = []
+
+    async def serve(token):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Token {token}'.encode())],
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+        received = False
+        finished = asyncio.Event()
+        statuses = []
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                await asyncio.sleep(latency)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # Django listens for a disconnect while the view runs
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+            elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                await asyncio.sleep(latency)
+                finished.set()
+
+        await application(scope, receive, send)
+        return statuses[0]
+
+    async def client(index):
+        token = tokens[index % len(tokens)]
+        for _ in range(requests):
+            started = perf_counter()
+            status = await serve(token)
+            samples.append((perf_counter() - started, None, status))
+
+    async def main():
+        await asyncio.gather(*(client(index) for index in range(clients)))
+
+    started = perf_counter()
+    asyncio.run(main())
+    return summarize(samples, perf_counter() - started)
@@ -0,0 +1,57 @@
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from caching import list_cache, resource_versions
+from query_assertions import assert_all_list_query_counts, list_endpoint_urls
+from users.models import User
+from .harness import summarize
+from .seed import HospitalSeeder
+
+COUNTS = {
+    'departments': 2, 'rooms_per_department': 2, 'beds_per_room': 3,
+    'doctors': 4, 'staff': 3, 'patients': 20, 'appointments': 60,
+    'admissions': 12, 'lab_reports': 40, 'medical_records': 40, 'staff_assignments': 10,
+}
+
+
+class ListQueryCountTests(TestCase):
+    """Every list endpoint costs the same number of queries whatever the page size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        HospitalSeeder(COUNTS, seed=1, batch_size=50).run()
+
+    def setUp(self):
+        # Cached pages would make the later page sizes look cheaper
+        list_cache.local.clear()
+        resource_versions.local.clear()
+
+    def client_for(self, role):
+        client = APIClient()
+        client.force_authenticate(User.objects.filter(role=role).order_by('pk').first())
+        return client
+
+    def assert_lists_for(self, role):
+        client = self.client_for(role)
+        urls = [url for url in list_endpoint_urls() if client.get(url).status_code == 200]
+        self.assertTrue(urls, f"No list endpoint is open to {role}")
+        counts = assert_all_list_query_counts(client, urls=urls)
+        self.assertEqual(set(counts), set(urls))
+
+    def test_admin(self):
+        self.assert_lists_for('ADMIN')
+
+    def test_staff(self):
+        self.assert_lists_for('STAFF')
+
+    def test_patient(self):
+        self.assert_lists_for('PATIENT')
+
+
+class SummarizeTests(SimpleTestCase):
+    """A scenario that got nothing but error responses is marked failed."""
+
+    def test_only_errors_fail_the_scenario(self):
+        self.assertTrue(summarize([(0.01, 2, 403)] * 3, 1.0)['failed'])
+        self.assertFalse(summarize([(0.01, 2, 403), (0.01, 2, 200)], 1.0)['failed'])
+        self.assertFalse(summarize([], 1.0)['failed'])
@@ -0,0 +1,227 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+
+class LRUCache:
+    """
+    Small thread-safe in-process LRU cache with a per-entry time to live.
+    ``ttl=None`` keeps entries until they are evicted.
+    """
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires = item
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResourceVersions:
+    """
+    Version stamps for whole resources (every Department, every Bed, ...),
+    used as HTTP validators by mixins.ConditionalGetMixin and in the keys of
+    mixins.CachedListMixin.
+
+    A stamp is a random token plus the time it was made, and bump() replaces
+    it whenever a row of the model changes. When ``alias`` names a CACHES
+    entry, stamps are read from that shared cache on every request, so a
+    bump on one worker is seen by all of them at once. Without one they live
+    in an in-process LRU, and another worker notices a change once its
+    stamp expires after ``ttl`` seconds. A stamp that cannot be found is
+    made afresh, so losing one only costs clients a full response.
+    """
+    def __init__(self, alias=None, ttl=60):
+        self.alias = alias
+        self.local = LRUCache(maxsize=256, ttl=ttl)
+
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    @staticmethod
+    def key(model):
+        return f'resource-version:{model._meta.label_lower}'
+
+    @staticmethod
+    def stamp():
+        return secrets.token_hex(8), time.time()
+
+    def get(self, model):
+        """(token, unix time) of the model's current version."""
+        return self.get_many([model])[0]
+
+    def get_many(self, models):
+        """get() for several models, in one round trip to the shared cache."""
+        keys = [self.key(model) for model in models]
+        shared = self.shared()
+        if shared is None:
+            versions = []
+            for key in keys:
+                version = self.local.get(key)
+                if version is None:
+                    version = self.stamp()
+                    self.local.set(key, version)
+                versions.append(version)
+            return versions
+
+        found = shared.get_many(keys)
+        for key in keys:
+            if key not in found:
+                # add() so that workers racing to make the first stamp agree
+                shared.add(key, self.stamp(), None)
+                found[key] = shared.get(key) or self.stamp()
+        return [found[key] for key in keys]
+
+    def bump(self, *models):
+        """Gives the models new versions once the current transaction commits."""
+        transaction.on_commit(lambda: self._bump(models))
+
+    def _bump(self, models):
+        shared = self.shared()
+        for model in models:
+            key = self.key(model)
+            token, modified = self.stamp()
+            previous = shared.get(key) if shared is not None else self.local.get(key)
+            if previous is not None:
+                # Last-Modified has whole seconds; two changes must not share one
+                modified = max(modified, int(previous[1]) + 1)
+            version = (token, modified)
+            if shared is not None:
+                shared.set(key, version, None)
+            else:
+                self.local.set(key, version)
+
+    def track(self, *models):
+        """Bumps each model's version whenever one of its rows is saved or deleted."""
+        def changed(sender, **kwargs):
+            self.bump(sender)
+
+        for model in models:
+            label = model._meta.label_lower
+            post_save.connect(changed, sender=model, weak=False, dispatch_uid=f'resource_version_{label}_save')
+            post_delete.connect(changed, sender=model, weak=False, dispatch_uid=f'resource_version_{label}_delete')
+
+
+resource_versions = ResourceVersions(
+    alias=getattr(settings, 'RESOURCE_VERSION_CACHE_ALIAS', None),
+    ttl=getattr(settings, 'RESOURCE_VERSION_TTL', 60),
+)
+
+
+class ListCache:
+    """
+    Serialized list pages kept by mixins.CachedListMixin.
+
+    Entries live in an in-process LRU, or in the CACHES entry named by
+    ``alias`` when one is given. Keys contain the resource versions of every
+    model the page was built from, so a change to any of them makes the old
+    entries unreachable and they simply age out. Hits and misses are counted
+    per view for /api/_perf/.
+    """
+    def __init__(self, alias=None, maxsize=2048, ttl=300):
+        self.alias = alias
+        self.ttl = ttl
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def backend(self):
+        return caches[self.alias] if self.alias else self.local
+
+    def _count(self, view, hit):
+        with self.lock:
+            counts = self.counts.setdefault(view, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def get(self, view, key):
+        value = self.backend().get(key)
+        self._count(view, value is not None)
+        return value
+
+    async def aget(self, view, key):
+        backend = self.backend()
+        value = await backend.aget(key) if self.alias else backend.get(key)
+        self._count(view, value is not None)
+        return value
+
+    def set(self, key, value):
+        if self.alias:
+            caches[self.alias].set(key, value, self.ttl)
+        else:
+            self.local.set(key, value)
+
+    async def aset(self, key, value):
+        if self.alias:
+            await caches[self.alias].aset(key, value, self.ttl)
+        else:
+            self.local.set(key, value)
+
+    def stats(self):
+        with self.lock:
+            counts = {view: list(pair) for view, pair in self.counts.items()}
+
+        def summary(hits, misses):
+            total = hits + misses
+            return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 3) if total else None}
+
+        return {
+            'backend': self.alias or 'local',
+            'entries': None if self.alias else len(self.local),
+            **summary(sum(hits for hits, _ in counts.values()), sum(misses for _, misses in counts.values())),
+            'views': {view: summary(*pair) for view, pair in sorted(counts.items())},
+        }
+
+    def reset_stats(self):
+        with self.lock:
+            self.counts.clear()
+
+
+list_cache = ListCache(
+    alias=getattr(settings, 'LIST_CACHE_ALIAS', None),
+    maxsize=getattr(settings, 'LIST_CACHE_SIZE', 2048),
+    ttl=getattr(settings, 'LIST_CACHE_TTL', 300),
+)
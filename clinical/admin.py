@@ -4,16 +4,20 @@ from .models import Department, Appointment, MedicalRecord, LabReport
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
     list_display = ('name', 'floor', 'hod')
+    list_select_related = ('hod__user',)
 
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
     list_display = ('patient', 'doctor', 'appointment_date', 'status')
+    list_select_related = ('patient__user', 'doctor__user')
     list_filter = ('status', 'appointment_date')
 
 @admin.register(MedicalRecord)
 class MedicalRecordAdmin(admin.ModelAdmin):
     list_display = ('patient', 'doctor', 'record_date')
+    list_select_related = ('patient__user', 'doctor__user')
 
 @admin.register(LabReport)
 class LabReportAdmin(admin.ModelAdmin):
     list_display = ('patient', 'doctor', 'report_type', 'report_date')
+    list_select_related = ('patient__user', 'doctor__user')
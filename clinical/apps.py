@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ClinicalConfig(AppConfig):
     name = 'clinical'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,24 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from clinical import search
+
+
+class Command(BaseCommand):
+    help = "Rewrite the full-text search index of medical records and lab reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help="Records read and index entries written per batch.",
+        )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        counts = search.rebuild_index(batch_size=options['batch_size'])
+        for kind, count in counts.items():
+            self.stdout.write(f"{kind}: {count} entr{'y' if count == 1 else 'ies'}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt the {search.backend_name()} index in {perf_counter() - started:.1f} s"
+        ))
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from clinical.services import sweep_overdue_appointments
+from clinical.tasks import sweep_appointments
+
+
+class Command(BaseCommand):
+    help = "Expire overdue PENDING appointments and complete overdue APPROVED ones in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-hours', type=int, default=24,
+            help="Size of each appointment_date window updated in one statement.",
+        )
+        parser.add_argument(
+            '--enqueue', action='store_true',
+            help="Queue the sweep for the job worker instead of running it here.",
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = sweep_appointments.enqueue(chunk_hours=options['chunk_hours'])
+            self.stdout.write(self.style.SUCCESS(f"Queued sweep as job {job.pk}"))
+            return
+
+        report = sweep_overdue_appointments(chunk=timedelta(hours=options['chunk_hours']))
+
+        for new_status, count in report['updated'].items():
+            self.stdout.write(
+                f"{new_status}: {count} appointment(s) in {report['timings'][new_status] * 1000:.1f} ms"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Swept {report['total']} appointment(s) in {report['chunks']} chunk(s), "
+            f"{report['elapsed'] * 1000:.1f} ms total"
+        ))
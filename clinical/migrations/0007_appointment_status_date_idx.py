@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0006_remove_labreport_created_by'),
+        ('users', '0010_alter_patient_gender'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'appointment_date'], name='appointment_status_date_idx'),
+        ),
+    ]
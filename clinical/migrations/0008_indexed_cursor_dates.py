@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0007_appointment_status_date_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='appointment_date',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='labreport',
+            name='report_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='medicalrecord',
+            name='record_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
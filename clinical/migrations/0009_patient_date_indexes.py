@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0008_indexed_cursor_dates'),
+        ('users', '0010_alter_patient_gender'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'appointment_date'], name='appointment_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labreport',
+            index=models.Index(fields=['patient', 'report_date'], name='labreport_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicalrecord',
+            index=models.Index(fields=['patient', 'record_date'], name='record_patient_date_idx'),
+        ),
+    ]
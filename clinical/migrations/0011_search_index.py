@@ -0,0 +1,91 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_TABLE = 'clinical_searchentry_fts'
+
+
+def fts5_available(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_text_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX searchentry_body_tsv_idx ON clinical_searchentry "
+            "USING gin (to_tsvector('english', body))"
+        )
+    elif connection.vendor == 'sqlite' and fts5_available(connection):
+        # External content table: the text lives in clinical_searchentry only
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(body, content='clinical_searchentry', "
+            f"content_rowid='id', tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON clinical_searchentry BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON clinical_searchentry BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.id, old.body); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON clinical_searchentry BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.id, old.body); "
+            f"INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body); END"
+        )
+
+
+def drop_text_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS searchentry_body_tsv_idx")
+    elif connection.vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0010_appointment_doctor_date_idx'),
+        ('users', '0010_alter_patient_gender'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('medical_record', 'Medical record'), ('lab_report', 'Lab report')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('date', models.DateTimeField()),
+                ('body', models.TextField()),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.doctor')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.patient')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('count', models.PositiveIntegerField()),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='clinical.searchentry')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='searchentry_kind_object_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term', 'entry'], name='searchterm_term_entry_idx'),
+        ),
+        migrations.RunPython(create_text_index, drop_text_index),
+    ]
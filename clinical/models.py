@@ -15,10 +15,17 @@ class Department(models.Model):
 class Appointment(models.Model):
     patient = models.ForeignKey('users.Patient', on_delete=models.CASCADE, related_name='appointments')
     doctor = models.ForeignKey('users.Doctor', on_delete=models.CASCADE, related_name='appointments',blank=True, null=True)
-    appointment_date = models.DateTimeField()
+    appointment_date = models.DateTimeField(db_index=True)
     updated_date = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, default='PENDING')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'appointment_date'], name='appointment_status_date_idx'),
+            models.Index(fields=['patient', 'appointment_date'], name='appointment_patient_date_idx'),
+            models.Index(fields=['doctor', 'appointment_date'], name='appointment_doctor_date_idx'),
+        ]
+
     def is_past_due(self):
         return self.appointment_date < timezone.now() and self.status in ['PENDING', 'APPROVED']
 
@@ -46,9 +53,14 @@ class MedicalRecord(models.Model):
     doctor = models.ForeignKey('users.Doctor', on_delete=models.CASCADE, related_name='medical_records')
     diagnosis = models.TextField()
     treatment = models.TextField()
-    record_date = models.DateTimeField(auto_now_add=True)
+    record_date = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'record_date'], name='record_patient_date_idx'),
+        ]
+
     def __str__(self):
         return f"Record for {self.patient} by {self.doctor}"
 
@@ -58,8 +70,51 @@ class LabReport(models.Model):
     doctor = models.ForeignKey('users.Doctor', on_delete=models.CASCADE, related_name='lab_reports')
     report_type = models.CharField(max_length=100)
     result = models.TextField()
-    report_date = models.DateTimeField(auto_now_add=True)
+    report_date = models.DateTimeField(auto_now_add=True, db_index=True)
     lab_charge = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'report_date'], name='labreport_patient_date_idx'),
+        ]
+
     def __str__(self):
         return f"Lab Report: {self.report_type} for {self.patient}"
+
+# SearchEntry model
+class SearchEntry(models.Model):
+    """
+    One searchable document per medical record or lab report, kept in step
+    by clinical.signals. The full-text index over ``body`` depends on the
+    database; see clinical.search.
+    """
+    KIND_CHOICES = [
+        ('medical_record', 'Medical record'),
+        ('lab_report', 'Lab report'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    patient = models.ForeignKey('users.Patient', on_delete=models.CASCADE, related_name='+')
+    doctor = models.ForeignKey('users.Doctor', on_delete=models.CASCADE, related_name='+')
+    date = models.DateTimeField()
+    body = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchentry_kind_object_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id}"
+
+# SearchTerm model
+class SearchTerm(models.Model):
+    """Postings of the inverted index used when the database has no full-text search."""
+    entry = models.ForeignKey(SearchEntry, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=64)
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'entry'], name='searchterm_term_entry_idx'),
+        ]
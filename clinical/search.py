@@ -0,0 +1,226 @@
+"""
+Full-text search over medical records and lab reports.
+
+Every record has a SearchEntry, written by clinical.signals on save (and in
+bulk by rebuild_index()). Which index answers a query depends on the
+database:
+
+- SQLite with FTS5: an external-content FTS5 table over SearchEntry that
+  triggers keep in step, ranked with bm25().
+- PostgreSQL: a GIN index on to_tsvector('english', body), ranked with
+  ts_rank().
+- Anything else: SearchTerm postings written from Python, ranked by tf-idf.
+
+Migration 0011 creates the FTS5 table or the GIN index where it can. All
+backends match documents that contain every word of the query.
+"""
+import math
+import re
+from collections import Counter
+
+from django.db import connections, router, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, When
+
+from .models import LabReport, MedicalRecord, SearchEntry, SearchTerm
+
+FTS_TABLE = 'clinical_searchentry_fts'
+WORD_RE = re.compile(r'\w+')
+MAX_LIMIT = 100
+
+# kind -> (model, date field, text fields)
+SOURCES = {
+    'medical_record': (MedicalRecord, 'record_date', ('diagnosis', 'treatment')),
+    'lab_report': (LabReport, 'report_date', ('report_type', 'result')),
+}
+KIND_BY_MODEL = {model: kind for kind, (model, _, _) in SOURCES.items()}
+
+
+def tokenize(text):
+    return [word for word in WORD_RE.findall(text.lower()) if len(word) <= 64]
+
+
+def entry_for(kind, values):
+    """Unsaved SearchEntry for a record given as a dict of its fields."""
+    _, date_field, text_fields = SOURCES[kind]
+    return SearchEntry(
+        kind=kind,
+        object_id=values['id'],
+        patient_id=values['patient_id'],
+        doctor_id=values['doctor_id'],
+        date=values[date_field],
+        body='\n'.join(values[field] or '' for field in text_fields),
+    )
+
+
+class FTS5Backend:
+    name = 'sqlite_fts5'
+
+    def index(self, entries):
+        # The triggers on clinical_searchentry keep the FTS table in step
+        pass
+
+    def search(self, connection, words, filters, params, limit):
+        match = ' '.join('"%s"' % word.replace('"', '""') for word in words)
+        where = ''.join(f' AND e.{column} = %s' for column in filters)
+        sql = (
+            f'SELECT e.id, -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'JOIN {SearchEntry._meta.db_table} e ON e.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s{where} ORDER BY bm25({FTS_TABLE}) LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [match, *params, limit])
+            return cursor.fetchall()
+
+
+class PostgresBackend:
+    name = 'postgres'
+
+    def index(self, entries):
+        # The GIN index is maintained by PostgreSQL itself
+        pass
+
+    def search(self, connection, words, filters, params, limit):
+        where = ''.join(f' AND e.{column} = %s' for column in filters)
+        sql = (
+            f"SELECT e.id, ts_rank(to_tsvector('english', e.body), query) AS score "
+            f"FROM {SearchEntry._meta.db_table} e, plainto_tsquery('english', %s) query "
+            f"WHERE to_tsvector('english', e.body) @@ query{where} ORDER BY score DESC LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [' '.join(words), *params, limit])
+            return cursor.fetchall()
+
+
+class TermBackend:
+    name = 'terms'
+
+    def index(self, entries):
+        if any(entry.pk is None for entry in entries):
+            # bulk_create could not return the primary keys on this database
+            saved = SearchEntry.objects.filter(
+                kind__in={entry.kind for entry in entries},
+                object_id__in=[entry.object_id for entry in entries],
+            )
+            keys = {(entry.kind, entry.object_id) for entry in entries}
+            entries = [entry for entry in saved if (entry.kind, entry.object_id) in keys]
+        SearchTerm.objects.filter(entry__in=entries).delete()
+        SearchTerm.objects.bulk_create([
+            SearchTerm(entry=entry, term=term, count=count)
+            for entry in entries
+            for term, count in Counter(tokenize(entry.body)).items()
+        ], batch_size=2000)
+
+    def search(self, connection, words, filters, params, limit):
+        words = sorted(set(words))
+        postings = SearchTerm.objects.using(connection.alias).filter(term__in=words)
+        document_frequency = dict(postings.values_list('term').annotate(Count('entry')).order_by())
+        if len(document_frequency) < len(words):
+            return []
+        total = SearchEntry.objects.using(connection.alias).count()
+        weights = [
+            When(term=word, then=F('count') * math.log(1 + total / document_frequency[word]))
+            for word in words
+        ]
+
+        for column, value in zip(filters, params):
+            postings = postings.filter(**{f'entry__{column}': value})
+        rows = (
+            postings
+            .values('entry')
+            .annotate(
+                matched=Count('term', distinct=True),
+                score=Sum(Case(*weights, output_field=FloatField())),
+            )
+            .filter(matched=len(words))
+            .order_by('-score', 'entry')
+            .values_list('entry', 'score')[:limit]
+        )
+        return list(rows)
+
+
+_backends = {}
+
+
+def get_backend(connection):
+    backend = _backends.get(connection.alias)
+    if backend is None:
+        if connection.vendor == 'postgresql':
+            backend = PostgresBackend()
+        elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            backend = FTS5Backend()
+        else:
+            backend = TermBackend()
+        _backends[connection.alias] = backend
+    return backend
+
+
+def backend_name():
+    return get_backend(connections[router.db_for_read(SearchEntry)]).name
+
+
+def index_object(instance):
+    """Creates or refreshes the SearchEntry of a saved record."""
+    kind = KIND_BY_MODEL[type(instance)]
+    fresh = entry_for(kind, instance.__dict__)
+    entry, _ = SearchEntry.objects.update_or_create(
+        kind=kind, object_id=instance.pk,
+        defaults={field: getattr(fresh, field) for field in ('patient_id', 'doctor_id', 'date', 'body')},
+    )
+    get_backend(connections[router.db_for_write(SearchEntry)]).index([entry])
+
+
+def remove_object(instance):
+    SearchEntry.objects.filter(kind=KIND_BY_MODEL[type(instance)], object_id=instance.pk).delete()
+
+
+def rebuild_index(batch_size=2000):
+    """Rewrites every SearchEntry from the records. Returns the count per kind."""
+    connection = connections[router.db_for_write(SearchEntry)]
+    backend = get_backend(connection)
+    counts = {}
+    with transaction.atomic(using=connection.alias):
+        # Plain DELETEs: the ORM would load every entry to cascade to its terms
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SearchTerm._meta.db_table}')
+            cursor.execute(f'DELETE FROM {SearchEntry._meta.db_table}')
+        for kind, (model, date_field, text_fields) in SOURCES.items():
+            rows = (
+                model.objects
+                .order_by('pk')
+                .values('id', 'patient_id', 'doctor_id', date_field, *text_fields)
+                .iterator(chunk_size=batch_size)
+            )
+            counts[kind] = 0
+            batch = []
+            for row in rows:
+                batch.append(entry_for(kind, row))
+                if len(batch) == batch_size:
+                    backend.index(SearchEntry.objects.bulk_create(batch))
+                    counts[kind] += len(batch)
+                    batch = []
+            if batch:
+                backend.index(SearchEntry.objects.bulk_create(batch))
+                counts[kind] += len(batch)
+    return counts
+
+
+def search(query, patient=None, kind=None, limit=20):
+    """
+    SearchEntries containing every word of ``query``, best match first, as
+    (entry, score) pairs. ``patient`` limits the results to that patient.
+    """
+    words = tokenize(query)
+    if not words:
+        return []
+    filters, params = [], []
+    if patient is not None:
+        filters.append('patient_id')
+        params.append(getattr(patient, 'pk', patient))
+    if kind is not None:
+        filters.append('kind')
+        params.append(kind)
+
+    connection = connections[router.db_for_read(SearchEntry)]
+    rows = get_backend(connection).search(connection, words, filters, params, min(limit, MAX_LIMIT))
+    entries = SearchEntry.objects.using(connection.alias).in_bulk([pk for pk, _ in rows])
+    return [(entries[pk], score) for pk, score in rows if pk in entries]
@@ -1,22 +1,47 @@
 from rest_framework import serializers
-from .models import Department, Appointment, MedicalRecord, LabReport
+from mixins import SparseFieldsetMixin
+from .models import Department, Appointment, MedicalRecord, LabReport, SearchEntry
 
-class DepartmentSerializer(serializers.ModelSerializer):
+class DepartmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Department
         fields = '__all__'
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = '__all__'
 
-class MedicalRecordSerializer(serializers.ModelSerializer):
+class SlotSearchSerializer(serializers.Serializer):
+    specialization = serializers.CharField(required=False)
+    dept = serializers.PrimaryKeyRelatedField(queryset=Department.objects.all(), required=False)
+    count = serializers.IntegerField(required=False, default=5, min_value=1, max_value=50)
+    after = serializers.DateTimeField(required=False)
+
+class FreeSlotSerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    doctor = serializers.IntegerField()
+
+class MedicalRecordSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = MedicalRecord
         fields = '__all__'
 
-class LabReportSerializer(serializers.ModelSerializer):
+class LabReportSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = LabReport
         fields = '__all__'
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField()
+    kind = serializers.ChoiceField(choices=SearchEntry.KIND_CHOICES, required=False)
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+
+class SearchResultSerializer(serializers.Serializer):
+    kind = serializers.CharField()
+    id = serializers.IntegerField(source='object_id')
+    patient = serializers.IntegerField(source='patient_id')
+    doctor = serializers.IntegerField(source='doctor_id')
+    date = serializers.DateTimeField()
+    text = serializers.CharField(source='body')
+    score = serializers.FloatField()
@@ -0,0 +1,64 @@
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from events.feed import record_rows
+from .models import Appointment
+
+# Status an overdue appointment moves to, keyed by its current status
+OVERDUE_TRANSITIONS = {
+    'PENDING': 'EXPIRED',
+    'APPROVED': 'COMPLETED',
+}
+
+
+def _oldest_overdue(status, now):
+    # Index seek on (status, appointment_date)
+    return (
+        Appointment.objects
+        .filter(status=status, appointment_date__lt=now)
+        .order_by('appointment_date')
+        .values_list('appointment_date', flat=True)
+        .first()
+    )
+
+
+def sweep_overdue_appointments(now=None, chunk=timedelta(days=1)):
+    """
+    Bulk version of Appointment.update_overdue_status().
+
+    Each status transition is applied with one UPDATE per appointment_date
+    window of size ``chunk``, so every statement stays short and the sweep
+    can safely run again (or concurrently) at any time.
+    """
+    now = now or timezone.now()
+    started = time.monotonic()
+    report = {'chunks': 0, 'updated': {}, 'timings': {}}
+
+    for old_status, new_status in OVERDUE_TRANSITIONS.items():
+        status_started = time.monotonic()
+        updated = 0
+        window_start = _oldest_overdue(old_status, now)
+
+        while window_start is not None:
+            window_end = min(window_start + chunk, now)
+            window = Appointment.objects.filter(
+                appointment_date__gte=window_start,
+                appointment_date__lt=window_end,
+            )
+            updated += window.filter(status=old_status).update(status=new_status, updated_date=now)
+            # The rows this statement changed are the only ones stamped with ``now``
+            record_rows(Appointment, queryset=window.filter(status=new_status, updated_date=now))
+            report['chunks'] += 1
+            if window_end >= now:
+                break
+            # Jump straight to the next overdue row so gaps cost nothing
+            window_start = _oldest_overdue(old_status, now)
+
+        report['updated'][new_status] = updated
+        report['timings'][new_status] = time.monotonic() - status_started
+
+    report['total'] = sum(report['updated'].values())
+    report['elapsed'] = time.monotonic() - started
+    return report
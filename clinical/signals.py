@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from caching import resource_versions
+from . import search
+from .models import Appointment, Department, LabReport, MedicalRecord
+from .slots import FREEING_STATUSES, slot_index
+
+
+def _slot_state(appointment):
+    fields = appointment.__dict__
+    if fields.get('status') in FREEING_STATUSES:
+        return None, None
+    return fields.get('doctor_id'), fields.get('appointment_date')
+
+
+@receiver(post_init, sender=Appointment)
+def track_slot(sender, instance, **kwargs):
+    instance._tracked_slot = _slot_state(instance) if instance.pk else (None, None)
+
+
+@receiver(post_save, sender=Appointment)
+def update_slot_index_on_save(sender, instance, created, **kwargs):
+    old = (None, None) if created else instance._tracked_slot
+    new = _slot_state(instance)
+    if old != new:
+        if None not in old:
+            slot_index.remove(*old)
+        if None not in new:
+            slot_index.add(*new)
+    instance._tracked_slot = new
+
+
+@receiver(post_delete, sender=Appointment)
+def update_slot_index_on_delete(sender, instance, **kwargs):
+    state = _slot_state(instance)
+    if None not in state:
+        slot_index.remove(*state)
+
+
+@receiver(post_save, sender=MedicalRecord)
+@receiver(post_save, sender=LabReport)
+def index_record(sender, instance, **kwargs):
+    search.index_object(instance)
+
+
+@receiver(post_delete, sender=MedicalRecord)
+@receiver(post_delete, sender=LabReport)
+def unindex_record(sender, instance, **kwargs):
+    search.remove_object(instance)
+
+
+resource_versions.track(Department)
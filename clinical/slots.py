@@ -0,0 +1,180 @@
+"""
+Doctor availability and slot search.
+
+Every appointment occupies one fixed-length slot starting at its
+appointment_date. SlotIndex keeps, per doctor, the sorted start times of
+the blocking appointments in the booking horizon, so "is this slot free"
+is a bisect instead of a query. The index is per process: signals keep it
+current for local writes and entries are reloaded after SLOT_INDEX_TTL
+seconds to pick up other workers' bookings. Booking itself always
+re-checks the database under a lock, so a stale index can only suggest a
+slot that is then rejected, never double-book one.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import Doctor
+from .models import Appointment
+
+# Appointments in these states no longer hold their slot
+FREEING_STATUSES = ('CANCELLED', 'EXPIRED')
+
+
+def slot_length():
+    return timedelta(minutes=getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 30))
+
+
+def horizon():
+    return timedelta(days=getattr(settings, 'APPOINTMENT_HORIZON_DAYS', 28))
+
+
+class SlotUnavailable(ValidationError):
+    pass
+
+
+class SlotIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._schedules = {}
+
+    def _expired(self, loaded_at):
+        return time.monotonic() - loaded_at > getattr(settings, 'SLOT_INDEX_TTL', 60)
+
+    def load(self, doctor_ids):
+        """Makes sure the given doctors are indexed, with one query for all missing ones."""
+        with self._lock:
+            missing = [
+                doctor_id for doctor_id in doctor_ids
+                if doctor_id not in self._schedules or self._expired(self._schedules[doctor_id][0])
+            ]
+        if not missing:
+            return
+
+        now = timezone.now()
+        booked = {doctor_id: [] for doctor_id in missing}
+        rows = (
+            Appointment.objects
+            .filter(
+                doctor_id__in=missing,
+                appointment_date__gt=now - slot_length(),
+                appointment_date__lt=now + horizon() + slot_length(),
+            )
+            .exclude(status__in=FREEING_STATUSES)
+            .values_list('doctor_id', 'appointment_date')
+        )
+        for doctor_id, start in rows:
+            booked[doctor_id].append(start)
+
+        loaded_at = time.monotonic()
+        with self._lock:
+            for doctor_id, starts in booked.items():
+                self._schedules[doctor_id] = (loaded_at, sorted(starts))
+
+    def add(self, doctor_id, start):
+        with self._lock:
+            if doctor_id in self._schedules:
+                bisect.insort(self._schedules[doctor_id][1], start)
+
+    def remove(self, doctor_id, start):
+        with self._lock:
+            if doctor_id in self._schedules:
+                starts = self._schedules[doctor_id][1]
+                position = bisect.bisect_left(starts, start)
+                if position < len(starts) and starts[position] == start:
+                    del starts[position]
+
+    def is_free(self, doctor_id, start):
+        length = slot_length()
+        with self._lock:
+            starts = self._schedules.get(doctor_id, (0, []))[1]
+            # Any booking starting within one slot length either side overlaps
+            position = bisect.bisect_right(starts, start - length)
+            return position == len(starts) or starts[position] >= start + length
+
+    def clear(self):
+        with self._lock:
+            self._schedules.clear()
+
+
+slot_index = SlotIndex()
+
+
+def candidate_starts(after, until):
+    """Slot start times inside working hours between ``after`` and ``until``."""
+    length = slot_length()
+    day_start = getattr(settings, 'APPOINTMENT_DAY_START', 9)
+    day_end = getattr(settings, 'APPOINTMENT_DAY_END', 17)
+    local_after = timezone.localtime(after)
+    day = local_after.date()
+
+    while True:
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=day_start))
+        end_of_day = timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=day_end))
+        while start + length <= end_of_day:
+            if start >= until:
+                return
+            if start >= after:
+                yield start
+            start += length
+        day += timedelta(days=1)
+
+
+def find_free_slots(specialization=None, dept=None, count=5, after=None):
+    """
+    The next ``count`` free (start, doctor_id) pairs among available doctors,
+    optionally narrowed by specialization and department, earliest first.
+    """
+    now = timezone.now()
+    after = max(after or now, now)
+    doctors = Doctor.objects.filter(is_available=True)
+    if specialization:
+        doctors = doctors.filter(specialization__iexact=specialization)
+    if dept:
+        doctors = doctors.filter(dept=dept)
+    doctor_ids = sorted(doctors.values_list('pk', flat=True))
+    if not doctor_ids:
+        return []
+
+    slot_index.load(doctor_ids)
+    slots = []
+    for start in candidate_starts(after, now + horizon()):
+        for doctor_id in doctor_ids:
+            if slot_index.is_free(doctor_id, start):
+                slots.append((start, doctor_id))
+                if len(slots) == count:
+                    return slots
+    return slots
+
+
+@contextmanager
+def reserve_slot(doctor, start, exclude=None):
+    """
+    Holds a per-doctor lock while the body creates or moves the appointment.
+
+    Raises SlotUnavailable if another blocking appointment of the doctor
+    overlaps ``start``; ``exclude`` is the pk of the appointment being
+    moved, which never clashes with itself. On databases with row locks the
+    doctor row is locked FOR UPDATE; SQLite serialises writers on its own.
+    """
+    length = slot_length()
+    with transaction.atomic():
+        Doctor.objects.select_for_update().filter(pk=doctor.pk).values_list('pk', flat=True).first()
+        clash = (
+            Appointment.objects
+            .filter(doctor=doctor, appointment_date__gt=start - length, appointment_date__lt=start + length)
+            .exclude(status__in=FREEING_STATUSES)
+            .exclude(pk=exclude)
+            .exists()
+        )
+        if clash:
+            raise SlotUnavailable({'appointment_date': f"Dr. {doctor.pk} is already booked around {start:%Y-%m-%d %H:%M}."})
+        yield
+
@@ -0,0 +1,12 @@
+from datetime import timedelta
+
+from jobs.queue import task
+
+from .services import sweep_overdue_appointments
+
+
+@task('clinical.sweep_appointments', max_attempts=3)
+def sweep_appointments(chunk_hours=24):
+    """Expires overdue PENDING appointments and completes overdue APPROVED ones."""
+    report = sweep_overdue_appointments(chunk=timedelta(hours=chunk_hours))
+    return {'updated': report['updated'], 'total': report['total']}
@@ -1,3 +1,110 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from users.models import Doctor, Patient, User
+from .models import Appointment, Department
+from .services import sweep_overdue_appointments
+from .views import AppointmentViewSet
+
+
+class AppointmentOverlapTests(TestCase):
+    """Moving or reopening an appointment cannot double-book the doctor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        dept = Department.objects.create(name='Cardiology', floor=1)
+        cls.doctor_user = User.objects.create_user(username='doc', email='d@example.com', password='x', role='DOCTOR')
+        cls.doctor = Doctor.objects.create(user=cls.doctor_user, dept=dept, specialization='Cardiology', experience=3)
+        user = User.objects.create_user(username='patient', email='p@example.com', password='x', role='PATIENT')
+        cls.patient = Patient.objects.create(
+            user=user, gender='MALE', blood_group='A+', address='1 Main Road', city='Pune', phone='9000000000',
+        )
+        cls.start = (timezone.now() + timedelta(days=2)).replace(hour=10, minute=0, second=0, microsecond=0)
+        cls.booked = Appointment.objects.create(patient=cls.patient, doctor=cls.doctor, appointment_date=cls.start)
+        cls.other = Appointment.objects.create(
+            patient=cls.patient, doctor=cls.doctor, appointment_date=cls.start + timedelta(hours=2),
+        )
+
+    def patch(self, appointment, data):
+        # No role passes both of the viewset's permissions, so they are lifted here
+        view = AppointmentViewSet.as_view({'patch': 'partial_update'}, permission_classes=[])
+        request = APIRequestFactory().patch(f'/api/clinical/appointments/{appointment.pk}/', data, format='json')
+        force_authenticate(request, self.doctor_user)
+        return view(request, pk=appointment.pk)
+
+    def test_moving_onto_a_booked_slot_is_rejected(self):
+        response = self.patch(self.other, {'appointment_date': (self.start + timedelta(minutes=15)).isoformat()})
+        self.assertEqual(response.status_code, 400)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.appointment_date, self.start + timedelta(hours=2))
+
+    def test_an_appointment_does_not_clash_with_itself(self):
+        response = self.patch(self.booked, {'appointment_date': (self.start + timedelta(minutes=15)).isoformat()})
+        self.assertEqual(response.status_code, 200)
+
+    def test_reopening_a_cancelled_appointment_checks_the_slot(self):
+        Appointment.objects.filter(pk=self.booked.pk).update(status='CANCELLED')
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, appointment_date=self.start)
+
+        client = APIClient()
+        client.force_authenticate(self.doctor_user)
+        response = client.patch(
+            f'/api/clinical/appointments/{self.booked.pk}/update_status/', {'status': 'APPROVED'}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.booked.refresh_from_db()
+        self.assertEqual(self.booked.status, 'CANCELLED')
+
+
+class SweepOverdueTests(TestCase):
+    """Overdue appointments move on, window by window; the rest are left alone."""
+
+    @classmethod
+    def setUpTestData(cls):
+        dept = Department.objects.create(name='Cardiology', floor=1)
+        user = User.objects.create_user(username='doc', email='d@example.com', password='x', role='DOCTOR')
+        doctor = Doctor.objects.create(user=user, dept=dept, specialization='Cardiology', experience=3)
+        user = User.objects.create_user(username='patient', email='p@example.com', password='x', role='PATIENT')
+        patient = Patient.objects.create(
+            user=user, gender='MALE', blood_group='A+', address='1 Main Road', city='Pune', phone='9000000000',
+        )
+        cls.now = timezone.now()
+        cls.appointments = {}
+        for name, status, hours in [
+            ('pending_old', 'PENDING', -120), ('pending_recent', 'PENDING', -1),
+            ('approved_old', 'APPROVED', -96), ('approved_recent', 'APPROVED', -30),
+            ('cancelled', 'CANCELLED', -72), ('completed', 'COMPLETED', -48),
+            ('pending_future', 'PENDING', 24), ('approved_future', 'APPROVED', 26),
+        ]:
+            appointment = Appointment.objects.create(
+                patient=patient, doctor=doctor, appointment_date=cls.now + timedelta(hours=200 + hours),
+            )
+            # Moved into place directly, past the booking checks
+            Appointment.objects.filter(pk=appointment.pk).update(
+                status=status, appointment_date=cls.now + timedelta(hours=hours),
+            )
+            cls.appointments[name] = appointment.pk
+
+    def statuses(self):
+        by_pk = dict(Appointment.objects.values_list('pk', 'status'))
+        return {name: by_pk[pk] for name, pk in self.appointments.items()}
+
+    def test_sweep_spans_several_chunks(self):
+        report = sweep_overdue_appointments(now=self.now, chunk=timedelta(hours=12))
+        self.assertGreater(report['chunks'], 2)
+        self.assertEqual(report['updated'], {'EXPIRED': 2, 'COMPLETED': 2})
+        self.assertEqual(self.statuses(), {
+            'pending_old': 'EXPIRED', 'pending_recent': 'EXPIRED',
+            'approved_old': 'COMPLETED', 'approved_recent': 'COMPLETED',
+            'cancelled': 'CANCELLED', 'completed': 'COMPLETED',
+            'pending_future': 'PENDING', 'approved_future': 'APPROVED',
+        })
+        swept = set(Appointment.objects.filter(updated_date=self.now).values_list('pk', flat=True))
+        self.assertEqual(swept, {self.appointments[name] for name in (
+            'pending_old', 'pending_recent', 'approved_old', 'approved_recent',
+        )})
 
-# Create your tests here.
+        self.assertEqual(sweep_overdue_appointments(now=self.now, chunk=timedelta(hours=12))['total'], 0)
@@ -1,9 +1,11 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .views import (
     AppointmentViewSet,
     LabReportViewSet,
     DepartmentViewSet,
-    MedicalRecordViewSet
+    MedicalRecordViewSet,
+    SearchView,
 )
 
 router = DefaultRouter()
@@ -12,5 +14,7 @@ router.register('lab-reports', LabReportViewSet)
 router.register('departments', DepartmentViewSet)
 router.register('medical-records', MedicalRecordViewSet)
 
-urlpatterns = router.urls
+urlpatterns = [
+    path('search/', SearchView.as_view()),
+] + router.urls
 
@@ -2,19 +2,33 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from .models import Appointment, LabReport, Department, MedicalRecord
+from users.models import Doctor
 from .serializers import (
     AppointmentSerializer,
     LabReportSerializer,
     DepartmentSerializer,
-    MedicalRecordSerializer
+    MedicalRecordSerializer,
+    SlotSearchSerializer,
+    FreeSlotSerializer,
+    SearchQuerySerializer,
+    SearchResultSerializer,
 )
+from . import search
+from .slots import FREEING_STATUSES, SlotUnavailable, find_free_slots, reserve_slot
 from permissions import IsPatient, IsDoctor, IsAdmin, IsStaffOrDoctor
+from pagination import TimeCursorPagination
+from mixins import AsyncReadMixin, ConditionalGetMixin, QueryPlannerMixin
 
-class AppointmentViewSet(ModelViewSet):
+class AppointmentViewSet(AsyncReadMixin, QueryPlannerMixin, ModelViewSet):
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
     permission_classes = [IsAdmin,IsPatient]
+    pagination_class = TimeCursorPagination
+    cursor_ordering = ('-appointment_date', '-id')
     
     def get_permissions(self):
         if self.action == 'create':
@@ -24,7 +38,37 @@ class AppointmentViewSet(ModelViewSet):
         return super().get_permissions()
 
     def perform_create(self, serializer):
-        serializer.save(patient=self.request.user.patient_profile)
+        doctor = serializer.validated_data.get('doctor')
+        if doctor is None:
+            serializer.save(patient=self.request.user.patient_profile)
+            return
+        try:
+            with reserve_slot(doctor, serializer.validated_data['appointment_date']):
+                serializer.save(patient=self.request.user.patient_profile)
+        except SlotUnavailable as e:
+            raise ValidationError(e.message_dict)
+
+    def perform_update(self, serializer):
+        appointment = serializer.instance
+        doctor = serializer.validated_data.get('doctor', appointment.doctor)
+        status_value = serializer.validated_data.get('status', appointment.status)
+        if doctor is None or status_value in FREEING_STATUSES:
+            serializer.save()
+            return
+        start = serializer.validated_data.get('appointment_date', appointment.appointment_date)
+        try:
+            with reserve_slot(doctor, start, exclude=appointment.pk):
+                serializer.save()
+        except SlotUnavailable as e:
+            raise ValidationError(e.message_dict)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def slots(self, request):
+        params = SlotSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        slots = find_free_slots(**params.validated_data)
+        data = [{'start': start, 'doctor': doctor_id} for start, doctor_id in slots]
+        return Response(FreeSlotSerializer(data, many=True).data)
 
     @action(detail=True, methods=['patch'], permission_classes=[IsDoctor])
     def update_status(self, request, pk=None):
@@ -32,14 +76,25 @@ class AppointmentViewSet(ModelViewSet):
         status_value = request.data.get('status')
 
         if status_value in ['APPROVED', 'COMPLETED', 'CANCELLED']:
+            reopens = appointment.status in FREEING_STATUSES and status_value not in FREEING_STATUSES
             appointment.status = status_value
-            appointment.save()
+            if reopens and appointment.doctor_id:
+                # A cancelled appointment's slot may have been booked since
+                try:
+                    with reserve_slot(appointment.doctor, appointment.appointment_date, exclude=appointment.pk):
+                        appointment.save()
+                except SlotUnavailable as e:
+                    return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+            else:
+                appointment.save()
             return Response({'message': 'Status updated'})
         return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
 
-class LabReportViewSet(ModelViewSet):
+class LabReportViewSet(AsyncReadMixin, QueryPlannerMixin, ModelViewSet):
     queryset = LabReport.objects.all()
     serializer_class = LabReportSerializer
+    pagination_class = TimeCursorPagination
+    cursor_ordering = ('-report_date', '-id')
 
     def get_permissions(self):
         if self.action == 'create':
@@ -47,10 +102,11 @@ class LabReportViewSet(ModelViewSet):
         return super().get_permissions()
 
     def get_queryset(self):
+        queryset = super().get_queryset()
         user = self.request.user
         if user.role == 'PATIENT':
-            return LabReport.objects.filter(patient=user.patient_profile)
-        return LabReport.objects.all()
+            return queryset.filter(patient=user.patient_profile)
+        return queryset
 
     def perform_create(self, serializer):
         if self.request.user.role == 'DOCTOR':
@@ -58,14 +114,18 @@ class LabReportViewSet(ModelViewSet):
         else:
             serializer.save()
 
-class DepartmentViewSet(ModelViewSet):
+class DepartmentViewSet(ConditionalGetMixin, QueryPlannerMixin, ModelViewSet):
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
     permission_classes = [IsAdmin]
+    # hod is set to NULL without a signal when the doctor is deleted
+    version_models = (Department, Doctor)
 
-class MedicalRecordViewSet(ModelViewSet):
+class MedicalRecordViewSet(AsyncReadMixin, QueryPlannerMixin, ModelViewSet):
     queryset = MedicalRecord.objects.all()
     serializer_class = MedicalRecordSerializer
+    pagination_class = TimeCursorPagination
+    cursor_ordering = ('-record_date', '-id')
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -73,10 +133,38 @@ class MedicalRecordViewSet(ModelViewSet):
         return super().get_permissions()
 
     def get_queryset(self):
+        queryset = super().get_queryset()
         user = self.request.user
         if user.role == 'PATIENT':
-            return MedicalRecord.objects.filter(patient=user.patient_profile)
-        return MedicalRecord.objects.all()
+            return queryset.filter(patient=user.patient_profile)
+        return queryset
 
     def perform_create(self, serializer):
-        serializer.save(doctor=self.request.user.doctor_profile)
\ No newline at end of file
+        serializer.save(doctor=self.request.user.doctor_profile)
+
+class SearchView(APIView):
+    """
+    GET ?q=<words>[&kind=medical_record|lab_report][&limit=N]
+
+    Medical records and lab reports containing every word, best match first.
+    Patients only find their own, as in the list endpoints.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        patient = request.user.patient_profile if request.user.role == 'PATIENT' else None
+        results = search.search(
+            params.validated_data['q'],
+            patient=patient,
+            kind=params.validated_data.get('kind'),
+            limit=params.validated_data['limit'],
+        )
+        for entry, score in results:
+            entry.score = score
+        return Response({
+            'query': params.validated_data['q'],
+            'backend': search.backend_name(),
+            'results': SearchResultSerializer([entry for entry, _ in results], many=True).data,
+        })
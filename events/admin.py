@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Event
+
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    list_display = ('seq', 'at', 'model', 'action', 'object_id')
+    list_filter = ('model', 'action')
+    readonly_fields = ('seq', 'at', 'model', 'action', 'object_id', 'data')
@@ -0,0 +1,105 @@
+"""
+Change feed of beds, admissions, appointments and bills.
+
+Every committed create, update or delete of a tracked row appends an Event
+whose ``seq`` orders the feed. Clients load the current state once from the
+REST endpoints and then follow /api/events/?after=<seq> for the deltas.
+
+Events are written after the change commits (transaction.on_commit), in a
+short transaction of their own, so a rolled back change never shows up in
+the feed. Sequence numbers can still become visible slightly out of order
+when two writers commit at the same moment, so read_events() holds back
+everything after a gap until the gap is EVENT_SETTLE_SECONDS old.
+
+Saves and deletes are picked up by events.signals. Code that writes with
+queryset.update() or bulk_* calls record_rows() itself.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from clinical.models import Appointment
+from facility.models import Admission, Bed, Bill
+from .models import Event
+
+TRACKED = {Bed: 'bed', Admission: 'admission', Appointment: 'appointment', Bill: 'bill'}
+MODEL_NAMES = sorted(TRACKED.values())
+
+
+class FeedGap(Exception):
+    """The events after the client's position were pruned; it has to reload."""
+
+
+def row_data(instance):
+    return {field.attname: field.value_from_object(instance) for field in instance._meta.concrete_fields}
+
+
+def _write(events):
+    transaction.on_commit(lambda: Event.objects.bulk_create(events))
+
+
+def record(instance, action):
+    """Appends an event for ``instance`` once the current transaction commits."""
+    _write([Event(
+        model=TRACKED[type(instance)],
+        action=action,
+        object_id=instance.pk,
+        data=row_data(instance),
+    )])
+
+
+def record_rows(model, pks=None, queryset=None, action='updated', batch_size=1000):
+    """
+    Appends ``action`` events for rows changed without signals, given by
+    primary key or as a queryset. The rows are read back now, so call it
+    after the write, inside the same transaction.
+    """
+    if queryset is None:
+        queryset = model.objects.filter(pk__in=list(pks or []))
+    events = [
+        Event(model=TRACKED[model], action=action, object_id=row.pk, data=row_data(row))
+        for row in queryset.order_by('pk').iterator(chunk_size=batch_size)
+    ]
+    if events:
+        _write(events)
+    return len(events)
+
+
+def latest_seq():
+    return Event.objects.order_by('-seq').values_list('seq', flat=True).first() or 0
+
+
+def read_events(after, models=None, limit=500):
+    """
+    Events with a seq above ``after``, oldest first, that are safe to hand
+    out. Raises FeedGap when events right after ``after`` were pruned.
+    """
+    rows = list(Event.objects.filter(seq__gt=after).order_by('seq')[:limit])
+    if rows and after and rows[0].seq > after + 1 and not Event.objects.filter(seq__lte=after).exists():
+        raise FeedGap(f"Events after {after} are no longer kept.")
+
+    settle = timezone.now() - timedelta(seconds=getattr(settings, 'EVENT_SETTLE_SECONDS', 1))
+    ready = []
+    expected = after + 1
+    for event in rows:
+        if event.seq != expected and event.at > settle:
+            # An event below this one may still be committing
+            break
+        ready.append(event)
+        expected = event.seq + 1
+
+    position = ready[-1].seq if ready else after
+    if models:
+        ready = [event for event in ready if event.model in models]
+    return ready, position
+
+
+def prune(hours=None):
+    """Deletes events older than EVENT_RETENTION_HOURS. Returns the count."""
+    hours = hours or getattr(settings, 'EVENT_RETENTION_HOURS', 24)
+    cutoff = timezone.now() - timedelta(hours=hours)
+    # Always keep the newest event, so a client there is not told it fell behind
+    deleted, _ = Event.objects.filter(at__lt=cutoff, seq__lt=latest_seq()).delete()
+    return deleted
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from events import feed
+from events.tasks import prune_events
+
+
+class Command(BaseCommand):
+    help = "Delete change feed events older than EVENT_RETENTION_HOURS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, help="Keep this many hours of events instead.")
+        parser.add_argument(
+            '--enqueue', action='store_true',
+            help="Queue the prune for the job worker instead of running it here.",
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = prune_events.enqueue(hours=options['hours'])
+            self.stdout.write(self.style.SUCCESS(f"Queued prune as job {job.pk}"))
+            return
+        deleted = feed.prune(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} event(s)"))
@@ -0,0 +1,31 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+# Event model
+class Event(models.Model):
+    """
+    One create, update or delete of a tracked row (see events.feed).
+    ``seq`` numbers the events in the order they were written.
+    """
+    ACTION_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('deleted', 'Deleted'),
+    ]
+    seq = models.BigAutoField(primary_key=True)
+    at = models.DateTimeField(default=timezone.now)
+    model = models.CharField(max_length=50)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    object_id = models.BigIntegerField()
+    # The row's field values after the change (before it, for deletes)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['at'], name='event_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.model} {self.object_id} {self.action}"
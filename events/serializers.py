@@ -0,0 +1,9 @@
+from rest_framework import serializers
+from .models import Event
+
+
+class EventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Event
+        fields = ['seq', 'at', 'model', 'action', 'object_id', 'data']
+        read_only_fields = fields
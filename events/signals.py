@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+
+from facility.billing import bills_written
+from facility.models import Bill
+from . import feed
+
+
+def record_save(sender, instance, created, **kwargs):
+    feed.record(instance, 'created' if created else 'updated')
+
+
+def record_delete(sender, instance, **kwargs):
+    feed.record(instance, 'deleted')
+
+
+def record_bills(sender, bill_ids, **kwargs):
+    # bill_stay() and bill_admissions() write with update()/bulk_*
+    feed.record_rows(Bill, bill_ids)
+
+
+for model, name in feed.TRACKED.items():
+    post_save.connect(record_save, sender=model, dispatch_uid=f'event_{name}_save')
+    post_delete.connect(record_delete, sender=model, dispatch_uid=f'event_{name}_delete')
+bills_written.connect(record_bills, dispatch_uid='event_bills_written')
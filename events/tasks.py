@@ -0,0 +1,9 @@
+from jobs.queue import task
+
+from . import feed
+
+
+@task('events.prune', max_attempts=3)
+def prune_events(hours=None):
+    """Deletes events past the retention window."""
+    return {'deleted': feed.prune(hours)}
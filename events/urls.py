@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import EventFeedView
+
+urlpatterns = [
+    path('', EventFeedView.as_view()),
+]
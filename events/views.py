@@ -0,0 +1,143 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from permissions import IsStaffOrDoctor
+from . import feed
+from .serializers import EventSerializer
+
+
+class EventStreamRenderer(BaseRenderer):
+    # Only lets DRF's content negotiation accept text/event-stream;
+    # the stream itself is written by EventFeedView
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+def sse_message(event=None, data=None, event_id=None, comment=None):
+    lines = []
+    if comment is not None:
+        lines.append(f': {comment}')
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event is not None:
+        lines.append(f'event: {event}')
+    if data is not None:
+        lines.append('data: ' + json.dumps(data, cls=DjangoJSONEncoder))
+    return '\n'.join(lines) + '\n\n'
+
+
+class EventFeedView(APIView):
+    """
+    GET ?after=<seq>[&models=bed,admission,appointment,bill][&wait=<seconds>]
+
+    Changes after ``after`` (default: from now on). With
+    ``Accept: text/event-stream`` (or ?format=sse) they are streamed as
+    Server-Sent Events, each with its seq as the event id, so EventSource
+    resumes from Last-Event-ID after a reconnect. Otherwise the request
+    long-polls: it returns as soon as there are events, or after ``wait``
+    seconds with none. A client that fell behind the retained log gets 410
+    (a ``reset`` event on the stream) and should reload the full lists.
+    """
+    permission_classes = [IsStaffOrDoctor]
+    renderer_classes = [JSONRenderer, BrowsableAPIRenderer, EventStreamRenderer]
+
+    def get(self, request):
+        params = request.query_params
+        after = request.headers.get('Last-Event-ID') or params.get('after')
+        if after is not None and not after.isdigit():
+            return Response({"error": "after must be an event seq"}, status=status.HTTP_400_BAD_REQUEST)
+        models = set(filter(None, params.get('models', '').split(','))) or None
+        if models and not models <= set(feed.MODEL_NAMES):
+            return Response(
+                {"error": f"models must be among {', '.join(feed.MODEL_NAMES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        after = int(after) if after is not None else feed.latest_seq()
+
+        if request.accepted_renderer.format == 'sse':
+            stream = self.astream if isinstance(request._request, ASGIRequest) else self.stream
+            response = StreamingHttpResponse(stream(after, models), content_type='text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            # Tells nginx not to buffer the stream
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        wait = params.get('wait', '25')
+        if not wait.isdigit():
+            return Response({"error": "wait must be a number of seconds"}, status=status.HTTP_400_BAD_REQUEST)
+        deadline = time.monotonic() + min(int(wait), 60)
+        while True:
+            try:
+                events, position = feed.read_events(after, models)
+            except feed.FeedGap as e:
+                return Response({"error": str(e), "last_seq": feed.latest_seq()}, status=status.HTTP_410_GONE)
+            if events or time.monotonic() >= deadline:
+                return Response({'events': EventSerializer(events, many=True).data, 'last_seq': position})
+            after = position
+            time.sleep(getattr(settings, 'EVENT_POLL_INTERVAL', 0.5))
+
+    def messages(self, after, models):
+        """(messages, new position) for one poll of the stream."""
+        try:
+            events, position = feed.read_events(after, models)
+        except feed.FeedGap as e:
+            return [sse_message('reset', {'error': str(e), 'last_seq': feed.latest_seq()})], None
+        return [
+            sse_message(data=data, event_id=data['seq'])
+            for data in EventSerializer(events, many=True).data
+        ], position
+
+    def stream(self, after, models):
+        poll = getattr(settings, 'EVENT_POLL_INTERVAL', 0.5)
+        end = time.monotonic() + getattr(settings, 'EVENT_STREAM_SECONDS', 300)
+        idle = time.monotonic()
+        yield 'retry: 2000\n\n'
+        while time.monotonic() < end:
+            messages, after = self.messages(after, models)
+            if after is None:
+                yield from messages
+                return
+            if messages:
+                yield from messages
+                idle = time.monotonic()
+            elif time.monotonic() - idle > 15:
+                # Keeps proxies from closing a quiet connection
+                yield sse_message(comment='keep-alive')
+                idle = time.monotonic()
+            time.sleep(poll)
+
+    async def astream(self, after, models):
+        poll = getattr(settings, 'EVENT_POLL_INTERVAL', 0.5)
+        end = time.monotonic() + getattr(settings, 'EVENT_STREAM_SECONDS', 300)
+        idle = time.monotonic()
+        read = sync_to_async(self.messages)
+        yield 'retry: 2000\n\n'
+        while time.monotonic() < end:
+            messages, after = await read(after, models)
+            if after is None:
+                for message in messages:
+                    yield message
+                return
+            if messages:
+                for message in messages:
+                    yield message
+                idle = time.monotonic()
+            elif time.monotonic() - idle > 15:
+                yield sse_message(comment='keep-alive')
+                idle = time.monotonic()
+            await asyncio.sleep(poll)
@@ -4,16 +4,19 @@ from .models import Room, Bed, Admission, Bill, Payment, Staff, StaffAssignment
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
     list_display = ('room_number', 'dept', 'type', 'room_charge')
+    list_select_related = ('dept',)
     list_filter = ('type', 'dept')
 
 @admin.register(Bed)
 class BedAdmin(admin.ModelAdmin):
     list_display = ('bed_number', 'room', 'status')
+    list_select_related = ('room',)
     list_filter = ('status', 'room')
 
 @admin.register(Admission)
 class AdmissionAdmin(admin.ModelAdmin):
     list_display = ('patient', 'doctor', 'room', 'bed', 'admit_date', 'status', 'length_of_stay_display')
+    list_select_related = ('patient__user', 'doctor__user', 'room', 'bed__room')
     list_filter = ('status', 'admit_date', 'room__dept')
     search_fields = ('patient__user__first_name', 'patient__user__last_name', 'room__room_number')
     readonly_fields = ('length_of_stay_display', 'admit_date')
@@ -24,23 +27,26 @@ class AdmissionAdmin(admin.ModelAdmin):
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "bed":
-            kwargs["queryset"] = Bed.objects.filter(status="AVAILABLE")
+            kwargs["queryset"] = Bed.objects.filter(status="AVAILABLE").select_related('room')
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(Bill)
 class BillAdmin(admin.ModelAdmin):
     list_display = ('patient', 'total_amount', 'status', 'created_at')
+    list_select_related = ('patient__user',)
     list_filter = ('status',)
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('bill', 'total_amount', 'payment_date', 'payment_status')
+    list_select_related = ('bill__patient__user',)
     list_filter = ('payment_status',)
 
 @admin.register(Staff)
 class StaffAdmin(admin.ModelAdmin):
     list_display = ('get_full_name', 'salary')
+    list_select_related = ('user',)
 
     def get_full_name(self, obj):
         return obj.user.get_full_name()
@@ -51,3 +57,4 @@ class StaffAdmin(admin.ModelAdmin):
 @admin.register(StaffAssignment)
 class StaffAssignmentAdmin(admin.ModelAdmin):
     list_display = ('staff', 'patient', 'assigned_date')
+    list_select_related = ('staff__user', 'patient__user')
@@ -0,0 +1,200 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from caching import resource_versions
+from events.feed import record_rows
+from .models import Admission, Bill
+
+# Sent with ``bill_ids`` after run_billing bulk-writes bills, since
+# bulk_update/bulk_create do not fire post_save.
+bills_written = Signal()
+
+# What the engine writes; staff_charge and tax stay as entered on the bill
+BILL_CHARGE_FIELDS = ['days', 'room_charge', 'total_amount']
+
+
+def to_decimal(value):
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value or 0))
+
+
+def stay_days(admit_date, until):
+    """Billable days between two datetimes, counting both ends (minimum 1)."""
+    return max(1, (until.date() - admit_date.date()).days + 1)
+
+
+def room_charge_for(days, price_per_day):
+    return Decimal(max(days, 1)) * to_decimal(price_per_day)
+
+
+def total_for(room_charge, staff_charge, tax):
+    return to_decimal(room_charge) + to_decimal(staff_charge) + to_decimal(tax)
+
+
+def charges_for(days, price_per_day, staff_charge=0, tax=0):
+    """(room_charge, total_amount) of a bill for ``days`` days plus its own staff charge and tax."""
+    room_charge = Decimal(days) * to_decimal(price_per_day)
+    return room_charge, total_for(room_charge, staff_charge, tax)
+
+
+def next_bill(admit_date, bills, as_of):
+    """
+    What is left to bill on a stay at ``as_of``, as (bill, days, first day).
+
+    ``bills`` are the admission's bills, oldest first. ``bill`` is the
+    latest UNPAID one, which takes the charges (None: a new bill is needed).
+    Every other bill covers its ``days`` days of the stay, so ``days`` counts
+    the days after them, starting on ``first day``.
+    """
+    unpaid = [bill for bill in bills if bill.status == 'UNPAID']
+    bill = unpaid[-1] if unpaid else None
+    covered = sum(other.days for other in bills if other is not bill)
+    first_day = admit_date.date() + timedelta(days=covered)
+    days = max(0, stay_days(admit_date, as_of) - covered)
+    return bill, days, first_day
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_billing(admissions=None, as_of=None, dry_run=False, batch_size=500):
+    """
+    Brings the bills of many admissions up to ``as_of`` at once.
+
+    For every admission (default: all ADMITTED ones with a room) the days
+    of the stay that no other bill covers are billed on the latest UNPAID
+    bill, or on a new bill when every bill is PAID (see next_bill). Each
+    batch is read with three queries and written with
+    bulk_update/bulk_create in one transaction.
+
+    Returns the ledger: one dict per admission. Nothing is written when
+    ``dry_run`` is true.
+    """
+    as_of = as_of or timezone.now()
+    if admissions is None:
+        admissions = Admission.objects.filter(status='ADMITTED')
+
+    rows = (
+        admissions
+        .filter(room__isnull=False)
+        .order_by('pk')
+        .values('pk', 'patient_id', 'admit_date', 'total_days', 'room__room_charge')
+    )
+    ledger = []
+
+    for batch in _chunks(rows.iterator(chunk_size=batch_size), batch_size):
+        bills = {}
+        existing = (
+            Bill.objects
+            .filter(admission_id__in=[row['pk'] for row in batch])
+            .order_by('created_at', 'pk')
+            .only('pk', 'admission_id', 'status', 'days', 'staff_charge', 'tax')
+        )
+        for bill in existing:
+            bills.setdefault(bill.admission_id, []).append(bill)
+
+        plans = {
+            row['pk']: next_bill(row['admit_date'], bills.get(row['pk'], []), as_of)
+            for row in batch
+        }
+
+        stays, updates, creates = [], [], []
+        for row in batch:
+            stayed = stay_days(row['admit_date'], as_of)
+            bill, days, first_day = plans[row['pk']]
+            staff_charge, tax = (bill.staff_charge, bill.tax) if bill else (0, 0)
+            room_charge, total_amount = charges_for(days, row['room__room_charge'], staff_charge, tax)
+            if bill is not None:
+                action = 'update'
+            elif days:
+                action = 'create'
+            else:
+                action = 'skip'
+
+            ledger.append({
+                'admission': row['pk'],
+                'patient': row['patient_id'],
+                'bill': bill.pk if bill else None,
+                'action': action,
+                'stay_days': stayed,
+                'from': first_day,
+                'days': days,
+                'room_charge': room_charge,
+                'staff_charge': staff_charge,
+                'tax': tax,
+                'total_amount': total_amount,
+            })
+
+            if row['total_days'] != stayed:
+                stays.append(Admission(pk=row['pk'], total_days=stayed))
+            charges = dict(days=days, room_charge=room_charge, total_amount=total_amount)
+            if action == 'update':
+                updates.append(Bill(pk=bill.pk, **charges))
+            elif action == 'create':
+                creates.append(Bill(patient_id=row['patient_id'], admission_id=row['pk'], **charges))
+
+        if dry_run:
+            continue
+
+        with transaction.atomic():
+            Admission.objects.bulk_update(stays, ['total_days'], batch_size=batch_size)
+            if stays:
+                resource_versions.bump(Admission)
+                record_rows(Admission, [stay.pk for stay in stays])
+            Bill.objects.bulk_update(updates, BILL_CHARGE_FIELDS, batch_size=batch_size)
+            created = Bill.objects.bulk_create(creates, batch_size=batch_size)
+            bill_ids = [bill.pk for bill in updates] + [bill.pk for bill in created if bill.pk]
+            if bill_ids:
+                bills_written.send(sender=Bill, bill_ids=bill_ids)
+
+        created = iter(created)
+        for entry in ledger[-len(batch):]:
+            if entry['action'] == 'create':
+                entry['bill'] = next(created).pk
+
+    return ledger
+
+
+def bill_stay(admission, bills, as_of):
+    """
+    Brings the bills of one (locked) admission up to ``as_of`` with the same
+    rules as run_billing: the days no other bill covers go on the latest
+    UNPAID bill, or on a new bill when every bill is PAID, so a discharge
+    always leaves a final bill for anything not yet billed.
+    ``bills`` are the admission's bills, oldest first; a created bill is
+    appended. Returns the bill written, or None when nothing was left.
+    """
+    if admission.room_id is None:
+        return None
+    bill, days, _ = next_bill(admission.admit_date, bills, as_of)
+    staff_charge, tax = (bill.staff_charge, bill.tax) if bill else (0, 0)
+    room_charge, total_amount = charges_for(days, admission.room.room_charge, staff_charge, tax)
+    charges = dict(days=days, room_charge=room_charge, total_amount=total_amount)
+
+    if bill is not None:
+        if all(getattr(bill, name) == value for name, value in charges.items()):
+            return bill
+        for name, value in charges.items():
+            setattr(bill, name, value)
+        Bill.objects.filter(pk=bill.pk).update(**charges)
+    elif days:
+        bill = Bill.objects.bulk_create([Bill(patient_id=admission.patient_id, admission_id=admission.pk, **charges)])[0]
+        bills.append(bill)
+    else:
+        return None
+
+    bills_written.send(sender=Bill, bill_ids=[bill.pk])
+    return bill
@@ -0,0 +1,77 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Admission, Bill, Payment
+
+# kind -> (model, date column used for the range, exported columns)
+EXPORTS = {
+    'bills': (Bill, 'created_at', [
+        'id', 'patient_id', 'admission_id', 'appointment_id', 'room_charge',
+        'staff_charge', 'tax', 'total_amount', 'status', 'created_at',
+    ]),
+    'payments': (Payment, 'payment_date', [
+        'id', 'bill_id', 'total_amount', 'payment_date', 'payment_method', 'payment_status',
+    ]),
+    'admissions': (Admission, 'admit_date', [
+        'id', 'patient_id', 'doctor_id', 'room_id', 'bed_id', 'admit_date',
+        'discharge_date', 'total_days', 'status',
+    ]),
+}
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def parse_range(start, end):
+    """Turns inclusive YYYY-MM-DD dates into an aware [start, end) datetime range."""
+    try:
+        start_day = datetime.strptime(start, '%Y-%m-%d').date()
+        end_day = datetime.strptime(end, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError("start and end must be dates in YYYY-MM-DD format")
+    if end_day < start_day:
+        raise ValueError("end must not be before start")
+    return (
+        timezone.make_aware(datetime.combine(start_day, time.min)),
+        timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min)),
+    )
+
+
+def export_rows(kind, start, end, chunk_size=2000):
+    """Row tuples for ``kind`` in [start, end), streamed from the database in chunks."""
+    model, date_field, columns = EXPORTS[kind]
+    return (
+        model.objects
+        .filter(**{f'{date_field}__gte': start, f'{date_field}__lt': end})
+        .order_by(date_field, 'pk')
+        .values_list(*columns)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+class _Line:
+    """File-like sink that hands back whatever csv.writer writes."""
+    def write(self, value):
+        return value
+
+
+def export_lines(kind, fmt, start, end, chunk_size=2000):
+    """Yields the export as text lines (CSV with a header row, or NDJSON)."""
+    columns = EXPORTS[kind][2]
+    rows = export_rows(kind, start, end, chunk_size)
+
+    if fmt == 'csv':
+        writer = csv.writer(_Line())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + '\n'
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from facility.exports import EXPORTS, FORMATS, export_lines, parse_range
+
+
+class Command(BaseCommand):
+    help = "Stream bills, payments or admissions for a date range to CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--start', required=True, help="First day, YYYY-MM-DD.")
+        parser.add_argument('--end', required=True, help="Last day (inclusive), YYYY-MM-DD.")
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help="File to write (default: stdout).")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            start, end = parse_range(options['start'], options['end'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        out = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        rows = 0
+        try:
+            for line in export_lines(options['kind'], options['format'], start, end, options['chunk_size']):
+                out.write(line)
+                rows += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        if options['output']:
+            if options['format'] == 'csv':
+                rows -= 1
+            self.stdout.write(self.style.SUCCESS(f"Wrote {rows} {options['kind']} row(s) to {options['output']}"))
@@ -0,0 +1,41 @@
+import json
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from facility.billing import run_billing
+
+
+class Command(BaseCommand):
+    help = "Recompute bills for all open admissions in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help="Bill up to this date (YYYY-MM-DD). Defaults to now.")
+        parser.add_argument('--dry-run', action='store_true', help="Compute the ledger without writing.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--json', action='store_true', help="Print the ledger as JSON.")
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['as_of']:
+            try:
+                day = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--as-of must be YYYY-MM-DD")
+            as_of = timezone.make_aware(datetime.combine(day, time.max))
+
+        started = timezone.now()
+        ledger = run_billing(as_of=as_of, dry_run=options['dry_run'], batch_size=options['batch_size'])
+        elapsed = (timezone.now() - started).total_seconds()
+
+        if options['json']:
+            self.stdout.write(json.dumps(ledger, cls=DjangoJSONEncoder, indent=2))
+
+        counts = {}
+        for entry in ledger:
+            counts[entry['action']] = counts.get(entry['action'], 0) + 1
+        summary = ", ".join(f"{action}: {count}" for action, count in sorted(counts.items())) or "nothing to bill"
+        prefix = "[dry run] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}{len(ledger)} admission(s) in {elapsed:.2f}s ({summary})"))
@@ -0,0 +1,166 @@
+import json
+import re
+import sys
+from collections import OrderedDict
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections
+
+# "(0.002) SELECT ...; args=(1,); alias=default" as written by the
+# django.db.backends logger
+LOG_LINE = re.compile(r'^\((?P<time>[\d.]+)\)\s+(?P<sql>.*?);\s+args=.*$')
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+SQLITE_USED = re.compile(r'USING (?:COVERING |INTEGER PRIMARY KEY|PRIMARY KEY)?\s*(?:INDEX\s+)?(?P<index>\w+)?')
+SQLITE_SCAN = re.compile(r'\bSCAN (?:TABLE )?(?P<table>\w+)(?P<rest>.*)$')
+PG_USED = re.compile(r'(?:Index Scan|Index Only Scan|Bitmap Index Scan)(?: Backward)? (?:using|on) (?P<index>\w+)')
+PG_SCAN = re.compile(r'Seq Scan on (?P<table>\w+)')
+WHERE_COLUMN = re.compile(r'"?(?P<table>\w+)"?\."(?P<column>\w+)"\s*(?:=|<|>|<=|>=|IN|LIKE|IS)', re.IGNORECASE)
+# Django's subquery aliases: FROM "facility_room" U0
+TABLE_ALIAS = re.compile(r'"(?P<table>\w+)"\s+(?:AS\s+)?(?P<alias>[A-Z]\d+)\b')
+
+
+def fingerprint(sql):
+    """Collapses literals so repeated queries with different values group together."""
+    return IN_LISTS.sub('(?...)', LITERALS.sub('?', sql)).strip()
+
+
+def read_queries(stream):
+    """Yields (sql, seconds or None) from Django debug logs, JSON lines or plain SQL lines."""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('sql'):
+                yield entry['sql'], entry.get('time')
+            continue
+        match = LOG_LINE.match(line)
+        if match:
+            yield match.group('sql'), float(match.group('time'))
+        elif line.split(None, 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE', 'WITH'):
+            yield line.rstrip(';'), None
+
+
+def project_indexes(connection):
+    """{index name: (table, columns)} for every non-primary-key index on our apps' tables."""
+    indexes = {}
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+        for model in apps.get_models():
+            table = model._meta.db_table
+            if table not in tables or model._meta.app_label in ('admin', 'auth', 'contenttypes', 'sessions'):
+                continue
+            for name, info in connection.introspection.get_constraints(cursor, table).items():
+                if info['index'] and not info['primary_key']:
+                    indexes[name] = (table, info['columns'])
+    return indexes
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay captured SQL through EXPLAIN and report full scans (missing indexes) "
+        "and indexes no query used. Capture logs with DB_QUERY_LOG=<path> and DEBUG on."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('logs', nargs='*', help="Query log files (default: stdin).")
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--top', type=int, default=20, help="Show this many missing-index findings.")
+        parser.add_argument('--explain', action='store_true', help="Print the EXPLAIN output of each finding.")
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        queries = OrderedDict()
+
+        streams = [open(path) for path in options['logs']] if options['logs'] else [sys.stdin]
+        try:
+            for stream in streams:
+                for sql, seconds in read_queries(stream):
+                    entry = queries.setdefault(fingerprint(sql), {'sql': sql, 'count': 0, 'time': 0.0})
+                    entry['count'] += 1
+                    entry['time'] += seconds or 0.0
+        finally:
+            for stream in streams:
+                if stream is not sys.stdin:
+                    stream.close()
+
+        if not queries:
+            raise CommandError("No queries found in the log.")
+
+        indexes = project_indexes(connection)
+        used = set()
+        findings = []
+        prefix = connection.ops.explain_query_prefix()
+
+        with connection.cursor() as cursor:
+            for key, entry in queries.items():
+                try:
+                    cursor.execute(f"{prefix} {entry['sql']}")
+                    plan = [' '.join(str(col) for col in row) for row in cursor.fetchall()]
+                except DatabaseError as e:
+                    findings.append({**entry, 'fingerprint': key, 'error': str(e), 'plan': [], 'scans': []})
+                    continue
+
+                scans = []
+                for line in plan:
+                    for pattern in (SQLITE_USED, PG_USED):
+                        for match in pattern.finditer(line):
+                            if match.group('index'):
+                                used.add(match.group('index'))
+                    pg_scan = PG_SCAN.search(line)
+                    sqlite_scan = SQLITE_SCAN.search(line)
+                    if pg_scan:
+                        scans.append(pg_scan.group('table'))
+                    elif sqlite_scan and 'USING' not in sqlite_scan.group('rest'):
+                        scans.append(sqlite_scan.group('table'))
+
+                if scans:
+                    aliases = {m.group('alias'): m.group('table') for m in TABLE_ALIAS.finditer(entry['sql'])}
+                    scans = [aliases.get(table, table) for table in scans]
+                    columns = sorted({
+                        f"{aliases.get(match.group('table'), match.group('table'))}.{match.group('column')}"
+                        for match in WHERE_COLUMN.finditer(entry['sql'].partition(' WHERE ')[2])
+                        if aliases.get(match.group('table'), match.group('table')) in scans
+                    })
+                    findings.append({**entry, 'fingerprint': key, 'plan': plan, 'scans': scans, 'columns': columns})
+
+        findings.sort(key=lambda item: (item['time'], item['count']), reverse=True)
+        unused = sorted(name for name in indexes if name not in used)
+        report = {
+            'queries': len(queries),
+            'missing': findings[:options['top']],
+            'unused': [{'index': name, 'table': indexes[name][0], 'columns': indexes[name][1]} for name in unused],
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"Replayed {len(queries)} distinct queries.\n")
+        self.stdout.write(self.style.MIGRATE_HEADING("Full scans (candidate missing indexes):"))
+        for finding in report['missing']:
+            if 'error' in finding:
+                self.stdout.write(self.style.WARNING(f"  could not explain: {finding['error']}\n    {finding['fingerprint']}"))
+                continue
+            self.stdout.write(
+                f"  x{finding['count']} {finding['time'] * 1000:.1f} ms  scans {', '.join(finding['scans'])}"
+                f"  filter columns: {', '.join(finding['columns']) or '-'}\n    {finding['fingerprint']}"
+            )
+            if options['explain']:
+                for line in finding['plan']:
+                    self.stdout.write(f"      {line}")
+        if not report['missing']:
+            self.stdout.write("  none")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Indexes unused by the replayed queries:"))
+        for item in report['unused']:
+            self.stdout.write(f"  {item['index']} on {item['table']}({', '.join(item['columns'])})")
+        if not report['unused']:
+            self.stdout.write("  none")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from facility import occupancy
+from facility.services import recount_free_beds
+
+
+class Command(BaseCommand):
+    help = "Recompute room free-bed counters and the ward occupancy table from scratch."
+
+    def handle(self, *args, **options):
+        rooms = recount_free_beds()
+        occupancy.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Recounted {rooms} room(s) and rebuilt ward occupancy."))
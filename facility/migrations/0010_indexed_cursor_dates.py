@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facility', '0009_remove_staffassignment_acuity_level'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='admission',
+            name='admit_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='bill',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='payment_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:08
+
+from django.db import migrations, models
+
+
+def count_free_beds(apps, schema_editor):
+    Room = apps.get_model('facility', 'Room')
+    Bed = apps.get_model('facility', 'Bed')
+    for room in Room.objects.all():
+        room.free_beds = Bed.objects.filter(room=room, status='AVAILABLE').count()
+        room.save(update_fields=['free_beds'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facility', '0010_indexed_cursor_dates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='free_beds',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='bed',
+            index=models.Index(fields=['status', 'room'], name='bed_status_room_idx'),
+        ),
+        migrations.RunPython(count_free_beds, migrations.RunPython.noop),
+    ]
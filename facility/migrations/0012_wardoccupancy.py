@@ -0,0 +1,59 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_occupancy(apps, schema_editor):
+    Room = apps.get_model('facility', 'Room')
+    Bed = apps.get_model('facility', 'Bed')
+    Admission = apps.get_model('facility', 'Admission')
+    WardOccupancy = apps.get_model('facility', 'WardOccupancy')
+
+    rows = {}
+    for dept_id, room_type in Room.objects.values_list('dept_id', 'type').distinct():
+        rows[(dept_id, room_type)] = WardOccupancy(dept_id=dept_id, room_type=room_type)
+
+    for dept_id, room_type, status in Bed.objects.values_list('room__dept_id', 'room__type', 'status'):
+        row = rows[(dept_id, room_type)]
+        row.total_beds += 1
+        row.occupied_beds += status == 'OCCUPIED'
+
+    admissions = Admission.objects.filter(status='ADMITTED').values_list(
+        'room__dept_id', 'room__type', 'bed__room__dept_id', 'bed__room__type', 'admit_date'
+    )
+    for dept_id, room_type, bed_dept_id, bed_room_type, admit_date in admissions:
+        row = rows.get((dept_id, room_type) if dept_id else (bed_dept_id, bed_room_type))
+        if row is not None:
+            row.current_admissions += 1
+            row.admit_day_sum += admit_date.date().toordinal()
+
+    WardOccupancy.objects.bulk_create(rows.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0008_indexed_cursor_dates'),
+        ('facility', '0011_bed_allocation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WardOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_type', models.CharField(choices=[('GENERAL', 'General'), ('PRIVATE', 'Private'), ('ICU', 'ICU')], max_length=20)),
+                ('total_beds', models.IntegerField(default=0)),
+                ('occupied_beds', models.IntegerField(default=0)),
+                ('current_admissions', models.IntegerField(default=0)),
+                ('admit_day_sum', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('dept', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='clinical.department')),
+            ],
+            options={
+                'unique_together': {('dept', 'room_type')},
+            },
+        ),
+        migrations.RunPython(build_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0009_patient_date_indexes'),
+        ('facility', '0012_wardoccupancy'),
+        ('users', '0010_alter_patient_gender'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(fields=['patient', 'admit_date'], name='admission_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['patient', 'created_at'], name='bill_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='staffassignment',
+            index=models.Index(fields=['patient', 'assigned_date'], name='assignment_patient_date_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0009_patient_date_indexes'),
+        ('facility', '0013_patient_date_indexes'),
+        ('users', '0010_alter_patient_gender'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(fields=['status', 'admit_date'], name='admission_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(condition=models.Q(('status', 'ADMITTED')), fields=['bed'], name='admission_admitted_bed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(condition=models.Q(('status', 'UNPAID')), fields=['admission'], name='bill_unpaid_admission_idx'),
+        ),
+    ]
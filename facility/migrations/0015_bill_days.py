@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-18 18:29
+
+from django.db import migrations, models
+
+
+def count_billed_days(apps, schema_editor):
+    # Earlier bills charged the whole stay at the room's daily rate
+    Bill = apps.get_model('facility', 'Bill')
+    bills = Bill.objects.filter(admission__room__room_charge__gt=0).select_related('admission__room')
+    batch = []
+    for bill in bills.iterator(chunk_size=2000):
+        bill.days = int(bill.room_charge // bill.admission.room.room_charge)
+        batch.append(bill)
+        if len(batch) == 2000:
+            Bill.objects.bulk_update(batch, ['days'])
+            batch = []
+    Bill.objects.bulk_update(batch, ['days'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facility', '0014_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='days',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_billed_days, migrations.RunPython.noop),
+    ]
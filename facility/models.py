@@ -1,5 +1,4 @@
 from django.db import models
-from decimal import Decimal
 from django.conf import settings
 
 # Room model
@@ -8,6 +7,8 @@ class Room(models.Model):
     room_number = models.CharField(max_length=10)
     type = models.CharField(max_length=20, choices=[('GENERAL', 'General'), ('PRIVATE', 'Private'), ('ICU', 'ICU')])
     room_charge = models.DecimalField(max_digits=10, decimal_places=2)
+    # Kept in step with the room's AVAILABLE beds by facility.services/signals
+    free_beds = models.PositiveIntegerField(default=0)
     created_date = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -25,6 +26,9 @@ class Bed(models.Model):
 
     class Meta:
         unique_together = ('room', 'bed_number')
+        indexes = [
+            models.Index(fields=['status', 'room'], name='bed_status_room_idx'),
+        ]
 
     def __str__(self):
         return f"Bed {self.bed_number} in Room {self.room.room_number}"
@@ -36,7 +40,7 @@ class Admission(models.Model):
     room = models.ForeignKey(Room, on_delete=models.SET_NULL, null=True, blank=True)
     bed = models.ForeignKey(Bed, on_delete=models.SET_NULL, null=True, blank=True )
     total_days = models.PositiveIntegerField(default=0)
-    admit_date = models.DateTimeField(auto_now_add=True)
+    admit_date = models.DateTimeField(auto_now_add=True, db_index=True)
     discharge_date = models.DateTimeField(null=True, blank=True)
     STATUS_CHOICES = [
     ('ADMITTED', 'Admitted'),
@@ -44,6 +48,15 @@ class Admission(models.Model):
     ('TRANSFERRED', 'Transferred'),
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ADMITTED')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'admit_date'], name='admission_patient_date_idx'),
+            models.Index(fields=['status', 'admit_date'], name='admission_status_date_idx'),
+            # Is this bed still held by someone? (release_bed, occupancy)
+            models.Index(fields=['bed'], condition=models.Q(status='ADMITTED'), name='admission_admitted_bed_idx'),
+        ]
+
     def __str__(self):
         return f"Admission: {self.patient} (Admitted: {self.admit_date})"
 
@@ -87,16 +100,19 @@ class Admission(models.Model):
         self.full_clean()
         
         # 3. Handle Bed Status
+        from django.db import transaction
+        from .services import BedUnavailable, claim_bed, release_bed
+
         is_new = self.pk is None
-        if is_new and self.bed:
-            self.bed.status = 'OCCUPIED'
-            self.bed.save()
-
-        if self.status == 'DISCHARGED' and self.bed:
-            self.bed.status = 'AVAILABLE'
-            self.bed.save()
-                
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            # Conditional UPDATE, so two admissions can never win the same bed
+            if is_new and self.bed and not claim_bed(self.bed):
+                raise BedUnavailable(f"Bed {self.bed.bed_number} is already occupied.")
+
+            if self.status == 'DISCHARGED' and self.bed:
+                release_bed(self.bed, admission=self)
+
+            super().save(*args, **kwargs)
         
 
 # Bill model
@@ -108,22 +124,47 @@ class Bill(models.Model):
     staff_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     tax = models.DecimalField(max_digits=10,decimal_places=2,default=0.00)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # Days of the stay room_charge covers; later bills start after them
+    days = models.PositiveIntegerField(default=0)
     status = models.CharField(max_length=20, choices=[('PAID', 'Paid'), ('UNPAID', 'Unpaid')], default='UNPAID')
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'created_at'], name='bill_patient_date_idx'),
+            # Unpaid-bill check in Admission.clean() and the billing engine
+            models.Index(fields=['admission'], condition=models.Q(status='UNPAID'), name='bill_unpaid_admission_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        if self.admission and self.admission.room:
-            days = self.admission.total_days if self.admission.total_days > 0 else 1
-            price_per_day = self.admission.room.room_charge 
-            self.room_charge = Decimal(days) * Decimal(price_per_day)
-        
-        
-        self.total_amount = (
-            Decimal(str(self.room_charge or 0)) + 
-            Decimal(str(self.staff_charge or 0)) + 
-            Decimal(str(self.tax or 0))
-        )
-        
+        from .billing import charges_for, total_for
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'days', 'room_charge', 'total_amount'} & set(update_fields):
+            # e.g. marking the bill paid: its charges stay as they were
+            return super().save(*args, **kwargs)
+
+        if self.admission_id:
+            # One joined query instead of loading the admission and its room
+            stay = (
+                Admission.objects
+                .filter(pk=self.admission_id, room__isnull=False)
+                .values_list('total_days', 'room__room_charge')
+                .first()
+            )
+            if stay:
+                # Same rule as billing.next_bill: the days no other bill covers
+                covered = (
+                    Bill.objects
+                    .filter(admission_id=self.admission_id)
+                    .exclude(pk=self.pk)
+                    .aggregate(covered=models.Sum('days'))['covered'] or 0
+                )
+                self.days = max(0, max(stay[0], 1) - covered)
+                self.room_charge, _ = charges_for(self.days, stay[1])
+
+        self.total_amount = total_for(self.room_charge, self.staff_charge, self.tax)
+
         super().save(*args, **kwargs)
         
     def __str__(self):
@@ -133,7 +174,7 @@ class Bill(models.Model):
 class Payment(models.Model):
     bill = models.ForeignKey(Bill, on_delete=models.CASCADE, related_name='payments')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
-    payment_date = models.DateTimeField(auto_now_add=True)
+    payment_date = models.DateTimeField(auto_now_add=True, db_index=True)
     payment_method = models.CharField(max_length=50)
     payment_status = models.CharField(max_length=20, choices=[('SUCCESS', 'Success'), ('FAILED', 'Failed')], default='SUCCESS')
 
@@ -182,7 +223,43 @@ class StaffAssignment(models.Model):
     )
     assigned_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'assigned_date'], name='assignment_patient_date_idx'),
+        ]
+
     def __str__(self):
         return f"Staff {self.staff.user.get_full_name()} assigned to Patient {self.patient}"
 
 
+
+# WardOccupancy model
+class WardOccupancy(models.Model):
+    """Per department and room type bed/admission counts, maintained by facility.occupancy."""
+    dept = models.ForeignKey('clinical.Department', on_delete=models.CASCADE, related_name='occupancy')
+    room_type = models.CharField(max_length=20, choices=[('GENERAL', 'General'), ('PRIVATE', 'Private'), ('ICU', 'ICU')])
+    total_beds = models.IntegerField(default=0)
+    occupied_beds = models.IntegerField(default=0)
+    current_admissions = models.IntegerField(default=0)
+    # Sum of admit_date.toordinal() over current admissions, for the average stay
+    admit_day_sum = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('dept', 'room_type')
+
+    @property
+    def available_beds(self):
+        return self.total_beds - self.occupied_beds
+
+    @property
+    def average_length_of_stay(self):
+        from django.utils import timezone
+
+        if not self.current_admissions:
+            return None
+        today = timezone.now().date().toordinal()
+        return today + 1 - self.admit_day_sum / self.current_admissions
+
+    def __str__(self):
+        return f"{self.dept} {self.room_type}: {self.occupied_beds}/{self.total_beds} occupied"
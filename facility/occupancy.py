@@ -0,0 +1,89 @@
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Admission, Bed, Room, WardOccupancy
+
+
+def room_key(room_id):
+    """(dept_id, room_type) of the WardOccupancy row a room rolls up into."""
+    if room_id is None:
+        return None
+    return Room.objects.filter(pk=room_id).values_list('dept_id', 'type').first()
+
+
+def admission_room_id(room_id, bed_id):
+    """Room an admission counts against: its own room, else its bed's room."""
+    if room_id is None and bed_id is not None:
+        room_id = Bed.objects.filter(pk=bed_id).values_list('room_id', flat=True).first()
+    return room_id
+
+
+def rebuild(keys=None):
+    """
+    Recomputes WardOccupancy rows from Bed and Admission.
+    ``keys`` is an iterable of (dept_id, room_type); all rows when omitted.
+    """
+    if keys is None:
+        keys = set(Room.objects.values_list('dept_id', 'type').distinct())
+        stale = [
+            pk for pk, dept_id, room_type in WardOccupancy.objects.values_list('pk', 'dept_id', 'room_type')
+            if (dept_id, room_type) not in keys
+        ]
+        WardOccupancy.objects.filter(pk__in=stale).delete()
+
+    for dept_id, room_type in set(keys):
+        beds = Bed.objects.filter(room__dept_id=dept_id, room__type=room_type)
+        admit_dates = Admission.objects.filter(
+            Q(room__dept_id=dept_id, room__type=room_type)
+            | Q(room__isnull=True, bed__room__dept_id=dept_id, bed__room__type=room_type),
+            status='ADMITTED',
+        ).values_list('admit_date', flat=True)
+        admit_days = [admit_date.date().toordinal() for admit_date in admit_dates]
+
+        WardOccupancy.objects.update_or_create(
+            dept_id=dept_id,
+            room_type=room_type,
+            defaults={
+                'total_beds': beds.count(),
+                'occupied_beds': beds.filter(status='OCCUPIED').count(),
+                'current_admissions': len(admit_days),
+                'admit_day_sum': sum(admit_days),
+            },
+        )
+
+
+def adjust(room_id, **deltas):
+    """Applies counter deltas to the row ``room_id`` rolls up into."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    key = room_key(room_id) if deltas else None
+    if key is None:
+        return
+
+    updated = WardOccupancy.objects.filter(dept_id=key[0], room_type=key[1]).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items()},
+    )
+    if not updated:
+        # First bed or admission for this department/room type
+        rebuild([key])
+
+
+def bed_changed(old_room, old_status, new_room, new_status):
+    """Records a bed moving between rooms and/or statuses (None = did not exist)."""
+    if old_room == new_room:
+        adjust(new_room, occupied_beds=(new_status == 'OCCUPIED') - (old_status == 'OCCUPIED'))
+        return
+    if old_room is not None:
+        adjust(old_room, total_beds=-1, occupied_beds=-(old_status == 'OCCUPIED'))
+    if new_room is not None:
+        adjust(new_room, total_beds=1, occupied_beds=int(new_status == 'OCCUPIED'))
+
+
+def admission_changed(old_room, old_status, old_admit_date, new_room, new_status, new_admit_date):
+    """Records an admission starting, ending or moving room (None = did not exist)."""
+    if (old_room, old_status, old_admit_date) == (new_room, new_status, new_admit_date):
+        return
+    if old_status == 'ADMITTED':
+        adjust(old_room, current_admissions=-1, admit_day_sum=-old_admit_date.date().toordinal())
+    if new_status == 'ADMITTED':
+        adjust(new_room, current_admissions=1, admit_day_sum=new_admit_date.date().toordinal())
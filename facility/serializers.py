@@ -1,36 +1,47 @@
 from rest_framework import serializers
-from .models import Room, Bed, Admission, Bill, Payment, Staff, StaffAssignment
+from mixins import SparseFieldsetMixin
+from .models import Room, Bed, Admission, Bill, Payment, Staff, StaffAssignment, WardOccupancy
 from django.core import exceptions
 from django.contrib.auth.password_validation import validate_password
-from users.models import User
+from users.models import User, Patient, Doctor
+from clinical.models import Department
 from users.serializers import UserSerializer
-class RoomSerializer(serializers.ModelSerializer):
+class RoomSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Room
         fields = '__all__'
+        read_only_fields = ['free_beds']
 
-class BedSerializer(serializers.ModelSerializer):
+class BedSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Bed
         fields = '__all__'
 
-class AdmissionSerializer(serializers.ModelSerializer):
+
+class BedAllocationSerializer(serializers.Serializer):
+    patient = serializers.PrimaryKeyRelatedField(queryset=Patient.objects.all())
+    doctor = serializers.PrimaryKeyRelatedField(queryset=Doctor.objects.all(), required=False, allow_null=True)
+    dept = serializers.PrimaryKeyRelatedField(queryset=Department.objects.all(), required=False)
+    room_type = serializers.ChoiceField(choices=Room._meta.get_field('type').choices, required=False)
+    room = serializers.PrimaryKeyRelatedField(queryset=Room.objects.all(), required=False)
+
+class AdmissionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Admission
         fields = '__all__'
 
-class BillSerializer(serializers.ModelSerializer):
+class BillSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Bill
         fields = '__all__'
-        read_only_fields = ['total_amount', 'room_charge', 'created_at']
+        read_only_fields = ['total_amount', 'room_charge', 'days', 'created_at']
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = '__all__'
 
-class StaffSerializer(serializers.ModelSerializer):
+class StaffSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer()
     class Meta:
         model = Staff
@@ -45,7 +56,20 @@ class StaffSerializer(serializers.ModelSerializer):
             staff = Staff.objects.create(user=user, **validated_data)
         return staff
 
-class StaffAssignmentSerializer(serializers.ModelSerializer):
+class StaffAssignmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = StaffAssignment
         fields = '__all__'
+
+
+class WardOccupancySerializer(serializers.ModelSerializer):
+    dept_name = serializers.CharField(source='dept.name', read_only=True)
+    available_beds = serializers.IntegerField(read_only=True)
+    average_length_of_stay = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = WardOccupancy
+        fields = [
+            'dept', 'dept_name', 'room_type', 'total_beds', 'occupied_beds',
+            'available_beds', 'current_admissions', 'average_length_of_stay', 'updated_at'
+        ]
@@ -0,0 +1,179 @@
+from django.core.exceptions import ValidationError
+from django.db import connection, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from caching import resource_versions
+from events.feed import record_rows
+from . import occupancy
+from .billing import bill_stay, stay_days
+from .models import Admission, Bed, Bill, Room
+
+
+class BedUnavailable(ValidationError):
+    pass
+
+
+class AlreadyDischarged(ValidationError):
+    pass
+
+
+def available_beds(dept=None, room_type=None, room=None):
+    """
+    AVAILABLE beds, optionally narrowed to a department, room type or room.
+
+    Rooms are first narrowed with their free_beds counter, then beds are read
+    through the (status, room) index, so no full bed scan is needed.
+    """
+    rooms = Room.objects.filter(free_beds__gt=0)
+    if dept is not None:
+        rooms = rooms.filter(dept=dept)
+    if room_type:
+        rooms = rooms.filter(type=room_type)
+    if room is not None:
+        rooms = rooms.filter(pk=getattr(room, 'pk', room))
+
+    return Bed.objects.filter(status='AVAILABLE', room__in=rooms.values('pk')).order_by('room_id', 'pk')
+
+
+def claim_bed(bed):
+    """Atomically flips ``bed`` from AVAILABLE to OCCUPIED. Returns False if someone else got it."""
+    with transaction.atomic():
+        claimed = Bed.objects.filter(pk=bed.pk, status='AVAILABLE').update(status='OCCUPIED')
+        if claimed:
+            Room.objects.filter(pk=bed.room_id).update(free_beds=F('free_beds') - 1)
+            occupancy.bed_changed(bed.room_id, 'AVAILABLE', bed.room_id, 'OCCUPIED')
+            resource_versions.bump(Bed, Room)
+            record_rows(Bed, [bed.pk])
+    if claimed:
+        bed.status = 'OCCUPIED'
+        bed._tracked_state = (bed.room_id, bed.status)
+    return bool(claimed)
+
+
+def release_bed(bed, admission=None):
+    """
+    Flips ``bed`` back to AVAILABLE unless another admission still holds it.
+    Returns False if there was nothing to release.
+    """
+    holders = Admission.objects.filter(bed_id=bed.pk, status='ADMITTED')
+    if admission is not None and admission.pk:
+        holders = holders.exclude(pk=admission.pk)
+
+    with transaction.atomic():
+        released = (
+            Bed.objects
+            .filter(pk=bed.pk, status='OCCUPIED')
+            .exclude(pk__in=holders.values('bed_id'))
+            .update(status='AVAILABLE')
+        )
+        if released:
+            Room.objects.filter(pk=bed.room_id).update(free_beds=F('free_beds') + 1)
+            occupancy.bed_changed(bed.room_id, 'OCCUPIED', bed.room_id, 'AVAILABLE')
+            resource_versions.bump(Bed, Room)
+            record_rows(Bed, [bed.pk])
+    if released:
+        bed.status = 'AVAILABLE'
+        bed._tracked_state = (bed.room_id, bed.status)
+    return bool(released)
+
+
+def admit_patient(patient, doctor=None, dept=None, room_type=None, room=None, attempts=10):
+    """
+    Admits ``patient`` to the first free bed matching the filters.
+
+    Where the database supports it, candidate beds are locked with
+    SELECT ... FOR UPDATE SKIP LOCKED so concurrent admissions fan out
+    over different beds; elsewhere the conditional UPDATE in claim_bed()
+    settles races and we move on to the next candidate.
+    Raises BedUnavailable if no bed could be claimed.
+    """
+    with transaction.atomic():
+        candidates = available_beds(dept, room_type, room).select_related('room')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True, of=('self',))[:1]
+        else:
+            candidates = candidates[:attempts]
+
+        for bed in candidates:
+            admission = Admission(patient=patient, doctor=doctor, room=bed.room, bed=bed)
+            try:
+                with transaction.atomic():
+                    admission.save()
+            except BedUnavailable:
+                continue
+            return admission
+
+    raise BedUnavailable("No free bed matches the requested department, room type or room.")
+
+
+class Discharge:
+    def __init__(self, admission, bill, discharged):
+        self.admission = admission
+        # The final bill: the one to settle when ``discharged`` is False
+        self.bill = bill
+        self.discharged = discharged
+
+
+def discharge_admission(admission, when=None):
+    """
+    Discharges ``admission`` (an instance or pk) in one transaction.
+
+    The admission, its bed and its bills are locked with SELECT ... FOR
+    UPDATE, so a concurrent discharge, a payment or an admission to the same
+    bed waits until we are done. The stay is billed up to ``when`` (see
+    billing.bill_stay); while a bill is unpaid the admission stays ADMITTED
+    and the returned Discharge carries the bill to settle. Otherwise the
+    admission is discharged and its bed freed. The query count does not
+    depend on the admission's history.
+
+    Raises AlreadyDischarged if the admission is no longer ADMITTED.
+    """
+    when = when or timezone.now()
+    pk = getattr(admission, 'pk', admission)
+
+    with transaction.atomic():
+        admission = Admission.objects.select_for_update(of=('self',)).select_related('room').get(pk=pk)
+        if admission.status != 'ADMITTED':
+            raise AlreadyDischarged(f"Admission {pk} is already {admission.status.lower()}.")
+        bed = Bed.objects.select_for_update().filter(pk=admission.bed_id).first() if admission.bed_id else None
+        bills = list(Bill.objects.select_for_update().filter(admission_id=pk).order_by('created_at', 'pk'))
+
+        days = stay_days(admission.admit_date, when)
+        bill = bill_stay(admission, bills, when)
+        unpaid = [item for item in bills if item.status == 'UNPAID']
+        if unpaid:
+            if admission.total_days != days:
+                Admission.objects.filter(pk=pk).update(total_days=days)
+                resource_versions.bump(Admission)
+                record_rows(Admission, [pk])
+                admission.total_days = days
+            return Discharge(admission, unpaid[-1], discharged=False)
+
+        admission.status = 'DISCHARGED'
+        admission.discharge_date = when
+        admission.total_days = days
+        # Admission.save() would repeat the checks above without the locks;
+        # the plain save still sends the signals occupancy and analytics need.
+        models.Model.save(admission, update_fields=['status', 'discharge_date', 'total_days'])
+        if bed is not None:
+            release_bed(bed, admission=admission)
+
+    return Discharge(admission, bill or (bills[-1] if bills else None), discharged=True)
+
+
+def recount_free_beds(room_ids=None):
+    """Rebuilds Room.free_beds from the beds themselves."""
+    available = (
+        Bed.objects
+        .filter(room=OuterRef('pk'), status='AVAILABLE')
+        .values('room')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    rooms = Room.objects.all()
+    if room_ids is not None:
+        rooms = rooms.filter(pk__in=room_ids)
+    resource_versions.bump(Room)
+    return rooms.update(free_beds=Coalesce(Subquery(available), 0))
@@ -0,0 +1,109 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from caching import resource_versions
+from . import occupancy
+from .models import Admission, Bed, Room
+from .services import recount_free_beds
+
+
+def _bed_state(bed):
+    # Read from __dict__ so deferred fields are not fetched just to track them
+    return bed.__dict__.get('room_id'), bed.__dict__.get('status')
+
+
+def _admission_state(admission):
+    fields = admission.__dict__
+    return fields.get('room_id'), fields.get('bed_id'), fields.get('status'), fields.get('admit_date')
+
+
+def _adjust_free_beds(room_id, delta):
+    if room_id is not None and delta:
+        Room.objects.filter(pk=room_id).update(free_beds=F('free_beds') + delta)
+        resource_versions.bump(Room)
+
+
+@receiver(post_init, sender=Bed)
+def track_bed_state(sender, instance, **kwargs):
+    instance._tracked_state = _bed_state(instance) if instance.pk else (None, None)
+
+
+@receiver(post_save, sender=Bed)
+def update_counters_on_bed_save(sender, instance, created, **kwargs):
+    old_room, old_status = (None, None) if created else instance._tracked_state
+    new_room, new_status = _bed_state(instance)
+
+    if not created and (old_room is None or old_status is None):
+        # Instance was loaded with deferred fields: fall back to a recount
+        rooms = {room for room in (old_room, new_room) if room is not None}
+        recount_free_beds(rooms or None)
+        occupancy.rebuild(filter(None, map(occupancy.room_key, rooms)) if rooms else None)
+    elif (old_room, old_status) != (new_room, new_status):
+        _adjust_free_beds(old_room, -1 if old_status == 'AVAILABLE' else 0)
+        _adjust_free_beds(new_room, 1 if new_status == 'AVAILABLE' else 0)
+        occupancy.bed_changed(old_room, old_status, new_room, new_status)
+
+    instance._tracked_state = (new_room, new_status)
+
+
+@receiver(post_delete, sender=Bed)
+def update_counters_on_bed_delete(sender, instance, **kwargs):
+    room_id, status = _bed_state(instance)
+    if status is None:
+        recount_free_beds([room_id])
+        occupancy.rebuild(filter(None, [occupancy.room_key(room_id)]))
+        return
+    if status == 'AVAILABLE':
+        _adjust_free_beds(room_id, -1)
+    occupancy.bed_changed(room_id, status, None, None)
+
+
+@receiver(post_init, sender=Admission)
+def track_admission_state(sender, instance, **kwargs):
+    instance._tracked_state = _admission_state(instance) if instance.pk else (None, None, None, None)
+
+
+@receiver(post_save, sender=Admission)
+def update_occupancy_on_admission_save(sender, instance, created, **kwargs):
+    old_room, old_bed, old_status, old_admit_date = (None,) * 4 if created else instance._tracked_state
+    new_room, new_bed, new_status, new_admit_date = _admission_state(instance)
+
+    if not created and old_status is None:
+        occupancy.rebuild(filter(None, [occupancy.room_key(occupancy.admission_room_id(new_room, new_bed))]))
+    elif (old_room, old_bed, old_status, old_admit_date) != (new_room, new_bed, new_status, new_admit_date):
+        occupancy.admission_changed(
+            occupancy.admission_room_id(old_room, old_bed), old_status, old_admit_date,
+            occupancy.admission_room_id(new_room, new_bed), new_status, new_admit_date,
+        )
+
+    instance._tracked_state = (new_room, new_bed, new_status, new_admit_date)
+
+
+@receiver(post_delete, sender=Admission)
+def update_occupancy_on_admission_delete(sender, instance, **kwargs):
+    room_id, bed_id, status, admit_date = _admission_state(instance)
+    occupancy.admission_changed(occupancy.admission_room_id(room_id, bed_id), status, admit_date, None, None, None)
+
+
+@receiver(post_init, sender=Room)
+def track_room_state(sender, instance, **kwargs):
+    instance._tracked_key = (instance.__dict__.get('dept_id'), instance.__dict__.get('type'))
+
+
+@receiver(post_save, sender=Room)
+def update_occupancy_on_room_save(sender, instance, created, **kwargs):
+    new_key = (instance.dept_id, instance.type)
+    if not created and instance._tracked_key != new_key:
+        # Moving a room moves all of its beds and admissions
+        occupancy.rebuild([key for key in (instance._tracked_key, new_key) if None not in key])
+    instance._tracked_key = new_key
+
+
+@receiver(post_delete, sender=Room)
+def update_occupancy_on_room_delete(sender, instance, **kwargs):
+    if None not in instance._tracked_key:
+        occupancy.rebuild([instance._tracked_key])
+
+
+resource_versions.track(Room, Bed, Admission)
@@ -0,0 +1,33 @@
+import os
+import uuid
+
+from django.conf import settings
+
+from jobs.queue import task
+
+from .exports import export_lines, parse_range
+
+
+def export_path(filename):
+    return os.path.join(settings.EXPORT_DIR, filename)
+
+
+@task('facility.export', max_attempts=3)
+def export_file(kind, fmt, start, end):
+    """Writes an export to EXPORT_DIR; the file name is in the job's result."""
+    start_at, end_at = parse_range(start, end)
+    filename = f"{kind}_{start}_{end}_{uuid.uuid4().hex[:12]}.{fmt}"
+    os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+
+    # Written under a temporary name so a half-written file is never served
+    partial = export_path(filename + '.part')
+    rows = 0
+    with open(partial, 'w', newline='') as out:
+        for line in export_lines(kind, fmt, start_at, end_at):
+            out.write(line)
+            rows += 1
+    os.replace(partial, export_path(filename))
+
+    if fmt == 'csv':
+        rows -= 1
+    return {'file': filename, 'rows': rows}
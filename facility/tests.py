@@ -1,3 +1,218 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from caching import ListCache, ResourceVersions
+from clinical.models import Department
+from users.models import Patient, User
+from .billing import run_billing
+from .models import Admission, Bed, Bill, Room
+from .services import BedUnavailable, admit_patient, claim_bed, discharge_admission
+from .views import BillViewSet
+
+
+class RunBillingTests(TestCase):
+    """Nights are billed once: after the last bill's days, never again."""
+
+    @classmethod
+    def setUpTestData(cls):
+        dept = Department.objects.create(name='Surgery', floor=1)
+        room = Room.objects.create(dept=dept, room_number='101', type='GENERAL', room_charge=100)
+        bed = Bed.objects.create(room=room, bed_number='1')
+        user = User.objects.create_user(username='patient', email='p@example.com', password='x', role='PATIENT')
+        cls.patient = Patient.objects.create(
+            user=user, gender='MALE', blood_group='A+', address='1 Main Road', city='Pune', phone='9000000000',
+        )
+        cls.admission = Admission.objects.create(patient=cls.patient, room=room, bed=bed)
+        cls.admitted = timezone.now() - timedelta(days=4)
+        Admission.objects.filter(pk=cls.admission.pk).update(admit_date=cls.admitted)
+        cls.admin = User.objects.create_user(username='admin', email='a@example.com', password='x', role='ADMIN')
+
+    def bill(self, as_of):
+        entry, = run_billing(Admission.objects.filter(pk=self.admission.pk), as_of=as_of)
+        return entry
+
+    def pay(self, bill_id):
+        # No role passes both of the viewset's permissions, so they are lifted here
+        view = BillViewSet.as_view({'post': 'pay'}, permission_classes=[])
+        request = APIRequestFactory().post(f'/api/facility/bills/{bill_id}/pay/')
+        force_authenticate(request, self.admin)
+        return view(request, pk=bill_id)
+
+    def test_bills_the_whole_stay_first(self):
+        entry = self.bill(timezone.now())
+        self.assertEqual((entry['action'], entry['days']), ('create', 5))
+        bill = Bill.objects.get(pk=entry['bill'])
+        self.assertEqual(bill.days, 5)
+        self.assertEqual(bill.room_charge, Decimal('500'))
+        self.assertEqual(bill.total_amount, Decimal('500'))
+
+    def test_paid_days_are_not_billed_again(self):
+        first = self.bill(timezone.now())
+        Bill.objects.filter(pk=first['bill']).update(status='PAID')
+
+        self.assertEqual(self.bill(timezone.now())['action'], 'skip')
+
+        later = self.bill(timezone.now() + timedelta(days=3))
+        self.assertEqual((later['action'], later['days']), ('create', 3))
+        self.assertEqual(Bill.objects.get(pk=later['bill']).room_charge, Decimal('300'))
+
+        # The open bill is recomputed, still only for the days after the paid one
+        again = self.bill(timezone.now() + timedelta(days=4))
+        self.assertEqual((again['action'], again['bill'], again['days']), ('update', later['bill'], 4))
+        self.assertEqual(Bill.objects.filter(admission=self.admission).count(), 2)
+
+    def test_entered_staff_charge_and_tax_are_kept(self):
+        first = self.bill(timezone.now())
+        Bill.objects.filter(pk=first['bill']).update(staff_charge=999, tax=1)
+
+        entry = self.bill(timezone.now() + timedelta(days=1))
+        bill = Bill.objects.get(pk=first['bill'])
+        self.assertEqual((bill.days, bill.room_charge), (6, Decimal('600')))
+        self.assertEqual((bill.staff_charge, bill.tax), (Decimal('999'), Decimal('1')))
+        self.assertEqual(bill.total_amount, Decimal('1600'))
+        self.assertEqual(entry['total_amount'], Decimal('1600'))
+
+    def test_paying_a_later_bill_keeps_its_amount(self):
+        first = self.bill(timezone.now())
+        self.assertEqual(self.pay(first['bill']).status_code, 200)
+        later = self.bill(timezone.now() + timedelta(days=3))
+
+        response = self.pay(later['bill'])
+        self.assertEqual(response.status_code, 200)
+        bill = Bill.objects.get(pk=later['bill'])
+        self.assertEqual((bill.status, bill.days, bill.total_amount), ('PAID', 3, Decimal('300')))
+        self.assertEqual(response.data['total_collected'], Decimal('300'))
+
+        # A full save prices the bill for the same days
+        bill.save()
+        self.assertEqual((bill.days, bill.total_amount), (3, Decimal('300')))
+
+    def test_discharge_bills_the_days_since_the_last_payment(self):
+        first = self.bill(timezone.now())
+        Bill.objects.filter(pk=first['bill']).update(status='PAID')
+
+        discharge = discharge_admission(self.admission, when=timezone.now() + timedelta(days=2))
+        self.assertFalse(discharge.discharged)
+        self.assertEqual((discharge.bill.days, discharge.bill.room_charge), (2, Decimal('200')))
+
+        Bill.objects.filter(pk=discharge.bill.pk).update(status='PAID')
+        discharge = discharge_admission(self.admission, when=timezone.now() + timedelta(days=2))
+        self.assertTrue(discharge.discharged)
+        self.assertEqual(Bill.objects.filter(admission=self.admission).count(), 2)
+
+    def test_discharge_keeps_entered_charges_and_paying_keeps_the_amount(self):
+        first = self.bill(timezone.now())
+        self.pay(first['bill'])
+        when = timezone.now() + timedelta(days=2)
+        bill = discharge_admission(self.admission, when=when).bill
+        Bill.objects.filter(pk=bill.pk).update(staff_charge=50, tax=5)
+
+        bill = discharge_admission(self.admission, when=when).bill
+        self.assertEqual((bill.days, bill.staff_charge, bill.tax), (2, Decimal('50'), Decimal('5')))
+        self.assertEqual(bill.total_amount, Decimal('255'))
+
+        self.assertEqual(self.pay(bill.pk).status_code, 200)
+        bill.refresh_from_db()
+        self.assertEqual((bill.status, bill.days, bill.total_amount), ('PAID', 2, Decimal('255')))
+        self.assertTrue(discharge_admission(self.admission, when=when).discharged)
+
+
+
+class BedClaimTests(TestCase):
+    """A bed goes to one admission at a time and Room.free_beds follows it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        dept = Department.objects.create(name='Surgery', floor=1)
+        cls.room = Room.objects.create(dept=dept, room_number='101', type='GENERAL', room_charge=100)
+        cls.bed = Bed.objects.create(room=cls.room, bed_number='1')
+        Bed.objects.create(room=cls.room, bed_number='2')
+        cls.patients = []
+        for i in range(2):
+            user = User.objects.create_user(username=f'p{i}', email=f'p{i}@example.com', password='x', role='PATIENT')
+            cls.patients.append(Patient.objects.create(
+                user=user, gender='MALE', blood_group='A+', address='1 Main Road', city='Pune', phone=f'900000000{i}',
+            ))
+
+    def free_beds(self):
+        self.room.refresh_from_db()
+        return self.room.free_beds
+
+    def test_a_second_claim_on_an_occupied_bed_is_refused(self):
+        # Loaded before the first admission, as a racing request would have
+        stale = Bed.objects.get(pk=self.bed.pk)
+        Admission.objects.create(patient=self.patients[0], room=self.room, bed=self.bed)
+
+        self.assertFalse(claim_bed(stale))
+        with self.assertRaises(BedUnavailable):
+            Admission.objects.create(patient=self.patients[1], room=self.room, bed=stale)
+        self.assertEqual(Admission.objects.filter(bed=self.bed).count(), 1)
+        self.assertEqual(self.free_beds(), 1)
+
+    def test_free_beds_follow_admit_and_discharge(self):
+        self.assertEqual(self.free_beds(), 2)
+        first = admit_patient(self.patients[0], room=self.room)
+        self.assertEqual(self.free_beds(), 1)
+        second = admit_patient(self.patients[1], room=self.room)
+        self.assertEqual(self.free_beds(), 0)
+        self.assertNotEqual(first.bed_id, second.bed_id)
+
+        discharge = discharge_admission(first)
+        self.assertFalse(discharge.discharged)
+        self.assertEqual(self.free_beds(), 0)
+        Bill.objects.filter(pk=discharge.bill.pk).update(status='PAID')
+        self.assertTrue(discharge_admission(first).discharged)
+        self.assertEqual(self.free_beds(), 1)
+        self.assertEqual(Bed.objects.get(pk=first.bed_id).status, 'AVAILABLE')
+
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared'},
+}
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class CrossWorkerVersionTests(TestCase):
+    """Two ResourceVersions over one shared cache behave like two workers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        dept = Department.objects.create(name='Surgery', floor=1)
+        room = Room.objects.create(dept=dept, room_number='101', type='GENERAL', room_charge=100)
+        user = User.objects.create_user(username='patient', email='p@example.com', password='x', role='PATIENT')
+        patient = Patient.objects.create(
+            user=user, gender='MALE', blood_group='A+', address='1 Main Road', city='Pune', phone='9000000000',
+        )
+        bed = Bed.objects.create(room=room, bed_number='1')
+        cls.admission = Admission.objects.create(patient=patient, room=room, bed=bed)
+        cls.admin = User.objects.create_user(username='admin', email='a@example.com', password='x', role='ADMIN')
+
+    def setUp(self):
+        self.one, self.two = ResourceVersions('shared'), ResourceVersions('shared')
+
+    def test_a_bump_is_seen_by_the_other_worker(self):
+        before = self.two.get(Admission)
+        self.assertEqual(self.one.get(Admission), before)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.one.bump(Admission)
+        self.assertNotEqual(self.two.get(Admission), before)
+        self.assertEqual(self.two.get(Admission), self.one.get(Admission))
+
+    def test_cached_list_pages_are_invalidated_by_the_other_worker(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        # The views run as worker two, with its own list cache
+        with mock.patch('mixins.resource_versions', self.two), mock.patch('mixins.list_cache', ListCache()):
+            self.assertEqual(client.get('/api/facility/admissions/').json()['results'][0]['total_days'], 1)
+            Admission.objects.filter(pk=self.admission.pk).update(total_days=7)
+            self.assertEqual(client.get('/api/facility/admissions/').json()['results'][0]['total_days'], 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.one.bump(Admission)
+            self.assertEqual(client.get('/api/facility/admissions/').json()['results'][0]['total_days'], 7)
@@ -3,7 +3,7 @@ from .views import (
     RoomViewSet, BedViewSet,
     AdmissionViewSet, BillViewSet,
     PaymentViewSet, StaffViewSet,
-    StaffAssignmentViewSet
+    StaffAssignmentViewSet, OccupancyViewSet, ExportViewSet
 )
 
 router = DefaultRouter()
@@ -15,5 +15,7 @@ router.register('bills', BillViewSet)
 router.register('payments', PaymentViewSet)
 router.register('staff', StaffViewSet)
 router.register('staff-assignments', StaffAssignmentViewSet)
+router.register('occupancy', OccupancyViewSet, basename='occupancy')
+router.register('exports', ExportViewSet, basename='export')
 
 urlpatterns = router.urls
\ No newline at end of file
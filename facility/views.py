@@ -1,28 +1,39 @@
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import ModelViewSet, ViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils import timezone
+from django.http import FileResponse, StreamingHttpResponse
 from permissions import IsAdmin,IsStaffOrDoctor,IsPatient
+from pagination import TimeCursorPagination
+from streaming import for_server
+from mixins import AsyncReadMixin, CachedListMixin, ConditionalGetMixin, QueryPlannerMixin
 from .models import (
     Room, Bed, Admission,
-    Bill, Payment, Staff, StaffAssignment
+    Bill, Payment, Staff, StaffAssignment, WardOccupancy
 )
 
 from .serializers import (
     RoomSerializer, BedSerializer,
     AdmissionSerializer, BillSerializer,
     PaymentSerializer, StaffSerializer,
-    StaffAssignmentSerializer
+    StaffAssignmentSerializer, BedAllocationSerializer,
+    WardOccupancySerializer
 )
+from .services import AlreadyDischarged, BedUnavailable, admit_patient, available_beds, discharge_admission
+from .exports import EXPORTS, FORMATS, export_lines, parse_range
+from .tasks import export_file, export_path
+from jobs.models import Job
+from jobs.serializers import JobSerializer
 
 
-class AdmissionViewSet(ModelViewSet):
-    queryset = Admission.objects.select_related(
-        'patient__user', 'doctor__user', 'room', 'bed'
-    )
+class AdmissionViewSet(CachedListMixin, AsyncReadMixin, QueryPlannerMixin, ModelViewSet):
+    queryset = Admission.objects.all()
     serializer_class = AdmissionSerializer
     permission_classes = [IsStaffOrDoctor]
+    pagination_class = TimeCursorPagination
+    cursor_ordering = ('-admit_date', '-id')
+    # Polled by every ward; the same for every staff member and doctor
+    cache_per_user = False
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -38,55 +49,91 @@ class AdmissionViewSet(ModelViewSet):
     def discharge(self, request, pk=None):
         admission = self.get_object()
 
-        if admission.status == 'DISCHARGED':
+        try:
+            result = discharge_admission(admission)
+        except AlreadyDischarged:
             return Response(
                 {"error": "Already discharged"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        admission.status = 'DISCHARGED'
-        admission.discharge_date = timezone.now()
-        admission.save()
-
+        if not result.discharged:
+            return Response(
+                {"error": "The final bill must be paid before discharge", "bill": BillSerializer(result.bill).data},
+                status=status.HTTP_409_CONFLICT
+            )
         return Response({"message": "Patient discharged successfully"})
+
+    @action(detail=False, methods=['post'])
+    def allocate(self, request):
+        serializer = BedAllocationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            admission = admit_patient(**serializer.validated_data)
+        except BedUnavailable as e:
+            return Response({"error": e.messages}, status=status.HTTP_409_CONFLICT)
+
+        return Response(AdmissionSerializer(admission).data, status=status.HTTP_201_CREATED)
     
-class RoomViewSet(ModelViewSet):
+class RoomViewSet(ConditionalGetMixin, QueryPlannerMixin, ModelViewSet):
     queryset = Room.objects.all()
     serializer_class = RoomSerializer
     permission_classes = [IsAdmin]
 
-class BedViewSet(ModelViewSet):
-    queryset = Bed.objects.select_related('room')
+class BedViewSet(ConditionalGetMixin, AsyncReadMixin, QueryPlannerMixin, ModelViewSet):
+    queryset = Bed.objects.all()
     serializer_class = BedSerializer
     permission_classes = [IsAdmin]
 
+    @action(detail=False, methods=['get'], permission_classes=[IsStaffOrDoctor])
+    def available(self, request):
+        params = request.query_params
+        dept, room, room_type = params.get('dept'), params.get('room'), params.get('room_type')
+        if dept is not None and not dept.isdigit():
+            return Response({"error": "dept must be a department id"}, status=status.HTTP_400_BAD_REQUEST)
+        if room is not None and not room.isdigit():
+            return Response({"error": "room must be a room id"}, status=status.HTTP_400_BAD_REQUEST)
+        room_types = [value for value, _ in Room._meta.get_field('type').choices]
+        if room_type and room_type not in room_types:
+            return Response(
+                {"error": f"room_type must be one of {', '.join(room_types)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        queryset = available_beds(dept=dept, room_type=room_type, room=room)
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
-class StaffViewSet(ModelViewSet):
-    queryset = Staff.objects.select_related('user')
+
+class StaffViewSet(QueryPlannerMixin, ModelViewSet):
+    queryset = Staff.objects.all()
     serializer_class = StaffSerializer
     permission_classes = [IsAdmin]
 
-class StaffAssignmentViewSet(ModelViewSet):
-    queryset = StaffAssignment.objects.select_related(
-        'staff__user', 'patient__user'
-    )
+class StaffAssignmentViewSet(QueryPlannerMixin, ModelViewSet):
+    queryset = StaffAssignment.objects.all()
     serializer_class = StaffAssignmentSerializer
     permission_classes = [IsAdmin]
 
     def get_queryset(self):
+        queryset = super().get_queryset()
         user = self.request.user
 
         if user.is_superuser or user.role == 'ADMIN':
-            return super().get_queryset()
+            return queryset
 
-        return StaffAssignment.objects.filter(
+        return queryset.filter(
             staff__user=user
         )
     
-class BillViewSet(ModelViewSet):
-    queryset = Bill.objects.select_related('patient__user')
+class BillViewSet(QueryPlannerMixin, ModelViewSet):
+    queryset = Bill.objects.all()
     serializer_class = BillSerializer
     permission_classes = [IsPatient,IsAdmin]
+    pagination_class = TimeCursorPagination
+    cursor_ordering = ('-created_at', '-id')
 
     @action(detail=True, methods=['post'])
     def pay(self, request, pk=None):
@@ -96,14 +143,86 @@ class BillViewSet(ModelViewSet):
             return Response({"message": "Bill is already paid."}, status=400)
             
         bill.status = 'PAID'
-        bill.save()
+        bill.save(update_fields=['status'])
         
         return Response({
             "message": "Bill marked as PAID",
             "total_collected": bill.total_amount
         })
     
-class PaymentViewSet(ModelViewSet):
-    queryset = Payment.objects.select_related('bill')
+class PaymentViewSet(QueryPlannerMixin, ModelViewSet):
+    queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
-    permission_classes = [IsPatient]
\ No newline at end of file
+    permission_classes = [IsPatient]
+    pagination_class = TimeCursorPagination
+    cursor_ordering = ('-payment_date', '-id')
+
+class OccupancyViewSet(ViewSet):
+    permission_classes = [IsStaffOrDoctor]
+
+    def list(self, request):
+        rows = WardOccupancy.objects.select_related('dept').order_by('dept__name', 'room_type')
+        return Response(WardOccupancySerializer(rows, many=True).data)
+
+
+class ExportViewSet(ViewSet):
+    """GET /exports/<bills|payments|admissions>/?start=YYYY-MM-DD&end=YYYY-MM-DD&output=csv|ndjson"""
+    permission_classes = [IsAdmin]
+    lookup_value_regex = '[a-z]+'
+
+    def list(self, request):
+        return Response({'exports': sorted(EXPORTS), 'outputs': sorted(FORMATS)})
+
+    def retrieve(self, request, pk=None):
+        if pk not in EXPORTS:
+            return Response({"error": f"Unknown export {pk!r}"}, status=status.HTTP_404_NOT_FOUND)
+
+        fmt = request.query_params.get('output', 'csv')
+        if fmt not in FORMATS:
+            return Response({"error": "output must be csv or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start, end = parse_range(request.query_params.get('start'), request.query_params.get('end'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(export_lines(pk, fmt, start, end), content_type=FORMATS[fmt])
+        filename = f"{pk}_{request.query_params['start']}_{request.query_params['end']}.{fmt}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return for_server(request, response)
+
+    @action(detail=True, methods=['post'], url_path='jobs')
+    def queue(self, request, pk=None):
+        """
+        POST {start, end, output}: writes the export in the background. Poll
+        /api/jobs/<job>/ and fetch the file from /exports/files/<job>/.
+        An Idempotency-Key header makes retried requests return the same job.
+        """
+        if pk not in EXPORTS:
+            return Response({"error": f"Unknown export {pk!r}"}, status=status.HTTP_404_NOT_FOUND)
+
+        fmt = request.data.get('output', 'csv')
+        if fmt not in FORMATS:
+            return Response({"error": "output must be csv or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+        start, end = request.data.get('start'), request.data.get('end')
+        try:
+            parse_range(start, end)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        key = request.headers.get('Idempotency-Key')
+        job = export_file.enqueue(key=f'export:{key}' if key else None, kind=pk, fmt=fmt, start=start, end=end)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=r'files/(?P<job_id>\d+)')
+    def download(self, request, job_id=None):
+        job = Job.objects.filter(pk=job_id, name=export_file.name).first()
+        if job is None:
+            return Response({"error": "No such export"}, status=status.HTTP_404_NOT_FOUND)
+        if job.status != 'SUCCEEDED':
+            return Response({"error": f"Export is {job.status.lower()}"}, status=status.HTTP_409_CONFLICT)
+
+        try:
+            handle = open(export_path(job.result['file']), 'rb')
+        except OSError:
+            return Response({"error": "Export file is gone"}, status=status.HTTP_410_GONE)
+        return for_server(request, FileResponse(handle, as_attachment=True, filename=job.result['file']))
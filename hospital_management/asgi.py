@@ -3,6 +3,8 @@ ASGI config for hospital_management project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with any ASGI server, e.g. ``uvicorn hospital_management.asgi:application``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -12,5 +14,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_management.settings')
+# Read-heavy viewsets get async list/retrieve views (see mixins.AsyncReadMixin)
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
 application = get_asgi_application()
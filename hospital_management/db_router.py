@@ -0,0 +1,97 @@
+"""
+Primary/replica routing.
+
+Reads go to a replica only while ReplicaRoutingMiddleware has marked the
+current request as a viewset list/retrieve. Every write goes to the primary
+and pins the rest of the request to it; clients that just wrote get a short
+lived cookie so their next reads also see their own writes.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PRIMARY = 'default'
+_routing = ContextVar('db_routing', default=None)
+
+REPLICA_ACTIONS = ('list', 'retrieve')
+
+
+class RoutingState:
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+def current_state():
+    return _routing.get()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if state is None or not state.use_replica or state.wrote or not replicas:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cookie_name = getattr(settings, 'REPLICA_PIN_COOKIE', 'pin_primary')
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(state, response)
+
+    def pin(self, state, response):
+        if state.wrote and self.pin_seconds:
+            response.set_cookie(self.cookie_name, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _routing.get()
+        if state is None or request.COOKIES.get(self.cookie_name):
+            return None
+
+        # DRF viewsets expose their {method: action} mapping on the view function
+        actions = getattr(view_func, 'actions', None) or {}
+        state.use_replica = actions.get(request.method.lower()) in REPLICA_ACTIONS
+        return None
@@ -0,0 +1,336 @@
+"""
+Per-route latency and query profiling.
+
+PerfMiddleware counts queries and DB time for every request (a cheap
+execute_wrapper) so requests over PERF_QUERY_THRESHOLD are always flagged.
+A PERF_SAMPLE_RATE fraction of requests is also timed in full, including
+serializer time, and recorded into per-route histograms and a ring buffer
+of recent samples. The report is served to admins at /api/_perf/ and can
+be dumped to PERF_DUMP_PATH every PERF_DUMP_INTERVAL seconds.
+"""
+import bisect
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework import status
+
+from caching import list_cache
+from permissions import IsAdmin
+
+logger = logging.getLogger(__name__)
+_current = ContextVar('perf_sample', default=None)
+
+# Upper bounds of the histogram buckets; the last bucket is open ended
+MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+BYTE_BUCKETS = (1 << 10, 4 << 10, 16 << 10, 64 << 10, 256 << 10, 1 << 20, 4 << 20, 16 << 20)
+METRICS = {
+    'wall_ms': MS_BUCKETS,
+    'queries': COUNT_BUCKETS,
+    'db_ms': MS_BUCKETS,
+    'serializer_ms': MS_BUCKETS,
+    'bytes': BYTE_BUCKETS,
+}
+
+
+class Sample:
+    def __init__(self, sampled):
+        self.sampled = sampled
+        self.route = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def track_query(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - started
+            self.queries += 1
+
+
+def timed_representation(to_representation, instance):
+    """Calls ``to_representation`` and charges its time to the sampled request, if any."""
+    sample = _current.get()
+    if sample is None or sample.serializing:
+        return to_representation(instance)
+    # Only the outermost serializer is timed; nested ones are part of it
+    sample.serializing = True
+    started = perf_counter()
+    try:
+        return to_representation(instance)
+    finally:
+        sample.serializer_time += perf_counter() - started
+        sample.serializing = False
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction (max for the open bucket)."""
+        if not self.total:
+            return None
+        wanted = fraction * self.total
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted and count:
+                return min(self.bounds[position], self.max) if position < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        if not self.total:
+            return None
+        return {
+            'mean': round(self.sum / self.total, 2),
+            'p50': round(self.percentile(0.5), 2),
+            'p95': round(self.percentile(0.95), 2),
+            'p99': round(self.percentile(0.99), 2),
+            'max': round(self.max, 2),
+        }
+
+
+class RouteStats:
+    def __init__(self):
+        self.count = 0
+        self.flagged = 0
+        self.histograms = {metric: Histogram(bounds) for metric, bounds in METRICS.items()}
+
+    def add(self, entry):
+        self.count += 1
+        self.flagged += entry['flagged']
+        for metric, histogram in self.histograms.items():
+            if entry.get(metric) is not None:
+                histogram.add(entry[metric])
+
+
+class PerfRecorder:
+    def __init__(self, size=1000):
+        self.lock = threading.Lock()
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+            self.recent = deque(maxlen=self.size)
+            self.flagged = deque(maxlen=self.size)
+            self.since = time.time()
+            self.last_dump = time.monotonic()
+
+    def record(self, entry):
+        with self.lock:
+            if entry['sampled']:
+                self.routes.setdefault(entry['route'], RouteStats()).add(entry)
+                self.recent.append(entry)
+            if entry['flagged']:
+                self.flagged.append(entry)
+
+    def report(self, top=None, sort='wall_ms'):
+        with self.lock:
+            routes = [
+                {
+                    'route': route,
+                    'count': stats.count,
+                    'flagged': stats.flagged,
+                    **{metric: histogram.summary() for metric, histogram in stats.histograms.items()},
+                }
+                for route, stats in self.routes.items()
+            ]
+            flagged = list(self.flagged)
+            recent = list(self.recent)
+
+        def sort_key(row):
+            value = row[sort]
+            if isinstance(value, dict):
+                return value['p95']
+            return -1 if value is None else value
+
+        def tail(items):
+            return items[-top:] if top else items
+
+        routes.sort(key=sort_key, reverse=True)
+        return {
+            'since': self.since,
+            'sample_rate': getattr(settings, 'PERF_SAMPLE_RATE', 0),
+            'query_threshold': getattr(settings, 'PERF_QUERY_THRESHOLD', 0),
+            'routes': routes[:top] if top else routes,
+            'flagged': tail(flagged),
+            'recent': tail(recent),
+        }
+
+    def maybe_dump(self):
+        path = getattr(settings, 'PERF_DUMP_PATH', None)
+        interval = getattr(settings, 'PERF_DUMP_INTERVAL', 300)
+        with self.lock:
+            if not path or time.monotonic() - self.last_dump < interval:
+                return
+            self.last_dump = time.monotonic()
+        self.dump(path)
+
+    def dump(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, suffix='.tmp') as handle:
+            json.dump(self.report(), handle, default=str)
+        # Readers never see a half written file
+        os.replace(handle.name, path)
+
+
+recorder = PerfRecorder(getattr(settings, 'PERF_BUFFER_SIZE', 1000))
+
+
+def route_name(view_func, method):
+    """'facility.AdmissionViewSet.discharge' for viewsets, 'app.View.get' otherwise."""
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if view_class is None:
+        return f"{view_func.__module__.split('.')[0]}.{view_func.__name__}"
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f"{view_class.__module__.split('.')[0]}.{view_class.__name__}.{action}"
+
+
+class PerfMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 0)
+        self.query_threshold = getattr(settings, 'PERF_QUERY_THRESHOLD', 0)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sampled = random.random() < self.sample_rate
+        if not sampled and not self.query_threshold:
+            return self.get_response(request)
+
+        sample = Sample(sampled)
+        started = perf_counter()
+        with self.tracking(request, sample):
+            response = self.get_response(request)
+        self.finish(request, response, sample, perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        sampled = random.random() < self.sample_rate
+        if not sampled and not self.query_threshold:
+            return await self.get_response(request)
+
+        sample = Sample(sampled)
+        started = perf_counter()
+        request._perf_sample = sample
+        token = _current.set(sample if sampled else None)
+        # The ORM runs in the request's sync thread, which has its own
+        # connection objects, so the wrappers are installed from there.
+        stack = ExitStack()
+        await sync_to_async(self.track_queries)(stack, sample)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        self.finish(request, response, sample, perf_counter() - started)
+        return response
+
+    @contextmanager
+    def tracking(self, request, sample):
+        request._perf_sample = sample
+        token = _current.set(sample if sample.sampled else None)
+        try:
+            with ExitStack() as stack:
+                self.track_queries(stack, sample)
+                yield
+        finally:
+            _current.reset(token)
+
+    @staticmethod
+    def track_queries(stack, sample):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(sample.track_query))
+
+    def finish(self, request, response, sample, wall_time):
+        sampled = sample.sampled
+        flagged = bool(self.query_threshold) and sample.queries > self.query_threshold
+        if flagged:
+            logger.warning(
+                "%s %s ran %d queries (threshold %d) in %.1f ms",
+                request.method, request.path, sample.queries, self.query_threshold, wall_time * 1000,
+            )
+        if sampled or flagged:
+            recorder.record({
+                'route': sample.route or request.path,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'at': time.time(),
+                'sampled': sampled,
+                'flagged': flagged,
+                'wall_ms': round(wall_time * 1000, 3),
+                'queries': sample.queries,
+                'db_ms': round(sample.db_time * 1000, 3),
+                'serializer_ms': round(sample.serializer_time * 1000, 3) if sampled else None,
+                'bytes': None if response.streaming else len(response.content),
+            })
+            recorder.maybe_dump()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        sample = getattr(request, '_perf_sample', None)
+        if sample is not None:
+            sample.route = route_name(view_func, request.method)
+        return None
+
+
+class PerfReportView(APIView):
+    """
+    GET: slowest routes first (?top=N, ?sort=wall_ms|queries|db_ms|serializer_ms|bytes|count|flagged),
+    and the hit ratios of the list cache.
+    DELETE: clear the collected statistics.
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        sort = request.query_params.get('sort', 'wall_ms')
+        if sort not in METRICS and sort not in ('count', 'flagged'):
+            return Response({"error": f"Unknown sort {sort!r}"}, status=status.HTTP_400_BAD_REQUEST)
+        top = request.query_params.get('top')
+        if top is not None and not top.isdigit():
+            return Response({"error": "top must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+        report = recorder.report(top=int(top) if top else None, sort=sort)
+        report['list_cache'] = list_cache.stats()
+        return Response(report)
+
+    def delete(self, request):
+        recorder.reset()
+        list_cache.reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -32,14 +32,20 @@ INSTALLED_APPS = [
     'users',
     'clinical',
     'facility',
+    'analytics',
+    'benchmarks',
+    'jobs',
+    'events',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'hospital_management.profiling.PerfMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hospital_management.db_router.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,17 +70,71 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'hospital_management.wsgi.application'
+ASGI_APPLICATION = 'hospital_management.asgi.application'
+
+# Serve list/retrieve on the read-heavy viewsets from async views
+# (mixins.AsyncReadMixin). asgi.py turns this on; leave it off under WSGI,
+# where every async view would need its own event loop.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', '0') == '1'
 
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# DB_ENGINE=postgres switches to PostgreSQL configured from the DB_* variables.
+# Replicas are listed in DB_REPLICA_HOSTS (postgres) or DB_REPLICA_NAMES
+# (sqlite files, handy for trying the router locally).
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    primary = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'hospital_management'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+    if os.environ.get('DB_POOL_MAX_SIZE'):
+        # psycopg 3 server-side pool; persistent connections must be off
+        primary['CONN_MAX_AGE'] = 0
+        primary['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ['DB_POOL_MAX_SIZE']),
+                'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            },
+        }
+    replicas = [
+        {**primary, 'HOST': host.strip()}
+        for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host.strip()
+    ]
+else:
+    primary = {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        # Take the write lock when a transaction starts, so concurrent writers
+        # queue up instead of failing with "database is locked" mid-transaction
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
     }
-}
+    replicas = [
+        {**primary, 'NAME': name.strip()}
+        for name in os.environ.get('DB_REPLICA_NAMES', '').split(',') if name.strip()
+    ]
+
+DATABASES = {'default': primary}
+DATABASE_REPLICAS = []
+for number, replica in enumerate(replicas, start=1):
+    alias = f'replica{number}'
+    # Tests run against the primary only
+    DATABASES[alias] = {**replica, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['hospital_management.db_router.PrimaryReplicaRouter'] if DATABASE_REPLICAS else []
+# After a write, the client's reads stay on the primary for this long
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
 
 
 # Password validation
@@ -118,17 +178,102 @@ AUTH_USER_MODEL = 'users.User'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'pagination.StandardPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Processes hashing passwords for the bulk import endpoints (users.bulk).
+# Each request starts its own pool, so the default of 1 hashes in the web
+# worker; large imports belong in `manage.py import_users --workers N`.
+BULK_IMPORT_WORKERS = int(os.environ.get('BULK_IMPORT_WORKERS', 1))
+
+# Token -> user/profile cache used by CachedTokenAuthentication. Set
+# AUTH_TOKEN_CACHE_ALIAS to a CACHES alias to share entries across workers;
+# a logout or user change then takes effect on all of them at once. Without
+# one, other workers may accept the old entry for AUTH_TOKEN_CACHE_TTL seconds.
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TTL = 60
+AUTH_TOKEN_CACHE_ALIAS = os.environ.get('AUTH_TOKEN_CACHE_ALIAS') or None
+
+# Versions behind the ETags of reference data (mixins.ConditionalGetMixin)
+# and the cached list pages (mixins.CachedListMixin). With several workers,
+# set RESOURCE_VERSION_CACHE_ALIAS to a shared CACHES alias: versions are
+# then read from it on every request, so a change takes effect everywhere
+# as soon as it commits. Without one, each worker keeps its own versions
+# and may serve a stale 304 or cached page for up to RESOURCE_VERSION_TTL
+# seconds after a change made on another worker.
+RESOURCE_VERSION_CACHE_ALIAS = os.environ.get('RESOURCE_VERSION_CACHE_ALIAS') or None
+RESOURCE_VERSION_TTL = 60
+
+# Serialized list pages cached by mixins.CachedListMixin (hit ratios at
+# /api/_perf/). LIST_CACHE_ALIAS moves them from the in-process LRU to a
+# shared CACHES entry.
+LIST_CACHE_ALIAS = os.environ.get('LIST_CACHE_ALIAS') or None
+LIST_CACHE_SIZE = 2048
+LIST_CACHE_TTL = 300
+
+# Appointment slots: fixed length, offered inside working hours up to the
+# horizon. SLOT_INDEX_TTL bounds how stale another worker's bookings can be.
+APPOINTMENT_SLOT_MINUTES = 30
+APPOINTMENT_DAY_START = 9
+APPOINTMENT_DAY_END = 17
+APPOINTMENT_HORIZON_DAYS = 28
+SLOT_INDEX_TTL = 60
+
+# Request profiling (hospital_management.profiling, report at /api/_perf/).
+# Every request is checked against PERF_QUERY_THRESHOLD (0 disables it);
+# PERF_SAMPLE_RATE of them are fully timed into the per-route histograms.
+PERF_SAMPLE_RATE = float(os.environ.get('PERF_SAMPLE_RATE', '0.05'))
+PERF_QUERY_THRESHOLD = int(os.environ.get('PERF_QUERY_THRESHOLD', '50'))
+PERF_BUFFER_SIZE = 1000
+PERF_DUMP_PATH = os.environ.get('PERF_DUMP_PATH') or None
+PERF_DUMP_INTERVAL = int(os.environ.get('PERF_DUMP_INTERVAL', '300'))
+
+# Background jobs (jobs.queue, worker: manage.py run_jobs). A job held by a
+# worker for longer than JOB_LEASE_SECONDS is assumed lost and queued again.
+JOB_LEASE_SECONDS = 600
+JOB_MAX_BACKOFF = 3600
+# Files written by queued exports
+EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(BASE_DIR, 'exports'))
+
+# Change feed at /api/events/ (events.feed). Streams and long polls check
+# for new events every EVENT_POLL_INTERVAL seconds; a stream ends after
+# EVENT_STREAM_SECONDS and the client reconnects with Last-Event-ID.
+EVENT_POLL_INTERVAL = 0.5
+EVENT_STREAM_SECONDS = 300
+EVENT_SETTLE_SECONDS = 1
+EVENT_RETENTION_HOURS = 24
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Hospital Management System API',
     'DESCRIPTION': 'API documentation for the Hospital Management System backend.',
     'VERSION': '1.0.0',
     'SERVE_INCLUDE_SCHEMA': False,
-}
\ No newline at end of file
+}
+
+# Set DB_QUERY_LOG to a file path to record SQL for `manage.py index_advisor`.
+# Django only logs queries while DEBUG is on.
+if os.environ.get('DB_QUERY_LOG'):
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {
+            'query_log': {
+                'class': 'logging.FileHandler',
+                'filename': os.environ['DB_QUERY_LOG'],
+            },
+        },
+        'loggers': {
+            'django.db.backends': {
+                'handlers': ['query_log'],
+                'level': 'DEBUG',
+                'propagate': False,
+            },
+        },
+    }
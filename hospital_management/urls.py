@@ -5,16 +5,22 @@ from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
-from users.views import UserViewSet
+from users.views import UserViewSet, LogoutView
+from hospital_management.profiling import PerfReportView
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/token/', obtain_auth_token),
+    path('api/token/logout/', LogoutView.as_view()),
     path('api/users/', include('users.urls')),
     path('api/clinical/', include('clinical.urls')),
     path('api/facility/', include('facility.urls')),
+    path('api/analytics/', include('analytics.urls')),
+    path('api/jobs/', include('jobs.urls')),
+    path('api/events/', include('events.urls')),
     path('api/auth/', include('rest_framework.urls')),
+    path('api/_perf/', PerfReportView.as_view()),
 
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import Job
+from .queue import retry
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('idempotency_key',)
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'result', 'created_at', 'finished_at')
+    actions = ['retry_failed']
+
+    @admin.action(description="Retry selected failed jobs")
+    def retry_failed(self, request, queryset):
+        retried = sum(retry(job) for job in queryset.filter(status='FAILED'))
+        self.message_user(request, f"Queued {retried} job(s) again.")
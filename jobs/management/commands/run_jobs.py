@@ -0,0 +1,34 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import Worker, queue_depth, registered_tasks
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs until stopped (SIGTERM/SIGINT finish the current job first)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--task', action='append', choices=registered_tasks(), help="Only run these tasks.")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due.")
+        parser.add_argument('--max-jobs', type=int, help="Exit after running this many jobs.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--depth', action='store_true', help="Print the queue depth and exit.")
+
+    def handle(self, *args, **options):
+        if options['depth']:
+            depth = queue_depth()
+            for status, count in depth['by_status'].items():
+                self.stdout.write(f"{status:10} {count}")
+            for name, counts in depth['by_task'].items():
+                self.stdout.write(f"  {name}: " + ", ".join(f"{s.lower()} {c}" for s, c in sorted(counts.items())))
+            self.stdout.write(f"Due now: {depth['due']} (oldest waiting {depth['oldest_due_seconds'] or 0}s)")
+            return
+
+        worker = Worker(names=options['task'], poll_interval=options['poll_interval'])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+
+        self.stdout.write(f"Worker {worker.name} started")
+        done = worker.run(burst=options['burst'], max_jobs=options['max_jobs'])
+        self.stdout.write(self.style.SUCCESS(f"Ran {done} job(s)"))
@@ -0,0 +1,243 @@
+"""
+A small job queue kept in the project database.
+
+Functions are registered with ``@task`` in an app's tasks.py and queued
+with ``enqueue()``. Because the job row is written with the same database
+connection, a job queued inside a transaction only becomes visible to the
+workers if that transaction commits.
+
+Workers (``manage.py run_jobs``) claim due jobs with a conditional UPDATE,
+so two workers never run the same job. The task itself runs outside any
+transaction, so it opens its own where it needs them and holds no write
+lock for its whole run; only the status changes are single UPDATEs. A
+failed attempt is retried after an exponential backoff until the task's
+max_attempts is used up; a job whose worker died is queued again once its
+lease (JOB_LEASE_SECONDS) has expired, or failed if it has no attempts left.
+"""
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class Task:
+    def __init__(self, func, name, max_attempts, backoff):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        # Seconds before the first retry; doubled for every further attempt
+        self.backoff = backoff
+
+    def enqueue(self, key=None, run_at=None, **kwargs):
+        return enqueue(self.name, key=key, run_at=run_at, **kwargs)
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+
+def task(name, max_attempts=5, backoff=30):
+    """
+    Registers a function as the job ``name``. It is called with the job's
+    keyword arguments, which must be JSON serializable, and may return a
+    JSON serializable result.
+    """
+    def register(func):
+        _registry[name] = Task(func, name, max_attempts, backoff)
+        return _registry[name]
+    return register
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"No task named {name!r}")
+
+
+def registered_tasks():
+    return sorted(_registry)
+
+
+def enqueue(name, key=None, run_at=None, **kwargs):
+    """
+    Queues the job ``name`` to run at ``run_at`` (default: now).
+
+    With an idempotency ``key`` only the first call creates a job; later
+    calls return that job, whatever its status.
+    """
+    registered = get_task(name)
+    fields = {
+        'name': name,
+        'kwargs': kwargs,
+        'max_attempts': registered.max_attempts,
+        'run_at': run_at or timezone.now(),
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    job, _ = Job.objects.get_or_create(idempotency_key=key, defaults=fields)
+    return job
+
+
+def backoff_delay(task, attempts):
+    delay = task.backoff * 2 ** max(attempts - 1, 0)
+    delay = min(delay, getattr(settings, 'JOB_MAX_BACKOFF', 3600))
+    # Jitter, so jobs that failed together do not all retry together
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim(worker, names=None):
+    """Marks the next due job RUNNING for ``worker`` and returns it, or None."""
+    while True:
+        now = timezone.now()
+        due = Job.objects.filter(status='QUEUED', run_at__lte=now)
+        if names:
+            due = due.filter(name__in=names)
+        candidates = list(due.order_by('run_at', 'pk').values_list('pk', flat=True)[:10])
+        if not candidates:
+            return None
+
+        for pk in candidates:
+            claimed = Job.objects.filter(pk=pk, status='QUEUED').update(
+                status='RUNNING', locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return Job.objects.get(pk=pk)
+        # Every candidate was taken by another worker; look again
+
+
+def run_job(job):
+    """Runs a claimed job and records the outcome. Returns the job."""
+    try:
+        registered = get_task(job.name)
+    except LookupError as e:
+        registered = None
+        error = str(e)
+    else:
+        try:
+            result = registered.func(**job.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+        else:
+            error = None
+
+    now = timezone.now()
+    if error is None:
+        job.status = 'SUCCEEDED'
+        job.result = result
+        job.last_error = ''
+        job.finished_at = now
+    elif registered is not None and job.attempts < job.max_attempts:
+        job.status = 'QUEUED'
+        job.last_error = error
+        job.run_at = now + backoff_delay(registered, job.attempts)
+        logger.warning("Job %s attempt %d failed, retrying at %s", job, job.attempts, job.run_at)
+    else:
+        job.status = 'FAILED'
+        job.last_error = error
+        job.finished_at = now
+        logger.error("Job %s failed after %d attempt(s)", job, job.attempts)
+
+    fields = ['status', 'result', 'last_error', 'run_at', 'finished_at']
+    # Only while we still hold the job: past the lease it may have been
+    # requeued and claimed by another worker, whose outcome counts instead
+    recorded = Job.objects.filter(pk=job.pk, status='RUNNING', locked_by=job.locked_by).update(
+        locked_by='', locked_at=None, **{name: getattr(job, name) for name in fields},
+    )
+    if not recorded:
+        logger.warning("Job %s #%s was taken over after its lease expired; dropping this outcome", job.name, job.pk)
+        job.refresh_from_db()
+        return job
+    job.locked_by = ''
+    job.locked_at = None
+    return job
+
+
+def requeue_stale(lease=None):
+    """
+    Queues RUNNING jobs again whose worker has held them past the lease, or
+    marks them FAILED when they have used up their attempts. Returns the
+    number of jobs requeued.
+    """
+    lease = lease or getattr(settings, 'JOB_LEASE_SECONDS', 600)
+    now = timezone.now()
+    stale = Job.objects.filter(status='RUNNING', locked_at__lt=now - timedelta(seconds=lease))
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='FAILED', locked_by='', locked_at=None, finished_at=now,
+        last_error=f"Worker lease of {lease}s expired on the last attempt",
+    )
+    if failed:
+        logger.error("%d job(s) failed after their worker's lease expired on the last attempt", failed)
+    return stale.update(status='QUEUED', locked_by='', locked_at=None, run_at=now)
+
+
+def retry(job):
+    """Queues a FAILED job again with a fresh set of attempts."""
+    return Job.objects.filter(pk=job.pk, status='FAILED').update(
+        status='QUEUED', attempts=0, run_at=timezone.now(), finished_at=None,
+    )
+
+
+def queue_depth():
+    """Job counts per status and per task, and how late the oldest due job is."""
+    now = timezone.now()
+    by_status = {status: 0 for status, _ in Job.STATUS_CHOICES}
+    by_task = {}
+    for row in Job.objects.values('name', 'status').annotate(count=Count('pk')).order_by('name'):
+        by_status[row['status']] += row['count']
+        by_task.setdefault(row['name'], {})[row['status']] = row['count']
+
+    due = Job.objects.filter(status='QUEUED', run_at__lte=now)
+    oldest = due.aggregate(oldest=Min('run_at'))['oldest']
+    return {
+        'by_status': by_status,
+        'by_task': by_task,
+        'due': due.count(),
+        'oldest_due_seconds': round((now - oldest).total_seconds(), 1) if oldest else None,
+    }
+
+
+class Worker:
+    def __init__(self, names=None, poll_interval=1.0, name=None):
+        self.names = names
+        self.poll_interval = poll_interval
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+
+    def stop(self, *args):
+        # Finishes the job at hand, then returns from run()
+        self.stopping = True
+
+    def run(self, burst=False, max_jobs=None):
+        """
+        Runs jobs until stopped, or until no job is due when ``burst`` is set.
+        Returns the number of jobs run.
+        """
+        done = 0
+        last_sweep = 0
+        while not self.stopping and (max_jobs is None or done < max_jobs):
+            if time.monotonic() - last_sweep > self.poll_interval * 30:
+                requeue_stale()
+                last_sweep = time.monotonic()
+
+            job = claim(self.name, self.names)
+            if job is None:
+                if burst:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            run_job(job)
+            done += 1
+        return done
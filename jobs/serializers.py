@@ -0,0 +1,19 @@
+from rest_framework import serializers
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'name', 'kwargs', 'status', 'attempts', 'max_attempts', 'run_at',
+            'last_error', 'result', 'created_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+
+class QueueDepthSerializer(serializers.Serializer):
+    by_status = serializers.DictField(child=serializers.IntegerField())
+    by_task = serializers.DictField(child=serializers.DictField(child=serializers.IntegerField()))
+    due = serializers.IntegerField()
+    oldest_due_seconds = serializers.FloatField(allow_null=True)
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from .models import Job
+from .queue import claim, enqueue, requeue_stale, run_job, task
+
+seen = {}
+
+
+@task('jobs.tests.probe', max_attempts=2)
+def probe(**kwargs):
+    seen['in_transaction'] = connection.in_atomic_block
+    return {'ok': True}
+
+
+class RunJobTransactionTests(TransactionTestCase):
+    def test_task_runs_outside_a_transaction(self):
+        enqueue('jobs.tests.probe')
+        job = run_job(claim('worker-1'))
+        self.assertEqual(job.status, 'SUCCEEDED')
+        self.assertIs(seen['in_transaction'], False)
+
+
+class LeaseTests(TestCase):
+    def expire_lease(self, job):
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+    def test_stale_job_with_attempts_left_is_requeued(self):
+        job = enqueue('jobs.tests.probe')
+        claim('worker-1')
+        self.expire_lease(job)
+        self.assertEqual(requeue_stale(lease=60), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('QUEUED', ''))
+
+    def test_stale_job_on_its_last_attempt_fails(self):
+        job = enqueue('jobs.tests.probe')
+        Job.objects.filter(pk=job.pk).update(attempts=1)
+        claim('worker-1')
+        self.expire_lease(job)
+        self.assertEqual(requeue_stale(lease=60), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIsNotNone(job.finished_at)
+
+    def test_outcome_is_dropped_once_another_worker_took_over(self):
+        enqueue('jobs.tests.probe')
+        first = claim('worker-1')
+        self.expire_lease(first)
+        requeue_stale(lease=60)
+        second = claim('worker-2')
+
+        job = run_job(first)
+        self.assertEqual((job.status, job.locked_by), ('RUNNING', 'worker-2'))
+        self.assertEqual(run_job(second).status, 'SUCCEEDED')
@@ -0,0 +1,39 @@
+from rest_framework.viewsets import ReadOnlyModelViewSet
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework import status
+from permissions import IsAdmin
+from pagination import TimeCursorPagination
+from .models import Job
+from .queue import queue_depth, retry
+from .serializers import JobSerializer, QueueDepthSerializer
+
+
+class JobViewSet(ReadOnlyModelViewSet):
+    """Background jobs, newest first; filter with ?status= and ?name=."""
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAdmin]
+    pagination_class = TimeCursorPagination
+    cursor_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        if params.get('status'):
+            queryset = queryset.filter(status=params['status'])
+        if params.get('name'):
+            queryset = queryset.filter(name=params['name'])
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def depth(self, request):
+        return Response(QueueDepthSerializer(queue_depth()).data)
+
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        job = self.get_object()
+        if not retry(job):
+            return Response({"error": "Only failed jobs can be retried"}, status=status.HTTP_400_BAD_REQUEST)
+        job.refresh_from_db()
+        return Response(JobSerializer(job).data)
@@ -0,0 +1,356 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from caching import list_cache, resource_versions
+from hospital_management.profiling import timed_representation
+
+
+class SparseFieldsetMixin:
+    """
+    Lets read requests pick the serialized fields with ``?fields=id,status``.
+    Only the top-level serializer is trimmed; nested serializers are kept whole.
+    """
+    fields_query_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        requested = request.query_params.get(self.fields_query_param)
+        if not requested:
+            return
+
+        allowed = {name.strip() for name in requested.split(',') if name.strip()}
+        for name in set(self.fields) - allowed:
+            self.fields.pop(name)
+
+    def to_representation(self, instance):
+        # Charged to the request's serializer time when it is being profiled
+        return timed_representation(super().to_representation, instance)
+
+
+class QueryPlan:
+    def __init__(self):
+        self.select_related = set()
+        self.prefetch_related = set()
+        self.only = set()
+        # Cleared when a field reads something only() cannot describe
+        self.can_defer = True
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except Exception:
+        return None
+
+
+def _plan_fields(serializer, model, prefix, plan, prefetched=False):
+    # Columns of prefetched rows are loaded by a separate query, so only()
+    # on the outer queryset must not mention them.
+    def use_column(lookup):
+        if not prefetched:
+            plan.only.add(lookup)
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if not field.source_attrs:
+            # source='*' hands the whole instance to the field
+            plan.can_defer = False
+            continue
+
+        current_model = model
+        path = prefix
+        attrs = field.source_attrs
+        for index, attr in enumerate(attrs):
+            model_field = _model_field(current_model, attr)
+            lookup = f"{path}__{attr}" if path else attr
+            is_last = index == len(attrs) - 1
+
+            if model_field is None:
+                # Property or method: we cannot tell which columns it reads
+                plan.can_defer = False
+                break
+
+            if not model_field.is_relation:
+                use_column(lookup)
+                break
+
+            if model_field.many_to_many or model_field.one_to_many:
+                plan.prefetch_related.add(lookup)
+                if is_last and isinstance(field, serializers.ListSerializer):
+                    _plan_fields(field.child, model_field.related_model, lookup, plan, prefetched=True)
+                break
+
+            # Forward or reverse one-to-one / many-to-one
+            if is_last and isinstance(field, serializers.PrimaryKeyRelatedField) and not model_field.auto_created:
+                use_column(lookup)
+                break
+
+            (plan.prefetch_related if prefetched else plan.select_related).add(lookup)
+            if not model_field.auto_created:
+                use_column(lookup)
+            current_model = model_field.related_model
+            path = lookup
+
+            if is_last:
+                if isinstance(field, serializers.BaseSerializer):
+                    _plan_fields(field, current_model, lookup, plan, prefetched)
+                else:
+                    # e.g. StringRelatedField calls __str__ on the related row
+                    plan.can_defer = False
+
+
+def plan_serializer(serializer, model):
+    """
+    Works out the select_related/prefetch_related/only() calls needed to
+    serialize ``model`` instances with ``serializer`` without extra queries.
+    """
+    plan = QueryPlan()
+    _plan_fields(serializer, model, '', plan)
+    return plan
+
+
+class QueryPlannerMixin:
+    """
+    Viewset mixin that joins or prefetches everything the serializer reads.
+
+    Views that narrow the queryset should start from ``super().get_queryset()``.
+    On read actions the selected columns are also restricted with only().
+    """
+    defer_actions = ('list', 'retrieve')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        plan = plan_serializer(self.get_serializer(), queryset.model)
+
+        if plan.select_related:
+            queryset = queryset.select_related(*sorted(plan.select_related))
+        if plan.prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(plan.prefetch_related))
+        if plan.can_defer and plan.only and self.action in self.defer_actions:
+            queryset = queryset.only('pk', *sorted(plan.only))
+        return queryset
+
+
+class AsyncReadMixin:
+    """
+    Serves list/retrieve from an async view when ASYNC_READ_VIEWS is on
+    (hospital_management/asgi.py turns it on).
+
+    Authentication, permissions and get_queryset() still run synchronously,
+    but the rows are fetched with the async ORM and the response is built on
+    the event loop, so slow clients wait in a task rather than a worker.
+    Every other method goes through the regular sync view.
+    """
+    async_actions = ('list', 'retrieve')
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        async_methods = {
+            method: name for method, name in actions.items() if name in cls.async_actions
+        }
+        if not getattr(settings, 'ASYNC_READ_VIEWS', False) or not async_methods:
+            return view
+
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            name = async_methods.get(request.method.lower())
+            if name is None:
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            return await self.async_dispatch(request, actions, name, *args, **kwargs)
+
+        # Routers, middleware and the schema generator read these off the view
+        async_view.__name__ = view.__name__
+        async_view.__qualname__ = view.__qualname__
+        async_view.__module__ = view.__module__
+        async_view.__doc__ = view.__doc__
+        async_view.__dict__.update(view.__dict__)
+        return async_view
+
+    async def async_dispatch(self, request, actions, name, *args, **kwargs):
+        # The same set up as ViewSet.as_view() and APIView.dispatch()
+        self.action_map = actions
+        for method, action_name in actions.items():
+            setattr(self, method, getattr(self, action_name))
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            queryset = await sync_to_async(self.prepare_read)(request, *args, **kwargs)
+            if name == 'list':
+                response = await self.alist(queryset)
+            else:
+                response = await self.aretrieve(queryset)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    def prepare_read(self, request, *args, **kwargs):
+        self.initial(request, *args, **kwargs)
+        return self.filter_queryset(self.get_queryset())
+
+    async def alist(self, queryset):
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer([obj async for obj in queryset], many=True).data)
+
+    async def aretrieve(self, queryset):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            instance = await queryset.aget(**lookup)
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+        self.check_object_permissions(self.request, instance)
+        return Response(self.get_serializer(instance).data)
+
+
+class CachedListMixin:
+    """
+    Opt-in cache of serialized list pages, for lists polled by many clients.
+
+    Pages are keyed by the view, the full URL (filters, page, ?fields=),
+    the renderer, the user unless ``cache_per_user`` is off, and the
+    resource versions of every model the serializer reads plus
+    ``cache_models``. Saving or deleting any of those rows bumps its version
+    (caching.resource_versions), so no stale page is served once the change
+    has committed; on other workers too when RESOURCE_VERSION_CACHE_ALIAS
+    names a shared cache. Only turn ``cache_per_user`` off when
+    get_queryset() does not depend on the user.
+    """
+    cache_per_user = True
+    cache_models = ()
+
+    def get_cache_models(self):
+        model = self.queryset.model
+        plan = plan_serializer(self.get_serializer(), model)
+        models = {model, *self.cache_models}
+        for lookup in plan.select_related | plan.prefetch_related:
+            current = model
+            for name in lookup.split('__'):
+                current = current._meta.get_field(name).related_model
+                models.add(current)
+        return sorted(models, key=lambda m: m._meta.label)
+
+    def get_list_cache_key(self, request):
+        digest = hashlib.sha256()
+        parts = [
+            f'{type(self).__module__}.{type(self).__qualname__}',
+            request.build_absolute_uri(),
+            getattr(request.accepted_renderer, 'format', ''),
+            str(request.user.pk) if self.cache_per_user else '*',
+        ]
+        parts += [token for token, _ in resource_versions.get_many(self.get_cache_models())]
+        for part in parts:
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return 'list-cache:' + digest.hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_list_cache_key(request)
+        data = list_cache.get(type(self).__name__, key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            list_cache.set(key, response.data)
+        return response
+
+    async def alist(self, queryset):
+        # The async list of AsyncReadMixin
+        key = await sync_to_async(self.get_list_cache_key)(self.request)
+        data = await list_cache.aget(type(self).__name__, key)
+        if data is not None:
+            return Response(data)
+        response = await super().alist(queryset)
+        if response.status_code == 200:
+            await list_cache.aset(key, response.data)
+        return response
+
+
+class NotModified(Exception):
+    pass
+
+
+class ConditionalGetMixin:
+    """
+    Viewset mixin for reference data that rarely changes.
+
+    list/retrieve responses carry a strong ETag and a Last-Modified built
+    from the resource versions of ``version_models`` (default: the
+    queryset's model), which caching.resource_versions bumps on every
+    change. A request whose If-None-Match or If-Modified-Since still
+    matches is answered 304 after authentication and permissions, before
+    any query against the resource itself.
+    """
+    conditional_actions = ('list', 'retrieve')
+    version_models = None
+
+    def get_version_models(self):
+        return self.version_models or (self.queryset.model,)
+
+    def get_validators(self, request):
+        versions = resource_versions.get_many(self.get_version_models())
+        # The same data paged, trimmed with ?fields= or rendered differently is another representation
+        digest = hashlib.sha256()
+        for token, _ in versions:
+            digest.update(token.encode())
+        digest.update(request.get_full_path().encode())
+        digest.update(getattr(request.accepted_renderer, 'format', '').encode())
+        return f'"{digest.hexdigest()[:32]}"', int(max(modified for _, modified in versions))
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = None
+        if request.method in ('GET', 'HEAD') and self.action in self.conditional_actions:
+            self.validators = self.get_validators(request)
+            if not_modified(request, *self.validators):
+                raise NotModified
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=304)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, 'validators', None)
+        if validators is not None and response.status_code in (200, 304):
+            etag, modified = validators
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(modified)
+            # Stored by the client, but checked with us before every use
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+def not_modified(request, etag, modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        # Weak comparison, as RFC 9110 asks for If-None-Match
+        tags = parse_etags(if_none_match)
+        return '*' in tags or etag.removeprefix('W/') in [tag.removeprefix('W/') for tag in tags]
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since'))
+    return since is not None and modified <= since
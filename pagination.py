@@ -0,0 +1,132 @@
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
+
+
+class StandardPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Page boundaries are only stable on an ordered queryset
+        if not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() with the count and the page fetched by the async ORM."""
+        if not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached_property; filling it in keeps page() off the database
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+
+class TimeCursorPagination(CursorPagination):
+    """
+    Keyset pagination for time-ordered resources.
+
+    The view declares the ordering with ``cursor_ordering``, e.g.
+    ``('-appointment_date', '-id')``; the leading field should be indexed.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-id',)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', self.ordering)
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    # CursorPagination.paginate_queryset, split around its single query so
+    # the async views can run that query with the async ORM.
+
+    def paginate_queryset(self, queryset, request, view=None):
+        window = self._page_window(queryset, request, view)
+        if window is None:
+            return None
+        return self._set_page(list(window))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        window = self._page_window(queryset, request, view)
+        if window is None:
+            return None
+        return self._set_page([obj async for obj in window])
+
+    def _page_window(self, queryset, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            order_attr = order.lstrip('-')
+            # (cursor reversed) XOR (ordering reversed)
+            if self.cursor.reverse != order.startswith('-'):
+                queryset = queryset.filter(**{order_attr + '__lt': current_position})
+            else:
+                queryset = queryset.filter(**{order_attr + '__gt': current_position})
+
+        # One extra row tells whether another page follows
+        return queryset[offset:offset + self.page_size + 1]
+
+    def _set_page(self, results):
+        offset, reverse, current_position = self.cursor or (0, False, None)
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # The query ran in reverse, so put the rows back in display order
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
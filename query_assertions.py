@@ -0,0 +1,55 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+
+
+def list_endpoint_urls(prefix='/api/'):
+    """Paths of every router-registered list endpoint under ``prefix``."""
+    urls = []
+
+    def walk(patterns, base):
+        for pattern in patterns:
+            route = base + str(pattern.pattern).lstrip('^').rstrip('$')
+            if hasattr(pattern, 'url_patterns'):
+                walk(pattern.url_patterns, route)
+            elif (pattern.name or '').endswith('-list') and '<' not in route and '(' not in route:
+                path = '/' + route.replace('\\.', '.')
+                if path.startswith(prefix) and not path.endswith('.'):
+                    urls.append(path)
+
+    walk(get_resolver().url_patterns, '')
+    return sorted(set(urls))
+
+
+def count_list_queries(client, url, page_size, **params):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, {'page_size': page_size, **params})
+    if response.status_code != 200:
+        raise AssertionError(f"GET {url} returned {response.status_code}")
+    return len(context.captured_queries)
+
+
+def assert_list_query_count(client, url, expected=None, page_sizes=(1, 10, 50), **params):
+    """
+    Asserts ``url`` issues the same number of queries whatever the page size
+    (and exactly ``expected`` queries when given).
+    """
+    counts = {size: count_list_queries(client, url, size, **params) for size in page_sizes}
+    distinct = set(counts.values())
+    if len(distinct) != 1:
+        raise AssertionError(f"GET {url} query count depends on page size: {counts}")
+    if expected is not None and distinct != {expected}:
+        raise AssertionError(f"GET {url} issued {distinct.pop()} queries, expected {expected}")
+    return distinct.pop()
+
+
+def assert_all_list_query_counts(client, expected=None, page_sizes=(1, 10, 50), urls=None, prefix='/api/'):
+    """
+    Runs assert_list_query_count() against every list endpoint (or ``urls``).
+    ``expected`` may be an int or a dict of url -> int.
+    """
+    results = {}
+    for url in urls or list_endpoint_urls(prefix):
+        url_expected = expected.get(url) if isinstance(expected, dict) else expected
+        results[url] = assert_list_query_count(client, url, url_expected, page_sizes)
+    return results
@@ -0,0 +1,38 @@
+import itertools
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+
+def is_asgi(request):
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def aiterate(iterator, chunks=64):
+    """
+    Yields the items of a sync ``iterator`` without blocking the event loop:
+    up to ``chunks`` items are pulled per trip to the sync thread, which is
+    the one the view ran in, so database cursors keep working.
+    """
+    iterator = iter(iterator)
+    take = sync_to_async(lambda: list(itertools.islice(iterator, chunks)))
+    try:
+        while batch := await take():
+            for item in batch:
+                yield item
+    finally:
+        if hasattr(iterator, 'close'):
+            await sync_to_async(iterator.close)()
+
+
+def for_server(request, response):
+    """
+    Makes a StreamingHttpResponse or FileResponse stream under ASGI too.
+
+    Django's ASGI handler reads a sync iterator to the end before sending
+    anything, so a large export or file would sit in memory first. Under
+    ASGI the content is handed over as an async iterator instead.
+    """
+    if is_asgi(request) and not response.is_async:
+        response.streaming_content = aiterate(response.streaming_content)
+    return response
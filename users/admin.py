@@ -10,9 +10,11 @@ class UserAdmin(admin.ModelAdmin):
 @admin.register(Doctor)
 class DoctorAdmin(admin.ModelAdmin):
     list_display = ('user', 'specialization', 'experience', 'charges', 'is_available')
+    list_select_related = ('user',)
     list_filter = ('specialization', 'is_available')
 
 @admin.register(Patient)
 class PatientAdmin(admin.ModelAdmin):
     list_display = ('user', 'blood_group', 'city', 'created_date')
+    list_select_related = ('user',)
     list_filter = ('blood_group', 'city')
\ No newline at end of file
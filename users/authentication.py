@@ -0,0 +1,165 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from caching import LRUCache
+from .models import User
+
+# User columns kept in the cache; anything else is loaded lazily on access
+USER_FIELDS = [
+    'id', 'username', 'email', 'first_name', 'last_name', 'role',
+    'is_active', 'is_deleted', 'is_staff', 'is_superuser',
+]
+
+local_cache = LRUCache(
+    maxsize=getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 60),
+)
+
+
+def profile_relations():
+    """Reverse one-to-one relations of User, e.g. patient_profile, doctor_profile, staff_profile."""
+    return [rel for rel in User._meta.related_objects if rel.one_to_one and rel.related_model is not Token]
+
+
+def from_values(model, values):
+    """Deferred instance holding only ``values`` (a field attname -> value dict)."""
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(None, names, [values[name] for name in names])
+
+
+def shared_cache():
+    alias = getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def cache_key(token_key):
+    return 'auth-token:' + hashlib.sha256(token_key.encode()).hexdigest()
+
+
+def revoked_key(user_id):
+    return f'auth-revoked:{user_id}'
+
+
+def load_entry(token_key):
+    """Everything authentication needs about a token, in one query."""
+    # Taken before the read, so a change committed meanwhile still revokes it
+    loaded_at = time.time()
+    relations = profile_relations()
+    token = (
+        Token.objects
+        .select_related('user', *[f'user__{rel.get_accessor_name()}' for rel in relations])
+        .filter(key=token_key)
+        .first()
+    )
+    if token is None:
+        return None
+
+    profiles = {}
+    for rel in relations:
+        try:
+            profiles[rel.get_accessor_name()] = getattr(token.user, rel.get_accessor_name()).pk
+        except ObjectDoesNotExist:
+            profiles[rel.get_accessor_name()] = None
+
+    return {
+        'user': [getattr(token.user, field) for field in USER_FIELDS],
+        'profiles': profiles,
+        'loaded_at': loaded_at,
+    }
+
+
+def build_user(entry):
+    """Rebuilds the User (and its profile stubs) from a cache entry without touching the DB."""
+    user = from_values(User, dict(zip(USER_FIELDS, entry['user'])))
+    for rel in profile_relations():
+        name = rel.get_accessor_name()
+        profile_id = entry['profiles'].get(name)
+        profile = None
+        if profile_id is not None:
+            # Only the keys are known; other fields load on first access
+            profile = from_values(rel.related_model, {'id': profile_id, rel.field.attname: user.pk})
+            rel.field.set_cached_value(profile, user)
+        rel.set_cached_value(user, profile)
+    return user
+
+
+def _drop(token_keys, user_ids):
+    keys = [cache_key(token_key) for token_key in token_keys]
+    local_cache.delete_many(keys)
+    shared = shared_cache()
+    if shared is None:
+        return
+    if keys:
+        shared.delete_many(keys)
+    if user_ids:
+        # Outlives every entry loaded before now, wherever it is cached
+        now = time.time()
+        shared.set_many({revoked_key(user_id): now for user_id in user_ids}, 2 * local_cache.ttl)
+
+
+def invalidate_tokens(token_keys, user_id=None):
+    """
+    Drops the cached entries of ``token_keys`` once the current transaction
+    commits. With ``user_id`` the copies other workers hold are revoked too.
+    """
+    token_keys = list(token_keys)
+    transaction.on_commit(lambda: _drop(token_keys, [user_id] if user_id is not None else []))
+
+
+def invalidate_user(user_id):
+    """Drops every cached token of the user, on every worker, once the current transaction commits."""
+    def drop():
+        _drop(Token.objects.filter(user_id=user_id).values_list('key', flat=True), [user_id])
+    transaction.on_commit(drop)
+
+
+def is_revoked(shared, entry):
+    revoked_at = shared.get(revoked_key(entry['user'][0]))
+    return revoked_at is not None and revoked_at >= entry.get('loaded_at', 0)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that remembers token -> user/role/profile ids.
+
+    Lookups hit an in-process LRU with a TTL first, then the optional shared
+    cache named by AUTH_TOKEN_CACHE_ALIAS, and only then the database.
+    Entries are dropped on logout, token deletion and any change to the user
+    or its profiles (see users.signals), once the change commits. With a
+    shared cache that also leaves a per-user revocation time there, checked
+    on every hit, so other workers stop using their copies at once.
+    """
+    def authenticate_credentials(self, key):
+        cache_id = cache_key(key)
+        shared = shared_cache()
+        entry, cached_locally = local_cache.get(cache_id), True
+        if entry is None and shared is not None:
+            entry, cached_locally = shared.get(cache_id), False
+        if entry is not None and shared is not None and is_revoked(shared, entry):
+            entry = None
+
+        if entry is None:
+            entry = load_entry(key)
+            if entry is None:
+                raise AuthenticationFailed('Invalid token.')
+            if shared is not None:
+                shared.set(cache_id, entry, local_cache.ttl)
+            local_cache.set(cache_id, entry)
+        elif not cached_locally:
+            local_cache.set(cache_id, entry)
+
+        user = build_user(entry)
+        if not user.is_active or user.is_deleted:
+            raise AuthenticationFailed('User inactive or deleted.')
+
+        token = Token(key=key)
+        token.user = user
+        return user, token
@@ -0,0 +1,203 @@
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from clinical.models import Department
+from caching import resource_versions
+from . import lookup
+from .models import Doctor, Patient, User
+from .serializers import BulkDoctorRowSerializer, BulkPatientRowSerializer, BulkUserRowSerializer
+
+USER_COLUMNS = set(BulkUserRowSerializer().fields)
+
+ROLES = {
+    'PATIENT': (Patient, BulkPatientRowSerializer),
+    'DOCTOR': (Doctor, BulkDoctorRowSerializer),
+}
+
+
+def read_rows(lines, fmt):
+    """
+    Yields (line number, row dict) from CSV or NDJSON text lines.
+    NDJSON rows may nest the user columns under "user" like the REST API.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if value not in ('', None)}
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+            continue
+        if isinstance(row, dict) and isinstance(row.get('user'), dict):
+            row = {**row.pop('user'), **row}
+        yield line_number, row
+
+
+def _hash_passwords(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BulkImporter:
+    """
+    Creates users and their Patient/Doctor profiles in bulk.
+
+    Rows are validated per batch, plaintext passwords are hashed in a process
+    pool (``workers`` > 1), and each batch is written with two bulk_create
+    calls in one transaction. Rows that fail are reported, not raised.
+    Rows without a password get an unusable one.
+    """
+    def __init__(self, role, batch_size=1000, workers=None):
+        self.role = role.upper()
+        if self.role not in ROLES:
+            raise ValueError(f"Cannot bulk import role {role!r}")
+        self.profile_model, self.row_serializer = ROLES[self.role]
+        self.batch_size = batch_size
+        self.workers = workers
+        self.created = 0
+        self.errors = []
+
+    def run(self, rows):
+        executor = ProcessPoolExecutor(self.workers) if self.workers and self.workers > 1 else None
+        try:
+            for batch in _chunks(rows, self.batch_size):
+                self._import_batch(batch, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return {'created': self.created, 'failed': len(self.errors), 'errors': self.errors}
+
+    def _fail(self, line, errors):
+        self.errors.append({'line': line, 'errors': errors})
+
+    def _validate(self, batch):
+        valid = []
+        for line, row in batch:
+            if not isinstance(row, dict):
+                self._fail(line, {'non_field_errors': [f"Unreadable row: {row}"]})
+                continue
+            serializer = self.row_serializer(data=row)
+            if serializer.is_valid():
+                valid.append((line, serializer.validated_data))
+            else:
+                self._fail(line, serializer.errors)
+
+        # Uniqueness against the batch itself and the database, in one query
+        usernames = [data['username'] for _, data in valid]
+        emails = [data['email'] for _, data in valid]
+        taken = User.objects.filter(Q(username__in=usernames) | Q(email__in=emails)).values_list('username', 'email')
+        taken_usernames = {username for username, _ in taken}
+        taken_emails = {email for _, email in taken}
+
+        depts = set()
+        if self.role == 'DOCTOR':
+            wanted = {data['dept'] for _, data in valid if data.get('dept') is not None}
+            depts = set(Department.objects.filter(pk__in=wanted).values_list('pk', flat=True))
+
+        checked = []
+        for line, data in valid:
+            errors = {}
+            if data['username'] in taken_usernames:
+                errors['username'] = ["A user with that username already exists."]
+            if data['email'] in taken_emails:
+                errors['email'] = ["A user with that email already exists."]
+            if data.get('password_hash'):
+                try:
+                    identify_hasher(data['password_hash'])
+                except ValueError:
+                    errors['password_hash'] = ["Unknown password hash format."]
+            if self.role == 'DOCTOR' and data.get('dept') is not None and data['dept'] not in depts:
+                errors['dept'] = [f"Department {data['dept']} does not exist."]
+
+            if errors:
+                self._fail(line, errors)
+                continue
+            taken_usernames.add(data['username'])
+            taken_emails.add(data['email'])
+            checked.append((line, data))
+        return checked
+
+    def _passwords(self, rows, executor):
+        plaintext = [data['password'] for _, data in rows if data.get('password')]
+        if executor is not None and plaintext:
+            size = max(1, len(plaintext) // (self.workers * 4))
+            hashed = iter([h for part in executor.map(_hash_passwords, _chunks(plaintext, size)) for h in part])
+        else:
+            hashed = iter(_hash_passwords(plaintext))
+
+        passwords = []
+        for _, data in rows:
+            if data.get('password'):
+                passwords.append(next(hashed))
+            elif data.get('password_hash'):
+                passwords.append(data['password_hash'])
+            else:
+                passwords.append(make_password(None))
+        return passwords
+
+    def _build(self, data, password):
+        user_data = {key: data[key] for key in ('username', 'email', 'first_name', 'last_name')}
+        profile_data = {key: value for key, value in data.items() if key not in USER_COLUMNS}
+        if 'dept' in profile_data:
+            profile_data['dept_id'] = profile_data.pop('dept')
+        return User(role=self.role, password=password, **user_data), profile_data
+
+    def _write(self, rows, built):
+        with transaction.atomic():
+            users = User.objects.bulk_create([user for user, _ in built])
+            profiles = self.profile_model.objects.bulk_create([
+                self.profile_model(user=user, **profile_data)
+                for user, (_, profile_data) in zip(users, built)
+            ])
+            # bulk_create sends no post_save, so versions and lookup rows are updated here
+            resource_versions.bump(User, self.profile_model)
+            if self.profile_model is Patient:
+                lookup.index_patients(profiles)
+        self.created += len(rows)
+
+    def _write_one_by_one(self, rows, built):
+        # Only after a batch insert failed, e.g. a concurrent import took a username
+        for (line, _), (user, profile_data) in zip(rows, built):
+            try:
+                with transaction.atomic():
+                    user.save()
+                    self.profile_model.objects.create(user=user, **profile_data)
+                self.created += 1
+            except IntegrityError as e:
+                user.pk = None
+                self._fail(line, {'non_field_errors': [str(e)]})
+
+    def _import_batch(self, batch, executor):
+        rows = self._validate(batch)
+        if not rows:
+            return
+        passwords = self._passwords(rows, executor)
+        built = [self._build(data, password) for (_, data), password in zip(rows, passwords)]
+        try:
+            self._write(rows, built)
+        except IntegrityError:
+            for user, _ in built:
+                user.pk = None
+            self._write_one_by_one(rows, built)
@@ -0,0 +1,209 @@
+"""
+Patient typeahead over names, phone numbers and city.
+
+Every Patient has a PatientLookup row holding normalized copies of the
+searchable fields, each under a B-tree index. A query is answered by a
+handful of short index range scans, each capped at a few times the number
+of results wanted, and the candidates are ranked in Python:
+
+- digits match the start of the phone or emergency number
+- words match the start of the first name, last name or city, or sound
+  like the first or last name (Soundex), so "jon smyth" finds John Smith
+
+Every word of the query has to match some field. Prefix matches use
+``>= prefix AND < prefix + U+FFFF`` rather than LIKE, which every database
+answers from the index.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+
+from .models import Patient, PatientLookup
+
+MAX_LIMIT = 50
+MAX_TERMS = 4
+# Candidates read per index scan, per result asked for
+SCAN_FACTOR = 10
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+PHONE_RE = re.compile(r'[\d\s()+.-]+')
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+EXACT, PREFIX, SOUND = 3, 2, 1
+NAME_FIELDS = ('first_name', 'last_name', 'city')
+
+
+def normalize(text):
+    """Lower-case ASCII words separated by single spaces."""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode().lower()
+    return ' '.join(WORD_RE.findall(text))
+
+
+def digits(text):
+    return ''.join(ch for ch in text or '' if ch.isdigit())
+
+
+def soundex(word):
+    letters = [ch for ch in word if 'a' <= ch <= 'z']
+    if not letters:
+        return ''
+    code = letters[0]
+    last = SOUNDEX_CODES.get(letters[0], '')
+    for ch in letters[1:]:
+        digit = SOUNDEX_CODES.get(ch, '')
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code; vowels do
+        if ch not in 'hw':
+            last = digit
+    return code.ljust(4, '0')
+
+
+def lookup_for(patient_id, first_name, last_name, phone, emergency_number, city):
+    """Unsaved PatientLookup from the raw field values."""
+    first_name, last_name = normalize(first_name)[:20], normalize(last_name)[:20]
+    return PatientLookup(
+        patient_id=patient_id,
+        first_name=first_name,
+        last_name=last_name,
+        first_sound=soundex(first_name),
+        last_sound=soundex(last_name),
+        phone=digits(phone),
+        emergency_number=digits(emergency_number),
+        city=normalize(city)[:100],
+    )
+
+
+def index_patients(patients):
+    """Writes the lookup rows of saved patients whose ``user`` is loaded."""
+    rows = [
+        lookup_for(p.pk, p.user.first_name, p.user.last_name, p.phone, p.emergency_number, p.city)
+        for p in patients
+    ]
+    PatientLookup.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['patient'],
+        update_fields=['first_name', 'last_name', 'first_sound', 'last_sound', 'phone', 'emergency_number', 'city'],
+    )
+
+
+def index_user(user):
+    """Refreshes the names in the lookup row of a patient's user, if any."""
+    first_name, last_name = normalize(user.first_name)[:20], normalize(user.last_name)[:20]
+    PatientLookup.objects.filter(patient__user=user).update(
+        first_name=first_name,
+        last_name=last_name,
+        first_sound=soundex(first_name),
+        last_sound=soundex(last_name),
+    )
+
+
+def rebuild_index(batch_size=5000):
+    """Rewrites every lookup row from the patients. Returns the row count."""
+    fields = ('id', 'user__first_name', 'user__last_name', 'phone', 'emergency_number', 'city')
+    count = 0
+    with transaction.atomic():
+        PatientLookup.objects.all().delete()
+        batch = []
+        for row in Patient.objects.order_by('pk').values_list(*fields).iterator(chunk_size=batch_size):
+            batch.append(lookup_for(*row))
+            if len(batch) == batch_size:
+                PatientLookup.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        PatientLookup.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+def _prefix(field, value):
+    return {f'{field}__gte': value, f'{field}__lt': value + '\uffff'}
+
+
+def _scans(terms, numbers):
+    """(filter kwargs) for every index scan worth running for the query."""
+    for number in numbers:
+        yield _prefix('phone', number)
+        yield _prefix('emergency_number', number)
+    for term in terms:
+        yield _prefix('first_name', term)
+        yield _prefix('last_name', term)
+        yield _prefix('city', term)
+        if len(term) >= 3:
+            sound = soundex(term)
+            yield {'first_sound': sound}
+            yield {'last_sound': sound}
+    # "first last" and "last first" straight from the composite index
+    for first, last in ((terms[0], terms[-1]), (terms[-1], terms[0])) if len(terms) > 1 else ():
+        yield {**_prefix('last_name', last), **_prefix('first_name', first)}
+
+
+def _term_score(row, term):
+    best = 0
+    for field in NAME_FIELDS:
+        value = row[field]
+        if value == term:
+            return EXACT
+        if value.startswith(term) or f' {term}' in value:
+            best = PREFIX
+    if not best and len(term) >= 3:
+        sound = soundex(term)
+        if sound in (row['first_sound'], row['last_sound']):
+            best = SOUND
+    return best
+
+
+def _number_score(row, number):
+    # Patients without a number never match one
+    stored = [value for value in (row['phone'], row['emergency_number']) if value]
+    if number in stored:
+        return EXACT
+    if any(value.startswith(number) for value in stored):
+        return PREFIX
+    return 0
+
+
+def lookup(query, limit=10):
+    """
+    The best matching patients for a typeahead query, as (patient, score)
+    pairs with the user loaded. Higher scores are better matches.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    terms, numbers = [], []
+    if PHONE_RE.fullmatch(query.strip()):
+        # "98 765-43210" is one number; "()" or "-" is none
+        numbers = [number for number in [digits(query)] if number]
+    else:
+        for word in normalize(query).split()[:MAX_TERMS]:
+            (numbers if word.isdigit() else terms).append(word)
+    if not terms and not numbers:
+        return []
+
+    columns = ('patient_id', 'first_name', 'last_name', 'first_sound', 'last_sound',
+               'phone', 'emergency_number', 'city')
+    candidates = {}
+    for scan in _scans(terms, numbers):
+        for row in PatientLookup.objects.filter(**scan).values(*columns)[:limit * SCAN_FACTOR]:
+            candidates[row['patient_id']] = row
+
+    ranked = []
+    for row in candidates.values():
+        scores = [_term_score(row, term) for term in terms] + [_number_score(row, n) for n in numbers]
+        if all(scores):
+            ranked.append((-sum(scores), row['last_name'], row['first_name'], row['patient_id']))
+    ranked.sort()
+    ranked = ranked[:limit]
+
+    patients = Patient.objects.select_related('user').in_bulk([patient_id for *_, patient_id in ranked])
+    return [(patients[patient_id], -score) for score, _, _, patient_id in ranked if patient_id in patients]
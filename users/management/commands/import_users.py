@@ -0,0 +1,38 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.bulk import BulkImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import patients or doctors from a CSV (with header) or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--role', choices=['patient', 'doctor'], required=True)
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processes used to hash passwords.")
+        parser.add_argument('--errors', help="Write per-row errors to this JSON file.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('csv' if options['path'].endswith('.csv') else 'ndjson')
+        try:
+            handle = open(options['path'], newline='', encoding='utf-8-sig')
+        except OSError as e:
+            raise CommandError(str(e))
+
+        with handle:
+            importer = BulkImporter(options['role'], batch_size=options['batch_size'], workers=options['workers'])
+            report = importer.run(read_rows(handle, fmt))
+
+        if options['errors']:
+            with open(options['errors'], 'w') as out:
+                json.dump(report['errors'], out, indent=2)
+        else:
+            for error in report['errors'][:20]:
+                self.stderr.write(f"line {error['line']}: {error['errors']}")
+
+        self.stdout.write(self.style.SUCCESS(f"Created {report['created']}, failed {report['failed']}."))
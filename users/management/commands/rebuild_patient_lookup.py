@@ -0,0 +1,19 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from users import lookup
+
+
+class Command(BaseCommand):
+    help = "Rewrite the patient typeahead index from the patients and their users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Lookup rows written per batch.")
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        count = lookup.rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} patient(s) in {perf_counter() - started:.1f} s"
+        ))
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_alter_patient_gender'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientLookup',
+            fields=[
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='lookup', serialize=False, to='users.patient')),
+                ('first_name', models.CharField(max_length=20)),
+                ('last_name', models.CharField(max_length=20)),
+                ('first_sound', models.CharField(max_length=4)),
+                ('last_sound', models.CharField(max_length=4)),
+                ('phone', models.CharField(max_length=15)),
+                ('emergency_number', models.CharField(max_length=15)),
+                ('city', models.CharField(max_length=100)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_name', 'first_name'], name='lookup_last_first_idx'), models.Index(fields=['first_name'], name='lookup_first_idx'), models.Index(fields=['last_sound'], name='lookup_last_sound_idx'), models.Index(fields=['first_sound'], name='lookup_first_sound_idx'), models.Index(fields=['phone'], name='lookup_phone_idx'), models.Index(fields=['emergency_number'], name='lookup_emergency_idx'), models.Index(fields=['city'], name='lookup_city_idx')],
+            },
+        ),
+    ]
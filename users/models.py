@@ -69,4 +69,31 @@ class Patient(models.Model):
     updated_date = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return self.user.get_full_name()
\ No newline at end of file
+        return self.user.get_full_name()
+
+class PatientLookup(models.Model):
+    """
+    Normalized copy of the fields front desk staff search patients by, kept
+    in step by users.signals (and users.lookup.rebuild_index() after bulk
+    writes). Names and city are lower-case ASCII, phone numbers digits only.
+    """
+    patient = models.OneToOneField(Patient, on_delete=models.CASCADE, primary_key=True, related_name='lookup')
+    first_name = models.CharField(max_length=20)
+    last_name = models.CharField(max_length=20)
+    # Soundex codes, for names that are spelled the way they sound
+    first_sound = models.CharField(max_length=4)
+    last_sound = models.CharField(max_length=4)
+    phone = models.CharField(max_length=15)
+    emergency_number = models.CharField(max_length=15)
+    city = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_name', 'first_name'], name='lookup_last_first_idx'),
+            models.Index(fields=['first_name'], name='lookup_first_idx'),
+            models.Index(fields=['last_sound'], name='lookup_last_sound_idx'),
+            models.Index(fields=['first_sound'], name='lookup_first_sound_idx'),
+            models.Index(fields=['phone'], name='lookup_phone_idx'),
+            models.Index(fields=['emergency_number'], name='lookup_emergency_idx'),
+            models.Index(fields=['city'], name='lookup_city_idx'),
+        ]
@@ -2,9 +2,10 @@ from django.contrib.auth.password_validation import validate_password
 from django.core import exceptions
 from django.db import transaction
 from rest_framework import serializers
+from mixins import SparseFieldsetMixin
 from .models import User, Doctor, Patient
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'password', 'email', 'first_name', 'last_name', 'role']
@@ -24,7 +25,7 @@ class UserSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
 
-class DoctorSerializer(serializers.ModelSerializer):
+class DoctorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer()
     class Meta:
         model = Doctor
@@ -39,7 +40,7 @@ class DoctorSerializer(serializers.ModelSerializer):
         return doctor
     
     
-class PatientSerializer(serializers.ModelSerializer):
+class PatientSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer()
     class Meta:
         model = Patient
@@ -55,4 +56,67 @@ class PatientSerializer(serializers.ModelSerializer):
         user_data['role'] = 'PATIENT'
         user = User.objects.create_user(**user_data)
         patient = Patient.objects.create(user=user, **validated_data)
-        return patient
\ No newline at end of file
+        return patient
+
+
+class BulkUserRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk import. Uniqueness and foreign keys are checked per
+    batch by users.bulk, so validating a row never queries the database.
+    """
+    username = serializers.CharField(max_length=150)
+    email = serializers.EmailField()
+    first_name = serializers.CharField(max_length=20)
+    last_name = serializers.CharField(max_length=20)
+    password = serializers.CharField(required=False, allow_blank=True, write_only=True)
+    password_hash = serializers.CharField(required=False, allow_blank=True, write_only=True)
+
+    def validate_password(self, value):
+        if value:
+            try:
+                validate_password(value)
+            except exceptions.ValidationError as e:
+                raise serializers.ValidationError(list(e.messages))
+        return value
+
+    def validate(self, attrs):
+        if attrs.get('password') and attrs.get('password_hash'):
+            raise serializers.ValidationError("Give either password or password_hash, not both.")
+        return attrs
+
+
+class BulkPatientRowSerializer(BulkUserRowSerializer):
+    gender = serializers.ChoiceField(choices=Patient.GENDER_CHOICES)
+    age = serializers.IntegerField(required=False, allow_null=True)
+    phone = serializers.CharField(max_length=15, required=False, allow_blank=True)
+    emergency_number = serializers.CharField(max_length=15, required=False, allow_blank=True)
+    birth_date = serializers.DateField(required=False, allow_null=True)
+    blood_group = serializers.CharField(max_length=5)
+    address = serializers.CharField()
+    city = serializers.CharField(max_length=100)
+
+
+class BulkDoctorRowSerializer(BulkUserRowSerializer):
+    dept = serializers.IntegerField(required=False, allow_null=True)
+    specialization = serializers.CharField(max_length=100)
+    experience = serializers.IntegerField()
+    charges = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    qualification = serializers.CharField(max_length=50)
+    joining_date = serializers.DateField(required=False, allow_null=True)
+    is_available = serializers.BooleanField(required=False)
+
+
+class PatientLookupQuerySerializer(serializers.Serializer):
+    q = serializers.CharField()
+    limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=50)
+
+
+class PatientMatchSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    first_name = serializers.CharField(source='user.first_name')
+    last_name = serializers.CharField(source='user.last_name')
+    phone = serializers.CharField()
+    emergency_number = serializers.CharField()
+    city = serializers.CharField()
+    birth_date = serializers.DateField()
+    score = serializers.IntegerField()
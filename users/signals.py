@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authtoken.models import Token
+
+from caching import resource_versions
+from . import lookup
+from .authentication import invalidate_tokens, invalidate_user, profile_relations
+from .models import Doctor, Patient, User
+
+
+def drop_token(sender, instance, **kwargs):
+    invalidate_tokens([instance.key], user_id=instance.user_id)
+
+
+def drop_user_tokens(sender, instance, **kwargs):
+    # Role, is_active/is_deleted or names may have changed
+    invalidate_user(instance.pk)
+
+
+def drop_profile_owner_tokens(sender, instance, **kwargs):
+    user_id = getattr(instance, 'user_id', None)
+    if user_id is not None:
+        invalidate_user(user_id)
+
+
+def index_patient(sender, instance, **kwargs):
+    lookup.index_patients([instance])
+
+
+def index_user_names(sender, instance, created, **kwargs):
+    # A new user has no patient profile yet
+    if not created and instance.role == 'PATIENT':
+        lookup.index_user(instance)
+
+
+def connect():
+    post_save.connect(drop_token, sender=Token, dispatch_uid='auth_cache_token_save')
+    post_delete.connect(drop_token, sender=Token, dispatch_uid='auth_cache_token_delete')
+    post_save.connect(drop_user_tokens, sender=User, dispatch_uid='auth_cache_user_save')
+    for rel in profile_relations():
+        model = rel.related_model
+        post_save.connect(drop_profile_owner_tokens, sender=model, dispatch_uid=f'auth_cache_{model._meta.label}_save')
+        post_delete.connect(drop_profile_owner_tokens, sender=model, dispatch_uid=f'auth_cache_{model._meta.label}_delete')
+    resource_versions.track(Doctor, User)
+    post_save.connect(index_patient, sender=Patient, dispatch_uid='patient_lookup_save')
+    post_save.connect(index_user_names, sender=User, dispatch_uid='patient_lookup_user_save')
@@ -1,3 +1,71 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
 
-# Create your tests here.
+from . import authentication, lookup
+from .authentication import CachedTokenAuthentication
+from .models import Patient, User
+
+
+class LookupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i, phone in enumerate(['9800000001', '']):
+            user = User.objects.create_user(
+                username=f'p{i}', email=f'p{i}@example.com', password='x', role='PATIENT',
+                first_name='Asha', last_name='Rao',
+            )
+            Patient.objects.create(user=user, gender='FEMALE', blood_group='O+', address='a', city='Pune', phone=phone)
+        lookup.rebuild_index()
+
+    def matches(self, query):
+        return [(patient.phone, score) for patient, score in lookup.lookup(query)]
+
+    def test_punctuation_only_query_matches_nothing(self):
+        for query in ('-', '()', ' + '):
+            self.assertEqual(self.matches(query), [])
+
+    def test_patients_without_a_number_do_not_match_numbers(self):
+        self.assertEqual(self.matches('98000'), [('9800000001', lookup.PREFIX)])
+        self.assertEqual(self.matches('9800000001'), [('9800000001', lookup.EXACT)])
+
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared'},
+}
+
+
+@override_settings(CACHES=SHARED_CACHES, AUTH_TOKEN_CACHE_ALIAS='shared')
+class TokenCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='staff', email='s@example.com', password='x', role='STAFF')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        authentication.local_cache.clear()
+
+    def authenticate(self):
+        return CachedTokenAuthentication().authenticate_credentials(self.token.key)[0]
+
+    def test_change_is_seen_by_a_worker_holding_a_local_copy(self):
+        self.assertEqual(self.authenticate().role, 'STAFF')
+        cache_id = authentication.cache_key(self.token.key)
+        copy = authentication.local_cache.get(cache_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = 'DOCTOR'
+            self.user.save()
+        # Another worker still has the entry it loaded before the change
+        authentication.local_cache.set(cache_id, copy)
+        self.assertEqual(self.authenticate().role, 'DOCTOR')
+
+    def test_entries_are_dropped_only_when_the_change_commits(self):
+        self.authenticate()
+        cache_id = authentication.cache_key(self.token.key)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.user.save()
+        self.assertIsNotNone(authentication.local_cache.get(cache_id))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(authentication.local_cache.get(cache_id))
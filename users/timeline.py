@@ -0,0 +1,99 @@
+import heapq
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+
+from clinical.models import Appointment, LabReport, MedicalRecord
+from facility.models import Admission, Bill, StaffAssignment
+
+# (event type, model, timestamp field, extra columns). The list order is
+# also the tie-break between events sharing a timestamp.
+EVENT_SOURCES = [
+    ('admission', Admission, 'admit_date', ['doctor_id', 'room_id', 'bed_id', 'status', 'discharge_date', 'total_days']),
+    ('appointment', Appointment, 'appointment_date', ['doctor_id', 'status']),
+    ('medical_record', MedicalRecord, 'record_date', ['doctor_id', 'diagnosis', 'treatment']),
+    ('lab_report', LabReport, 'report_date', ['doctor_id', 'report_type', 'result', 'lab_charge']),
+    ('staff_assignment', StaffAssignment, 'assigned_date', ['staff_id', 'procedure_type', 'outcome_status']),
+    ('bill', Bill, 'created_at', ['admission_id', 'appointment_id', 'total_amount', 'status']),
+]
+EVENT_RANK = {event_type: rank for rank, (event_type, *_) in enumerate(EVENT_SOURCES)}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(event):
+    return f"{event['at'].isoformat()}|{event['type']}|{event['id']}"
+
+
+def decode_cursor(value):
+    """
+    Accepts either a plain ISO datetime (events strictly after it) or a
+    cursor returned as ``next_since`` by a previous call.
+    Returns (timestamp, rank, id) where rank/id are None for a plain datetime.
+    """
+    if not value:
+        return None
+    timestamp, _, rest = value.partition('|')
+    at = parse_datetime(timestamp)
+    if at is None:
+        raise InvalidCursor("since must be an ISO 8601 datetime or a next_since cursor")
+    if not rest:
+        return at, None, None
+
+    event_type, _, event_id = rest.partition('|')
+    if event_type not in EVENT_RANK or not event_id.isdigit():
+        raise InvalidCursor("Malformed since cursor")
+    return at, EVENT_RANK[event_type], int(event_id)
+
+
+def _source_events(patient_id, event_type, model, date_field, columns, since, chunk_size):
+    queryset = model.objects.filter(patient_id=patient_id)
+
+    if since is not None:
+        at, rank, last_id = since
+        own_rank = EVENT_RANK[event_type]
+        if rank is None or own_rank < rank:
+            queryset = queryset.filter(**{f'{date_field}__gt': at})
+        elif own_rank == rank:
+            queryset = queryset.filter(**{f'{date_field}__gte': at}).exclude(**{date_field: at, 'pk__lte': last_id})
+        else:
+            queryset = queryset.filter(**{f'{date_field}__gte': at})
+
+    # Range scan on the (patient, <date>) index
+    rows = queryset.order_by(date_field, 'pk').values('pk', date_field, *columns).iterator(chunk_size=chunk_size)
+    rank = EVENT_RANK[event_type]
+    for row in rows:
+        event_id = row.pop('pk')
+        at = row.pop(date_field)
+        yield (at, rank, event_id), {'type': event_type, 'id': event_id, 'at': at, 'data': row}
+
+
+def patient_events(patient_id, since=None, chunk_size=200):
+    """All timeline events of a patient in time order, merged lazily from each source."""
+    streams = [
+        _source_events(patient_id, event_type, model, date_field, columns, since, chunk_size)
+        for event_type, model, date_field, columns in EVENT_SOURCES
+    ]
+    for _, event in heapq.merge(*streams, key=lambda item: item[0]):
+        yield event
+
+
+def stream_timeline_json(patient_id, since=None, limit=None):
+    """Yields the timeline as chunks of one JSON document."""
+    encoder = DjangoJSONEncoder()
+    yield f'{{"patient": {patient_id}, "events": ['
+
+    last = None
+    count = 0
+    for event in patient_events(patient_id, since):
+        if limit is not None and count == limit:
+            break
+        yield (',' if count else '') + json.dumps(event, cls=DjangoJSONEncoder)
+        last = event
+        count += 1
+
+    next_since = encode_cursor(last) if last is not None and count == limit else None
+    yield f'], "count": {count}, "next_since": {encoder.encode(next_since)}}}'
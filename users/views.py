@@ -1,30 +1,87 @@
 from rest_framework.viewsets import ModelViewSet
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import action
-from permissions import IsAdmin,IsPatient
+from rest_framework.response import Response
+from rest_framework import status
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.authtoken.models import Token
+from permissions import IsAdmin,IsPatient,IsStaffOrDoctor
+from mixins import ConditionalGetMixin, QueryPlannerMixin
+from pagination import TimeCursorPagination
+from streaming import for_server
+from clinical.models import Department
 from .models import User, Doctor, Patient
-from .serializers import UserSerializer, DoctorSerializer, PatientSerializer
+from .serializers import (
+    UserSerializer,
+    DoctorSerializer,
+    PatientSerializer,
+    PatientLookupQuerySerializer,
+    PatientMatchSerializer,
+)
+from .timeline import InvalidCursor, decode_cursor, stream_timeline_json
+from .bulk import BulkImporter, read_rows
+from . import lookup
 
  
-class UserViewSet(ModelViewSet):
+class UserViewSet(QueryPlannerMixin, ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
+    # Keyset pages: no COUNT(*) or OFFSET scan on the large tables
+    pagination_class = TimeCursorPagination
+    cursor_ordering = ('-id',)
 
-class DoctorViewSet(ModelViewSet):
+def bulk_import(request, role):
+    """
+    Imports the request body (CSV with a header row, or NDJSON) as users of
+    ``role``. The body is read line by line, so large files are not buffered,
+    and passwords are hashed in BULK_IMPORT_WORKERS processes (default: in
+    this worker).
+    """
+    batch_size = request.query_params.get('batch_size', '1000')
+    if not batch_size.isdigit():
+        return Response({"error": "batch_size must be a number of rows"}, status=status.HTTP_400_BAD_REQUEST)
+    fmt = 'csv' if 'csv' in (request.content_type or '') else 'ndjson'
+    lines = (line.decode('utf-8-sig') for line in request.stream) if request.stream else []
+
+    importer = BulkImporter(
+        role,
+        batch_size=max(1, min(int(batch_size), 5000)),
+        workers=getattr(settings, 'BULK_IMPORT_WORKERS', 1),
+    )
+    report = importer.run(read_rows(lines, fmt))
+    response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+    return Response(report, status=response_status)
+
+
+class DoctorViewSet(ConditionalGetMixin, QueryPlannerMixin, ModelViewSet):
     queryset = Doctor.objects.all()
     serializer_class = DoctorSerializer
     permission_classes = [IsAdmin]
+    # The nested user, and dept, which is set to NULL without a signal
+    version_models = (Doctor, User, Department)
+    pagination_class = TimeCursorPagination
+    cursor_ordering = ('-id',)
 
     def get_permissions(self):
         if self.action in ['create', 'destroy']:
             return [IsAdminUser()]
+        if self.action == 'bulk':
+            return [IsAdmin()]
         return [IsAuthenticated()]
 
-class PatientViewSet(ModelViewSet):
+    @action(detail=False, methods=['post'], permission_classes=[IsAdmin])
+    def bulk(self, request):
+        return bulk_import(request, 'DOCTOR')
+
+class PatientViewSet(QueryPlannerMixin, ModelViewSet):
     queryset = Patient.objects.all()
     serializer_class = PatientSerializer
     permission_classes = [IsPatient]
+    pagination_class = TimeCursorPagination
+    cursor_ordering = ('-id',)
 
     def get_permissions(self):
         if self.action == 'create':
@@ -32,9 +89,44 @@ class PatientViewSet(ModelViewSet):
         return super().get_permissions()
 
     def get_queryset(self):
+        queryset = super().get_queryset()
         user = self.request.user
         if not user.is_authenticated:
-            return Patient.objects.none()
+            return queryset.none()
         if user.role == 'PATIENT':
-            return Patient.objects.filter(user=user)
-        return Patient.objects.all()
\ No newline at end of file
+            return queryset.filter(user=user)
+        return queryset
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdmin])
+    def bulk(self, request):
+        return bulk_import(request, 'PATIENT')
+
+    @action(detail=False, methods=['get'], permission_classes=[IsStaffOrDoctor])
+    def typeahead(self, request):
+        params = PatientLookupQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        matches = lookup.lookup(params.validated_data['q'], limit=params.validated_data['limit'])
+        for patient, score in matches:
+            patient.score = score
+        return Response(PatientMatchSerializer([patient for patient, _ in matches], many=True).data)
+
+    @action(detail=True, methods=['get'], permission_classes=[IsPatient | IsStaffOrDoctor])
+    def timeline(self, request, pk=None):
+        patient = self.get_object()
+        try:
+            since = decode_cursor(request.query_params.get('since'))
+            limit = int(request.query_params.get('limit', 1000))
+        except (InvalidCursor, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return for_server(request, StreamingHttpResponse(
+            stream_timeline_json(patient.pk, since=since, limit=max(1, min(limit, 10000))),
+            content_type='application/json',
+        ))
+
+
+class LogoutView(APIView):
+    def post(self, request):
+        # Deleting the token also evicts it from the auth cache
+        Token.objects.filter(user=request.user).delete()
+        return Response({'message': 'Logged out'})